@@ -1,10 +1,44 @@
-from typing import Any, Text, Dict, List
+from typing import Any, Text, Dict, List, Tuple
 from rasa_sdk import Action, Tracker, FormValidationAction
+from rasa_sdk.events import FollowupAction, SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
+from concurrent.futures import Future
 from datetime import datetime
-import os
-import re
+import asyncio
+import time
+
+from .booking_store import Booking, BookingStore, BookingView, LEGACY_BOOKINGS_PATH, TIMESTAMP_FORMAT
+from .booking_writer import BookingRejected, create_booking_writer
+from .dates import format_date
+from .instrumentation import (
+    booking_write_duration, booking_writes, start_action_metrics_server, timed_action,
+    timed_validation, watch_booking_writer,
+)
+from .inventory import InventoryTracker
+from .validation import validate_slot
+
+# Shared booking log (imports the legacy bookings.txt on first use)
+booking_store = BookingStore(legacy_path=LEGACY_BOOKINGS_PATH)
+# Room availability, kept in sync with the booking log
+inventory_tracker = InventoryTracker(BookingView(booking_store.path))
+# Group-commit writer; confirmations are batched into locked, fsynced appends
+# and re-checked against room availability under the log's file lock (a
+# batch that fails to write gives its rooms back)
+booking_writer = create_booking_writer(booking_store, admit=inventory_tracker.reserve,
+                                       release=inventory_tracker.release)
+watch_booking_writer(booking_writer)
+
+# How long a confirmation may wait for its booking to become durable
+BOOKING_WRITE_TIMEOUT = 10
+# Writes that outlived BOOKING_WRITE_TIMEOUT, by sender: (slots, future).
+# They may still land, so a retry of the same booking waits for that write
+# instead of queueing the booking a second time.
+pending_writes: Dict[Text, Tuple[Dict[Text, Any], Future]] = {}
+MAX_PENDING_WRITES = 1000
+
+# Prometheus metrics on ACTION_METRICS_PORT (rasa_sdk's server has no /metrics)
+start_action_metrics_server()
 
 
 class ActionShowBookingSummary(Action):
@@ -13,6 +47,7 @@ class ActionShowBookingSummary(Action):
     def name(self) -> Text:
         return "action_show_booking_summary"
 
+    @timed_action
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -41,8 +76,8 @@ class ActionShowBookingSummary(Action):
             f"Name: {guest_name}\n"
             f"Email: {email}\n"
             f"Phone: {phone}\n"
-            f"Check-in: {checkin_date}\n"
-            f"Check-out: {checkout_date}\n"
+            f"Check-in: {format_date(checkin_date)}\n"
+            f"Check-out: {format_date(checkout_date)}\n"
             f"Guests: {num_guests}\n"
             f"Room: {room_type}\n"
             f"Special Requests: {special_requests}\n"
@@ -62,6 +97,30 @@ class ValidateBookingForm(FormValidationAction):
     def name(self) -> Text:
         return "validate_booking_form"
 
+    @timed_action
+    async def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: DomainDict,
+    ) -> List[Dict[Text, Any]]:
+        return await super().run(dispatcher, tracker, domain)
+
+    def _apply(
+        self,
+        slot_name: Text,
+        slot_value: Any,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+    ) -> Dict[Text, Any]:
+        """Run the shared validator for a slot and report any error"""
+        
+        result = validate_slot(slot_name, slot_value, tracker.current_slot_values())
+        if result.message:
+            dispatcher.utter_message(text=result.message)
+        return {slot_name: result.value}
+
+    @timed_validation
     def validate_guest_name(
         self,
         slot_value: Any,
@@ -70,36 +129,9 @@ class ValidateBookingForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate guest name"""
-        
-        if not slot_value or len(slot_value.strip()) < 2:
-            dispatcher.utter_message(text="Please provide a valid name (at least 2 characters).")
-            return {"guest_name": None}
-        
-        # Check if name contains only letters and spaces
-        if not re.match(r"^[a-zA-Z\s]+$", slot_value):
-            dispatcher.utter_message(text="Please provide a valid name (letters only).")
-            return {"guest_name": None}
-        
-        # Require at least 3 characters for better quality
-        if len(slot_value.strip()) < 3:
-            dispatcher.utter_message(text="Please provide a full name (at least 3 characters).")
-            return {"guest_name": None}
-        
-        # Reject names that are too long or have too many words (likely not real names)
-        words = slot_value.strip().split()
-        if len(words) > 4:
-            dispatcher.utter_message(text="Please provide your actual name (first and last name).")
-            return {"guest_name": None}
-        
-        # Reject if contains common non-name phrases
-        slot_lower = slot_value.lower()
-        invalid_phrases = ['want', 'need', 'book', 'room', 'hotel', 'reservation']
-        if any(phrase in slot_lower for phrase in invalid_phrases):
-            dispatcher.utter_message(text="Please provide your actual name, not a request.")
-            return {"guest_name": None}
-        
-        return {"guest_name": slot_value.strip().title()}
+        return self._apply("guest_name", slot_value, dispatcher, tracker)
 
+    @timed_validation
     def validate_email(
         self,
         slot_value: Any,
@@ -108,16 +140,9 @@ class ValidateBookingForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate email address"""
-        
-        # Simple email validation pattern
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        
-        if not slot_value or not re.match(email_pattern, slot_value):
-            dispatcher.utter_message(text="Please provide a valid email address (e.g., name@example.com).")
-            return {"email": None}
-        
-        return {"email": slot_value.lower().strip()}
+        return self._apply("email", slot_value, dispatcher, tracker)
 
+    @timed_validation
     def validate_phone(
         self,
         slot_value: Any,
@@ -126,17 +151,9 @@ class ValidateBookingForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate phone number"""
-        
-        # Remove common formatting characters
-        cleaned_phone = re.sub(r'[\s\-\(\)\.]', '', str(slot_value))
-        
-        # Check if it contains at least 7 digits and max 15 digits (international format)
-        if not re.match(r'^[\+]?[0-9]{7,15}$', cleaned_phone):
-            dispatcher.utter_message(text="Please provide a valid phone number (at least 7 digits).")
-            return {"phone": None}
-        
-        return {"phone": slot_value.strip()}
+        return self._apply("phone", slot_value, dispatcher, tracker)
 
+    @timed_validation
     def validate_checkin_date(
         self,
         slot_value: Any,
@@ -144,25 +161,16 @@ class ValidateBookingForm(FormValidationAction):
         tracker: Tracker,
         domain: DomainDict,
     ) -> Dict[Text, Any]:
-        """Validate check-in date"""
-        
-        # Simple date pattern matching (DD/MM/YYYY, DD-MM-YYYY, or natural like "10th November")
-        date_patterns = [
-            r'\d{1,2}[/-]\d{1,2}[/-]\d{4}',  # 10/11/2024 or 10-11-2024
-            r'\d{1,2}(st|nd|rd|th)?\s+(january|february|march|april|may|june|july|august|september|october|november|december)',  # 10th November
-            r'(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}',  # November 10
-            r'(today|tomorrow|next\s+\w+)',  # today, tomorrow, next week/month
-        ]
-        
-        slot_value_lower = str(slot_value).lower()
-        
-        for pattern in date_patterns:
-            if re.search(pattern, slot_value_lower):
-                return {"checkin_date": slot_value}
-        
-        dispatcher.utter_message(text="Please provide a valid date (e.g., 10/11/2024, 10th November, or tomorrow).")
-        return {"checkin_date": None}
+        """Validate check-in date and store it as YYYY-MM-DD"""
+        
+        result = self._apply("checkin_date", slot_value, dispatcher, tracker)
+        checkout = tracker.get_slot("checkout_date")
+        if result["checkin_date"] and checkout and checkout <= result["checkin_date"]:
+            # A moved check-in can invalidate the check-out given earlier
+            result["checkout_date"] = None
+        return result
 
+    @timed_validation
     def validate_checkout_date(
         self,
         slot_value: Any,
@@ -170,25 +178,10 @@ class ValidateBookingForm(FormValidationAction):
         tracker: Tracker,
         domain: DomainDict,
     ) -> Dict[Text, Any]:
-        """Validate check-out date"""
-        
-        # Use same validation as check-in date
-        date_patterns = [
-            r'\d{1,2}[/-]\d{1,2}[/-]\d{4}',
-            r'\d{1,2}(st|nd|rd|th)?\s+(january|february|march|april|may|june|july|august|september|october|november|december)',
-            r'(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}',
-            r'(in\s+\d+\s+days?|day\s+after\s+tomorrow|next\s+\w+)',  # in 3 days, day after tomorrow
-        ]
-        
-        slot_value_lower = str(slot_value).lower()
-        
-        for pattern in date_patterns:
-            if re.search(pattern, slot_value_lower):
-                return {"checkout_date": slot_value}
-        
-        dispatcher.utter_message(text="Please provide a valid date (e.g., 12/11/2024, 12th November, or in 3 days).")
-        return {"checkout_date": None}
+        """Validate check-out date (after check-in) and store it as YYYY-MM-DD"""
+        return self._apply("checkout_date", slot_value, dispatcher, tracker)
 
+    @timed_validation
     def validate_num_guests(
         self,
         slot_value: Any,
@@ -197,37 +190,9 @@ class ValidateBookingForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate number of guests"""
-        
-        # Extract numbers from text
-        numbers = re.findall(r'\d+', str(slot_value))
-        
-        if not numbers:
-            # Check for word numbers
-            word_to_num = {
-                'one': 1, 'two': 2, 'three': 3, 'four': 4, 
-                'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
-                'nine': 9, 'ten': 10
-            }
-            
-            slot_lower = str(slot_value).lower()
-            for word, num in word_to_num.items():
-                if word in slot_lower:
-                    if num < 1 or num > 10:
-                        dispatcher.utter_message(text="Please provide a number between 1 and 10 guests.")
-                        return {"num_guests": None}
-                    return {"num_guests": str(num)}
-            
-            dispatcher.utter_message(text="Please provide a valid number of guests (e.g., 2 or two).")
-            return {"num_guests": None}
-        
-        num = int(numbers[0])
-        
-        if num < 1 or num > 10:
-            dispatcher.utter_message(text="Please provide a number between 1 and 10 guests.")
-            return {"num_guests": None}
-        
-        return {"num_guests": str(num)}
+        return self._apply("num_guests", slot_value, dispatcher, tracker)
 
+    @timed_validation
     def validate_room_type(
         self,
         slot_value: Any,
@@ -237,18 +202,42 @@ class ValidateBookingForm(FormValidationAction):
     ) -> Dict[Text, Any]:
         """Validate room type"""
         
-        valid_rooms = ['single', 'double', 'suite', 'deluxe']
-        slot_lower = str(slot_value).lower()
-        
-        for room in valid_rooms:
-            if room in slot_lower:
-                return {"room_type": room.capitalize()}
-        
-        dispatcher.utter_message(
-            text="Please choose a valid room type: Single, Double, Suite, or Deluxe."
-        )
+        result = self._apply("room_type", slot_value, dispatcher, tracker)
+        if result["room_type"] is None:
+            return result
+        return self._check_availability(result["room_type"], dispatcher, tracker)
+
+    def _check_availability(
+        self,
+        room_type: Text,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+    ) -> Dict[Text, Any]:
+        """Reject a room type that is sold out for the requested stay"""
+        
+        stay = Booking(
+            checkin_date=tracker.get_slot("checkin_date"),
+            checkout_date=tracker.get_slot("checkout_date"),
+            created_at=datetime.now().strftime(TIMESTAMP_FORMAT),
+        ).stay()
+        if stay is None:
+            return {"room_type": room_type}
+        
+        summary = inventory_tracker.summary(*stay)
+        if summary.get(room_type, {}).get("available", 0) > 0:
+            return {"room_type": room_type}
+        
+        alternatives = [room for room, counts in summary.items() if counts["available"] > 0]
+        if alternatives:
+            dispatcher.utter_message(
+                text=f"Sorry, we have no {room_type} rooms left for those dates. "
+                     f"Available: {', '.join(alternatives)}."
+            )
+        else:
+            dispatcher.utter_message(text="Sorry, we are fully booked for those dates.")
         return {"room_type": None}
 
+    @timed_validation
     def validate_special_requests(
         self,
         slot_value: Any,
@@ -257,24 +246,9 @@ class ValidateBookingForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate special requests"""
-        
-        # Special requests can be anything, just check if it's not too long
-        if not slot_value:
-            return {"special_requests": "None"}
-        
-        slot_lower = str(slot_value).lower().strip()
-        
-        # If user says none, nothing, no, etc.
-        if slot_lower in ['none', 'nothing', 'no', 'nope', 'n/a', 'na', 'no special requests', 'nothing special']:
-            return {"special_requests": "None"}
-        
-        # Limit length to avoid spam
-        if len(slot_value) > 200:
-            dispatcher.utter_message(text="Please keep special requests under 200 characters.")
-            return {"special_requests": None}
-        
-        return {"special_requests": slot_value.strip().capitalize()}
+        return self._apply("special_requests", slot_value, dispatcher, tracker)
 
+    @timed_validation
     def validate_breakfast(
         self,
         slot_value: Any,
@@ -283,17 +257,9 @@ class ValidateBookingForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate breakfast choice"""
-        
-        slot_lower = str(slot_value).lower()
-        
-        if any(word in slot_lower for word in ['yes', 'y', 'yeah', 'yep', 'sure', 'ok', 'okay']):
-            return {"breakfast": "Yes"}
-        elif any(word in slot_lower for word in ['no', 'n', 'nope', 'nah']):
-            return {"breakfast": "No"}
-        else:
-            dispatcher.utter_message(text="Please answer with Yes or No.")
-            return {"breakfast": None}
+        return self._apply("breakfast", slot_value, dispatcher, tracker)
 
+    @timed_validation
     def validate_payment_method(
         self,
         slot_value: Any,
@@ -302,69 +268,79 @@ class ValidateBookingForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate payment method"""
-        
-        valid_methods = ['credit card', 'debit card', 'cash', 'paypal']
-        slot_lower = str(slot_value).lower()
-        
-        for method in valid_methods:
-            if method in slot_lower or method.replace(' ', '') in slot_lower:
-                return {"payment_method": method.title()}
-        
-        dispatcher.utter_message(
-            text="Please choose a valid payment method: Credit Card, Debit Card, Cash, or PayPal."
-        )
-        return {"payment_method": None}
+        return self._apply("payment_method", slot_value, dispatcher, tracker)
 
 
 class ActionConfirmBooking(Action):
-    """Custom action to confirm booking and save to file"""
+    """Custom action to confirm booking and save it to the booking log"""
 
     def name(self) -> Text:
         return "action_confirm_booking"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        # Get all slot values
-        guest_name = tracker.get_slot("guest_name")
-        email = tracker.get_slot("email")
-        phone = tracker.get_slot("phone")
-        checkin_date = tracker.get_slot("checkin_date")
-        checkout_date = tracker.get_slot("checkout_date")
-        num_guests = tracker.get_slot("num_guests")
-        room_type = tracker.get_slot("room_type")
-        special_requests = tracker.get_slot("special_requests")
-        breakfast = tracker.get_slot("breakfast")
-        payment_method = tracker.get_slot("payment_method")
-        
-        # Create booking record
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        booking_record = (
-            f"\n{'='*60}\n"
-            f"BOOKING CONFIRMATION - {timestamp}\n"
-            f"{'='*60}\n"
-            f"Guest Name: {guest_name}\n"
-            f"Email: {email}\n"
-            f"Phone: {phone}\n"
-            f"Check-in Date: {checkin_date}\n"
-            f"Check-out Date: {checkout_date}\n"
-            f"Number of Guests: {num_guests}\n"
-            f"Room Type: {room_type}\n"
-            f"Special Requests: {special_requests}\n"
-            f"Breakfast: {breakfast}\n"
-            f"Payment Method: {payment_method}\n"
-            f"{'='*60}\n"
+    @timed_action
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        
+        # Build a typed booking record from the form slots
+        slot_names = [
+            "guest_name", "email", "phone", "checkin_date", "checkout_date",
+            "num_guests", "room_type", "special_requests", "breakfast",
+            "payment_method",
+        ]
+        slots = {name: tracker.get_slot(name) for name in slot_names}
+        booking = Booking.from_slots(
+            slots,
+            created_at=datetime.now().strftime(TIMESTAMP_FORMAT),
         )
         
-        # Save to bookings.txt file
+        pending = pending_writes.pop(tracker.sender_id, None)
+        if pending is not None and pending[0] == slots and not (
+                pending[1].done() and pending[1].exception() is not None):
+            # The guest retried after a timeout; wait for the earlier write
+            future = pending[1]
+        else:
+            # Queue for the next group commit
+            future = booking_writer.submit(booking)
+        
+        # Wait until it is on disk; shielded so a timeout leaves the write
+        # (and its future) to the writer thread
+        started = time.perf_counter()
         try:
-            bookings_file = "bookings.txt"
-            with open(bookings_file, "a", encoding="utf-8") as f:
-                f.write(booking_record)
-            print(f"✅ Booking saved successfully to {bookings_file}")
+            saved = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                           timeout=BOOKING_WRITE_TIMEOUT)
+            booking_write_duration.observe(time.perf_counter() - started)
+            booking_writes.inc("saved")
+            print(f"✅ Booking #{saved.id} saved successfully to {booking_store.path}")
+        except BookingRejected:
+            booking_write_duration.observe(time.perf_counter() - started)
+            booking_writes.inc("rejected")
+            # Someone else took the last room since validation; ask again
+            dispatcher.utter_message(
+                text=f"Sorry, the last {booking.room_type} room for those dates was just booked. "
+                     f"Please choose another room type."
+            )
+            return [SlotSet("room_type", None), FollowupAction("booking_form")]
+        except asyncio.TimeoutError:
+            booking_write_duration.observe(time.perf_counter() - started)
+            booking_writes.inc("timeout")
+            print(f"❌ Booking not saved within {BOOKING_WRITE_TIMEOUT}s")
+            if len(pending_writes) >= MAX_PENDING_WRITES:
+                pending_writes.pop(next(iter(pending_writes)))
+            pending_writes[tracker.sender_id] = (slots, future)
+            return self._not_saved(dispatcher)
         except Exception as e:
+            booking_write_duration.observe(time.perf_counter() - started)
+            booking_writes.inc("failed")
             print(f"❌ Error saving booking: {e}")
-            dispatcher.utter_message(text="Warning: There was an issue saving your booking details, but your booking is confirmed!")
+            return self._not_saved(dispatcher)
         
         return []
+
+    def _not_saved(self, dispatcher: CollectingDispatcher) -> List[Dict[Text, Any]]:
+        """Never confirm a booking that is not on disk; show the summary again so the guest can retry"""
+        dispatcher.utter_message(
+            text="Sorry, we could not save your booking, so it is not confirmed yet. "
+                 "Please check your details and reply yes to try again."
+        )
+        return [FollowupAction("action_show_booking_summary")]
@@ -0,0 +1,575 @@
+"""
+Structured booking storage shared by the action server and the Flask API.
+
+Bookings are stored one JSON object per line in an append-only log
+(bookings.jsonl). Each record gets an integer id, and an in-memory
+id -> byte offset index lets single bookings be read with one seek.
+Writers serialize on an flock, so the log can be shared by several
+processes.
+
+The legacy free-text bookings.txt can be imported once with:
+
+    python -m actions.booking_store import-legacy [bookings.txt]
+"""
+
+import bisect
+import fcntl
+import json
+import os
+import sys
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, fields
+from functools import cached_property
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Text, Tuple
+
+from .dates import normalize_date
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BOOKINGS_PATH = os.environ.get(
+    "BOOKINGS_PATH", os.path.join(PROJECT_DIR, "bookings.jsonl"))
+LEGACY_BOOKINGS_PATH = os.path.join(PROJECT_DIR, "bookings.txt")
+
+SEPARATOR = "=" * 60
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Labels used by the legacy bookings.txt format, in output order
+LEGACY_LABELS = [
+    ("Guest Name", "guest_name"),
+    ("Email", "email"),
+    ("Phone", "phone"),
+    ("Check-in Date", "checkin_date"),
+    ("Check-out Date", "checkout_date"),
+    ("Number of Guests", "num_guests"),
+    ("Room Type", "room_type"),
+    ("Special Requests", "special_requests"),
+    ("Breakfast", "breakfast"),
+    ("Payment Method", "payment_method"),
+]
+
+# Fields with a secondary index, filtered by case-insensitive exact match
+INDEXED_FIELDS = ("email", "guest_name", "room_type", "payment_method")
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value: Any) -> Optional[bool]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text == "yes":
+        return True
+    if text == "no":
+        return False
+    return None
+
+
+def _to_day(timestamp: Optional[Text]) -> Optional[date]:
+    """Calendar day of a created_at timestamp"""
+    if timestamp:
+        try:
+            return date.fromisoformat(timestamp[:10])
+        except ValueError:
+            pass
+    return None
+
+
+def _to_text(value: Any) -> Optional[Text]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return None if text in ("", "None") else text
+
+
+@dataclass
+class Booking:
+    """A confirmed booking"""
+
+    guest_name: Optional[Text] = None
+    email: Optional[Text] = None
+    phone: Optional[Text] = None
+    checkin_date: Optional[Text] = None
+    checkout_date: Optional[Text] = None
+    num_guests: Optional[int] = None
+    room_type: Optional[Text] = None
+    special_requests: Optional[Text] = None
+    breakfast: Optional[bool] = None
+    payment_method: Optional[Text] = None
+    created_at: Optional[Text] = None
+    id: Optional[int] = None
+
+    @classmethod
+    def from_slots(cls, slots: Dict[Text, Any], created_at: Optional[Text] = None) -> "Booking":
+        """Build a booking from the booking_form slot values"""
+        reference = _to_day(created_at)
+        checkin = normalize_date(_to_text(slots.get("checkin_date")), reference)
+        checkout = normalize_date(_to_text(slots.get("checkout_date")), reference, anchor=checkin)
+        return cls(
+            guest_name=_to_text(slots.get("guest_name")),
+            email=_to_text(slots.get("email")),
+            phone=_to_text(slots.get("phone")),
+            checkin_date=checkin.isoformat() if checkin else _to_text(slots.get("checkin_date")),
+            checkout_date=checkout.isoformat() if checkout else _to_text(slots.get("checkout_date")),
+            num_guests=_to_int(slots.get("num_guests")),
+            room_type=_to_text(slots.get("room_type")),
+            special_requests=_to_text(slots.get("special_requests")),
+            breakfast=_to_bool(slots.get("breakfast")),
+            payment_method=_to_text(slots.get("payment_method")),
+            created_at=created_at,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[Text, Any]) -> "Booking":
+        return cls(**{k: v for k, v in data.items() if k in BOOKING_FIELDS})
+
+    def to_dict(self) -> Dict[Text, Any]:
+        return asdict(self)
+
+    def to_text(self) -> Text:
+        """Render the booking in the legacy bookings.txt layout"""
+        values = self.to_dict()
+        if self.breakfast is not None:
+            values["breakfast"] = "Yes" if self.breakfast else "No"
+        lines = [f"BOOKING CONFIRMATION - {self.created_at}", SEPARATOR]
+        lines += [f"{label}: {values[name]}" for label, name in LEGACY_LABELS]
+        return "\n".join(lines)
+
+    def checkin(self) -> Optional[date]:
+        """Check-in date, resolved against the booking time"""
+        stay = self.stay()
+        return stay[0] if stay else None
+
+    def stay(self) -> Optional[Tuple[date, date]]:
+        """
+        (check-in, check-out) dates, check-out exclusive.
+
+        Yearless dates roll forward to their next occurrence (check-out after
+        check-in); a missing or same-day check-out counts as a one-night stay.
+        """
+        return self._stay
+
+    @cached_property
+    def _stay(self) -> Optional[Tuple[date, date]]:
+        # Parsed once per record; bookings are not modified after loading.
+        # New records hold ISO dates; legacy free text is resolved against
+        # the booking time.
+        checkin = normalize_date(self.checkin_date, _to_day(self.created_at))
+        if checkin is None:
+            return None
+        checkout = normalize_date(self.checkout_date, checkin, anchor=checkin)
+        if checkout is None or checkout <= checkin:
+            checkout = checkin + timedelta(days=1)
+        return checkin, checkout
+
+
+BOOKING_FIELDS = frozenset(f.name for f in fields(Booking))
+
+
+def index_key(value: Any) -> Optional[Text]:
+    """Normalize a field value for secondary index lookups"""
+    if value is None:
+        return None
+    return str(value).strip().lower()
+
+
+def booking_matches(booking: Booking, filters: Dict[Text, Text],
+                    checkin_from: Optional[date] = None,
+                    checkin_to: Optional[date] = None) -> bool:
+    """Check a booking against field filters and an inclusive check-in range"""
+    for field, value in filters.items():
+        if index_key(getattr(booking, field)) != index_key(value):
+            return False
+    if checkin_from or checkin_to:
+        checkin = booking.checkin()
+        if checkin is None:
+            return False
+        if checkin_from and checkin < checkin_from:
+            return False
+        if checkin_to and checkin > checkin_to:
+            return False
+    return True
+
+
+class BookingStore:
+    """
+    Append-only JSONL booking log with an id -> offset index.
+
+    Appends hold an exclusive flock on "<path>.lock", so several action
+    server processes can share one log without interleaving records or
+    reusing ids.
+    """
+
+    def __init__(self, path: Text = DEFAULT_BOOKINGS_PATH,
+                 legacy_path: Optional[Text] = None) -> None:
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._offsets: Dict[int, int] = {}
+        self._indexed_to = 0
+        self._last_id = 0
+        self._fd: Optional[int] = None
+        self._mutex = threading.Lock()
+
+        # First run after switching formats: import bookings.txt once
+        if legacy_path and not os.path.exists(path) and os.path.exists(legacy_path):
+            import_legacy_bookings(legacy_path, path)
+
+    def _catch_up(self) -> None:
+        """Index records appended since the last scan (by any process); needs _mutex"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size < self._indexed_to:
+            # The log was replaced; start over
+            self._offsets.clear()
+            self._indexed_to = 0
+            self._last_id = 0
+        if size == self._indexed_to:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._indexed_to)
+            offset = self._indexed_to
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written record; pick it up next time
+                if line.strip():
+                    record_id = json.loads(line)["id"]
+                    self._offsets[record_id] = offset
+                    self._last_id = max(self._last_id, record_id)
+                offset += len(line)
+            self._indexed_to = offset
+
+    def _log_fd(self) -> int:
+        """Append descriptor for the log, reopened if the file was rotated"""
+        if self._fd is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self._fd).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def append(self, booking: Booking, fsync: bool = False) -> Booking:
+        """Assign an id to the booking and append it to the log"""
+        self.append_many([booking], fsync=fsync)
+        return booking
+
+    def append_many(self, bookings: List[Booking], fsync: bool = False,
+                    admit: Optional[Callable[[Booking], bool]] = None) -> List[Booking]:
+        """
+        Append a batch of bookings with a single write under the file lock.
+
+        Ids are assigned after catching up with records other processes
+        appended. With fsync=True the batch is on disk when this returns.
+        If given, admit(booking) is called under the lock (after the booking
+        has its id) and can refuse a booking, e.g. when its room is no
+        longer available. Returns the bookings that were written.
+        """
+        with self._mutex, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._catch_up()
+                last_id = self._last_id
+                accepted = []
+                lines = []
+                for booking in bookings:
+                    booking.id = self._last_id + 1
+                    if admit is not None and not admit(booking):
+                        booking.id = None
+                        continue
+                    self._last_id = booking.id
+                    accepted.append(booking)
+                    lines.append((json.dumps(booking.to_dict(), ensure_ascii=False)
+                                  + "\n").encode("utf-8"))
+                if not lines:
+                    return accepted
+
+                try:
+                    fd = self._log_fd()
+                    offset = os.lseek(fd, 0, os.SEEK_END)
+                    os.write(fd, b"".join(lines))
+                    if fsync:
+                        os.fsync(fd)
+                except BaseException:
+                    # Ids are taken from the log again by the next _catch_up()
+                    self._last_id = last_id
+                    raise
+
+                if offset == self._indexed_to:
+                    for booking, line in zip(accepted, lines):
+                        self._offsets[booking.id] = offset
+                        offset += len(line)
+                    self._indexed_to = offset
+                return accepted
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def sync(self) -> None:
+        """Flush everything appended so far to disk"""
+        with self._mutex:
+            if self._fd is not None:
+                os.fsync(self._fd)
+
+    def get(self, booking_id: int) -> Optional[Booking]:
+        """Read a single booking by id with one seek"""
+        with self._mutex:
+            self._catch_up()
+            offset = self._offsets.get(booking_id)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return Booking.from_dict(json.loads(f.readline()))
+
+    def __iter__(self) -> Iterator[Booking]:
+        return self.iter_bookings()
+
+    def iter_bookings(self, filters: Optional[Dict[Text, Text]] = None,
+                      checkin_from: Optional[date] = None,
+                      checkin_to: Optional[date] = None) -> Iterator[Booking]:
+        """Stream (optionally filtered) bookings without loading the whole log"""
+        filters = filters or {}
+        filtered = bool(filters or checkin_from or checkin_to)
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not (line.endswith(b"\n") and line.strip()):
+                        continue
+                    booking = Booking.from_dict(json.loads(line))
+                    if not filtered or booking_matches(booking, filters,
+                                                       checkin_from, checkin_to):
+                        yield booking
+        except FileNotFoundError:
+            return
+
+    def __len__(self) -> int:
+        with self._mutex:
+            self._catch_up()
+            return len(self._offsets)
+
+
+class BookingView:
+    """
+    Parsed in-memory view of the booking log for readers like the API.
+
+    refresh() compares the file's (inode, size, mtime) with what was last
+    read. If the file only grew, just the appended bytes are parsed; if it
+    was truncated, rewritten or rotated, the view is rebuilt from scratch.
+    Polling an unchanged log costs one stat() call.
+
+    Secondary indexes (per INDEXED_FIELDS value, and a sorted check-in date
+    index) are extended as records are read, so they stay current with
+    whatever the action server appends.
+    """
+
+    def __init__(self, path: Text = DEFAULT_BOOKINGS_PATH) -> None:
+        self.path = path
+        self.reloads = 0
+        self._inode: Optional[int] = None
+        self._mtime_ns: Optional[int] = None
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self.bookings: List[Booking] = []
+        self._offset = 0
+        self._ids: List[int] = []
+        # field -> normalized value -> positions in self.bookings (ascending)
+        self._indexes: Dict[Text, Dict[Text, List[int]]] = {
+            field: {} for field in INDEXED_FIELDS}
+        # (check-in ordinal, position); sorted lazily before range queries
+        self._checkin: List[Tuple[int, int]] = []
+        self._checkin_sorted = True
+
+    @property
+    def version(self) -> Text:
+        """Changes whenever the set of visible bookings changes"""
+        return f"{self._inode or 0:x}-{self._offset:x}"
+
+    @property
+    def last_modified(self) -> Optional[float]:
+        """Modification time (epoch seconds) of the log as last read"""
+        return self._mtime_ns / 1e9 if self._mtime_ns is not None else None
+
+    def _reset(self) -> None:
+        self._clear()
+        self.reloads += 1
+
+    def refresh(self) -> bool:
+        """Bring the view up to date; returns True if anything changed"""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                changed = bool(self.bookings) or self._inode is not None
+                self._inode = None
+                self._mtime_ns = None
+                if changed:
+                    self._reset()
+                return changed
+
+            if (st.st_ino, st.st_size, st.st_mtime_ns) == (
+                    self._inode, self._offset, self._mtime_ns):
+                return False
+
+            if (st.st_ino != self._inode or st.st_size < self._offset
+                    or (st.st_size == self._offset and st.st_mtime_ns != self._mtime_ns)):
+                # Rotated, truncated or rewritten in place
+                self._reset()
+
+            self._inode = st.st_ino
+            self._mtime_ns = st.st_mtime_ns
+            if st.st_size > self._offset:
+                self._read_from(self._offset)
+            return True
+
+    def _read_from(self, offset: int) -> None:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written record; pick it up next time
+                offset += len(line)
+                if line.strip():
+                    self._add(Booking.from_dict(json.loads(line)))
+        self._offset = offset
+
+    def _add(self, booking: Booking) -> None:
+        position = len(self.bookings)
+        self.bookings.append(booking)
+        self._ids.append(booking.id or 0)
+        for field in INDEXED_FIELDS:
+            key = index_key(getattr(booking, field))
+            if key:
+                self._indexes[field].setdefault(key, []).append(position)
+        checkin = booking.checkin()
+        if checkin is not None:
+            self._checkin.append((checkin.toordinal(), position))
+            self._checkin_sorted = False
+
+    def query(self, filters: Optional[Dict[Text, Text]] = None,
+              checkin_from: Optional[date] = None,
+              checkin_to: Optional[date] = None,
+              cursor: Optional[int] = None,
+              limit: int = 50) -> Tuple[List[Booking], Optional[int], int]:
+        """
+        Find bookings matching every filter, in id order.
+
+        The smallest matching index list drives the scan, so a selective
+        filter never touches unrelated bookings. Returns the page, the
+        cursor for the next page (None on the last page) and the total
+        number of matches.
+        """
+        filters = filters or {}
+        with self._lock:
+            candidates: List[Sequence[int]] = [
+                self._indexes[field].get(index_key(value), [])
+                for field, value in filters.items()
+            ]
+            if checkin_from or checkin_to:
+                if not self._checkin_sorted:
+                    # Timsort is ~linear on a sorted prefix plus a short new tail
+                    self._checkin.sort()
+                    self._checkin_sorted = True
+                low = (checkin_from.toordinal(), -1) if checkin_from else (float("-inf"), -1)
+                high = (checkin_to.toordinal(), len(self.bookings)) if checkin_to else (float("inf"), 0)
+                start = bisect.bisect_left(self._checkin, low)
+                end = bisect.bisect_right(self._checkin, high)
+                candidates.append(sorted(pos for _, pos in self._checkin[start:end]))
+
+            if not candidates:
+                matches: Sequence[int] = range(len(self.bookings))
+            elif len(candidates) == 1:
+                matches = candidates[0]
+            else:
+                matches = [
+                    pos for pos in min(candidates, key=len)
+                    if booking_matches(self.bookings[pos], filters,
+                                       checkin_from, checkin_to)
+                ]
+
+            start = 0
+            if cursor is not None:
+                start = bisect.bisect_right(matches, cursor, key=self._ids.__getitem__)
+            page_positions = matches[start:start + limit]
+            page = [self.bookings[pos] for pos in page_positions]
+            next_cursor = None
+            if start + limit < len(matches) and page:
+                next_cursor = page[-1].id
+            return page, next_cursor, len(matches)
+
+
+def parse_legacy_bookings(content: Text) -> List[Booking]:
+    """Parse the free-text blocks written to bookings.txt"""
+    bookings = []
+    current: Optional[Dict[Text, Any]] = None
+    labels = dict(LEGACY_LABELS)
+
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if line.startswith("BOOKING CONFIRMATION - "):
+            if current is not None:
+                bookings.append(Booking.from_slots(current, current.pop("_created_at")))
+            current = {"_created_at": line[len("BOOKING CONFIRMATION - "):].strip()}
+        elif current is not None and ":" in line:
+            label, value = line.split(":", 1)
+            name = labels.get(label.strip())
+            if name:
+                current[name] = value.strip()
+
+    if current is not None:
+        bookings.append(Booking.from_slots(current, current.pop("_created_at")))
+    return bookings
+
+
+def import_legacy_bookings(legacy_path: Text, path: Text = DEFAULT_BOOKINGS_PATH) -> int:
+    """
+    One-shot import of bookings.txt into a new JSONL log.
+
+    The log is built in a temporary file and linked into place, so two
+    processes importing at the same time cannot both write it.
+    Returns the number of imported bookings (0 if the log already exists).
+    """
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        bookings = parse_legacy_bookings(f.read())
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".import")
+    try:
+        # mkstemp creates the file 0600; use the mode the store opens its log with
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for booking_id, booking in enumerate(bookings, start=1):
+                booking.id = booking_id
+                f.write(json.dumps(booking.to_dict(), ensure_ascii=False) + "\n")
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return 0
+    finally:
+        os.unlink(tmp_path)
+    return len(bookings)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "import-legacy":
+        print("Usage: python -m actions.booking_store import-legacy [bookings.txt]")
+        sys.exit(1)
+
+    source = sys.argv[2] if len(sys.argv) > 2 else LEGACY_BOOKINGS_PATH
+    imported = import_legacy_bookings(source)
+    if imported:
+        print(f"✅ Imported {imported} bookings from {source} into {DEFAULT_BOOKINGS_PATH}")
+    else:
+        print(f"⚠️  {DEFAULT_BOOKINGS_PATH} already exists, nothing imported")
@@ -0,0 +1,240 @@
+"""
+Group-commit writer for the booking log.
+
+ActionConfirmBooking hands records to a BookingWriter, whose background
+thread drains everything queued, appends it with one locked write and makes
+it durable before resolving the callers' futures. Under bursts, many
+confirmations share one open/write/fsync instead of paying for it each.
+
+Durability modes:
+- "batch":    fsync after every batch (default)
+- "interval": fsync at most every fsync_interval seconds; confirmations
+              wait for the fsync that covers them
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple
+
+from .booking_store import Booking, BookingStore
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("batch", "interval")
+
+
+class BookingRejected(Exception):
+    """The admission check refused a booking (e.g. its room sold out)"""
+
+
+class BookingWriter:
+    """
+    Queues bookings and flushes them to a BookingStore in batches.
+
+    An optional admit(booking) callback runs under the store's file lock,
+    so checks like room availability are atomic across processes. If a
+    batch then fails to write, release(booking) is called for each of its
+    bookings to undo what admit did.
+    """
+
+    def __init__(self, store: BookingStore, durability: Text = "batch",
+                 fsync_interval: float = 0.05, max_batch: int = 256,
+                 admit: Optional[Callable[[Booking], bool]] = None,
+                 release: Optional[Callable[[Booking], None]] = None) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.store = store
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.admit = admit
+        self.release = release
+
+        self._queue: "queue.Queue[Optional[Tuple[Booking, Future]]]" = queue.Queue()
+        # Written but not yet fsynced (interval mode only)
+        self._unsynced: List[Tuple[Booking, Future]] = []
+        self._last_sync = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "records": 0,
+            "batches": 0,
+            "fsyncs": 0,
+            "errors": 0,
+            "rejected": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def submit(self, booking: Booking) -> "Future[Booking]":
+        """Queue a booking; the future resolves once it is durable"""
+        self._ensure_started()
+        future: "Future[Booking]" = Future()
+        self._queue.put((booking, future))
+        return future
+
+    def write(self, booking: Booking, timeout: Optional[float] = None) -> Booking:
+        """Queue a booking and block until it is durable"""
+        return self.submit(booking).result(timeout=timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="booking-writer",
+                                                daemon=True)
+                self._thread.start()
+
+    def _next_timeout(self) -> Optional[float]:
+        if not self._unsynced:
+            return None
+        return max(0.0, self._last_sync + self.fsync_interval - time.monotonic())
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                self._sync()
+                continue
+
+            if item is None:
+                self._sync()
+                return
+
+            batch = [item]
+            stop = False
+            # Everything that queued up while the last flush ran joins this batch
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stop:
+                self._sync()
+                return
+
+    def _flush(self, batch: List[Tuple[Booking, Future]]) -> None:
+        started = time.perf_counter()
+        bookings = [booking for booking, _ in batch]
+        fsync = self.durability == "batch"
+        try:
+            accepted = self.store.append_many(bookings, fsync=fsync, admit=self.admit)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} bookings: {e}")
+            if self.release is not None:
+                for booking in bookings:
+                    self.release(booking)
+            self._record(len(batch), started, error=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        if len(accepted) < len(batch):
+            rejected = [item for item in batch if item[0].id is None]
+            batch = [item for item in batch if item[0].id is not None]
+            with self._stats_lock:
+                self._stats["rejected"] += len(rejected)
+            for booking, future in rejected:
+                future.set_exception(BookingRejected(
+                    f"{booking.room_type} is no longer available for those dates"))
+            if not batch:
+                return
+
+        self._record(len(batch), started, fsynced=fsync)
+        if fsync:
+            for booking, future in batch:
+                future.set_result(booking)
+        else:
+            self._unsynced.extend(batch)
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        if not self._unsynced:
+            return
+        pending, self._unsynced = self._unsynced, []
+        try:
+            self.store.sync()
+        except Exception as e:
+            logger.error(f"Failed to fsync booking log: {e}")
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        finally:
+            self._last_sync = time.monotonic()
+        with self._stats_lock:
+            self._stats["fsyncs"] += 1
+        for booking, future in pending:
+            future.set_result(booking)
+
+    def _record(self, size: int, started: float, error: bool = False,
+                fsynced: bool = False) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            stats = self._stats
+            stats["batches"] += 1
+            if error:
+                stats["errors"] += 1
+            else:
+                stats["records"] += size
+            if fsynced:
+                stats["fsyncs"] += 1
+            stats["max_batch_size"] = max(stats["max_batch_size"], size)
+            stats["last_flush_ms"] = elapsed_ms
+            stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed_ms)
+            stats["total_flush_ms"] += elapsed_ms
+
+    def stats(self) -> Dict[Text, Any]:
+        """Queue depth and flush latency counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats.pop("batches")
+        total_ms = stats.pop("total_flush_ms")
+        return {
+            "durability": self.durability,
+            "queue_depth": self._queue.qsize(),
+            "awaiting_fsync": len(self._unsynced),
+            "batches": batches,
+            "avg_flush_ms": total_ms / batches if batches else 0.0,
+            **stats,
+        }
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush everything queued and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+def create_booking_writer(store: BookingStore,
+                          admit: Optional[Callable[[Booking], bool]] = None,
+                          release: Optional[Callable[[Booking], None]] = None) -> BookingWriter:
+    """Build the process-wide writer from BOOKING_* environment variables"""
+    writer = BookingWriter(
+        store,
+        admit=admit,
+        release=release,
+        durability=os.environ.get("BOOKING_DURABILITY", "batch"),
+        fsync_interval=float(os.environ.get("BOOKING_FSYNC_INTERVAL", "0.05")),
+        max_batch=int(os.environ.get("BOOKING_MAX_BATCH", "256")),
+    )
+    atexit.register(writer.close)
+    return writer
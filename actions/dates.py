@@ -0,0 +1,190 @@
+"""
+Date parsing for booking dates.
+
+Turns the free-text dates accepted by the booking form ("10th November",
+"November 10", "10/11/2024", "2024-11-10") into datetime.date objects.
+Dates without a year are resolved against a reference date.
+
+normalize_date() also resolves relative forms ("tomorrow", "next Friday",
+"in 3 days", "for 2 nights") and is memoized on (text, reference day), so
+the booking form can store canonical ISO dates and nothing downstream has
+to parse free text again.
+"""
+
+import calendar
+import os
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional, Text, Tuple
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11,
+    "december": 12,
+}
+MONTH_NAMES = "|".join(MONTHS)
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4,
+    "saturday": 5, "sunday": 6,
+}
+WEEKDAY_NAMES = "|".join(WEEKDAYS)
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+COUNT = rf"(\d{{1,3}}|{'|'.join(NUMBER_WORDS)})"
+DATE_CACHE_SIZE = int(os.environ.get("DATE_CACHE_SIZE", "4096"))
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{4})\b")
+DAY_MONTH = re.compile(
+    rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({MONTH_NAMES})\b(?:,?\s+(\d{{4}}))?")
+MONTH_DAY = re.compile(
+    rf"\b({MONTH_NAMES})\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}}))?")
+
+DAY_AFTER_TOMORROW = re.compile(r"\bday\s+after\s+tomorrow\b")
+TOMORROW = re.compile(r"\btomorrow\b")
+TODAY = re.compile(r"\b(?:today|tonight)\b")
+IN_PERIOD = re.compile(rf"\bin\s+{COUNT}\s+(day|week)s?\b")
+NIGHTS = re.compile(rf"\b{COUNT}\s+nights?\b")
+NEXT_PERIOD = re.compile(r"\bnext\s+(week|weekend|month)\b")
+WEEKDAY = re.compile(rf"\b({WEEKDAY_NAMES})\b")
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _count(value: Text) -> int:
+    return NUMBER_WORDS[value] if value in NUMBER_WORDS else int(value)
+
+
+def _add_month(day: date) -> date:
+    year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _parse_absolute(lowered: Text, reference: date) -> Optional[Tuple[Optional[date], bool]]:
+    """(date, year given) for the first absolute date in the text"""
+    match = ISO_DATE.search(lowered)
+    if match:
+        return _safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3))), True
+
+    match = NUMERIC_DATE.search(lowered)
+    if match:
+        return _safe_date(int(match.group(3)), int(match.group(2)), int(match.group(1))), True
+
+    match = DAY_MONTH.search(lowered)
+    if match:
+        year = int(match.group(3)) if match.group(3) else reference.year
+        return _safe_date(year, MONTHS[match.group(2)], int(match.group(1))), bool(match.group(3))
+
+    match = MONTH_DAY.search(lowered)
+    if match:
+        year = int(match.group(3)) if match.group(3) else reference.year
+        return _safe_date(year, MONTHS[match.group(1)], int(match.group(2))), bool(match.group(3))
+
+    return None
+
+
+def parse_date(text: Optional[Text], reference: Optional[date] = None) -> Optional[date]:
+    """
+    Parse an absolute date from free text.
+
+    Numeric dates are read day first (10/11/2024 is 10 November), matching
+    the examples the bot gives. Dates without a year take the reference
+    date's year. Returns None if no date is found.
+    """
+    if not text:
+        return None
+    text = str(text)
+    if len(text) == 10 and text[4] == "-":
+        # Fast path for canonical ISO dates
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            pass
+    parsed = _parse_absolute(text.lower(), reference or date.today())
+    return parsed[0] if parsed else None
+
+
+def _resolve_relative(text: Text, reference: date, anchor: Optional[date]) -> Optional[date]:
+    if DAY_AFTER_TOMORROW.search(text):
+        return reference + timedelta(days=2)
+    if TOMORROW.search(text):
+        return reference + timedelta(days=1)
+    if TODAY.search(text):
+        return reference
+
+    match = IN_PERIOD.search(text)
+    if match:
+        days = _count(match.group(1)) * (7 if match.group(2) == "week" else 1)
+        return reference + timedelta(days=days)
+
+    match = NIGHTS.search(text)
+    if match and anchor is not None:
+        return anchor + timedelta(days=_count(match.group(1)))
+
+    match = NEXT_PERIOD.search(text)
+    if match:
+        period = match.group(1)
+        if period == "week":
+            return reference + timedelta(days=7)
+        if period == "month":
+            return _add_month(reference)
+        # next weekend: the coming Saturday
+        return reference + timedelta(days=(5 - reference.weekday() - 1) % 7 + 1)
+
+    match = WEEKDAY.search(text)
+    if match:
+        # "Friday", "this Friday" and "next Friday" all mean the coming one
+        ahead = (WEEKDAYS[match.group(1)] - reference.weekday() - 1) % 7 + 1
+        return reference + timedelta(days=ahead)
+
+    return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _normalize(text: Text, reference: date, anchor: Optional[date]) -> Optional[date]:
+    parsed = _parse_absolute(text, reference)
+    if parsed:
+        day, year_given = parsed
+        if day is not None and not year_given and day < reference:
+            # A yearless date that has already passed means next year's
+            day = _safe_date(day.year + 1, day.month, day.day)
+        return day
+    return _resolve_relative(text, reference, anchor)
+
+
+def normalize_date(text: Optional[Text], reference: Optional[date] = None,
+                   anchor: Optional[date] = None) -> Optional[date]:
+    """
+    Resolve an absolute or relative date to a datetime.date.
+
+    Relative forms count from the reference day (default today); yearless
+    dates that have already passed roll over to the next year. "N nights"
+    counts from anchor (the check-in date) and needs one. Results are
+    cached per (normalized text, reference day, anchor).
+    """
+    if not text:
+        return None
+    text = str(text)
+    if len(text) == 10 and text[4] == "-":
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            pass
+    key = " ".join(text.lower().split())
+    return _normalize(key, reference or date.today(), anchor)
+
+
+def format_date(value: Optional[Text]) -> Optional[Text]:
+    """Render an ISO date for guests ("Tuesday, 10 November 2026")"""
+    try:
+        return date.fromisoformat(str(value)).strftime("%A, %d %B %Y")
+    except ValueError:
+        return value
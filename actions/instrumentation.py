@@ -0,0 +1,138 @@
+"""
+Prometheus metrics for the action server.
+
+rasa_sdk's own web server cannot take extra routes, so the metrics are
+served from a separate port: GET http://<host>:ACTION_METRICS_PORT/metrics
+(default 5056, 0 turns it off).
+
+    action_runs_total{action,outcome}        runs that returned or raised
+    action_duration_seconds{action}          time in run()
+    slot_validations_total{slot}             validate_<slot> calls
+    slot_rejections_total{slot}              ... that rejected the value
+    slot_validation_duration_seconds{slot}   time in validate_<slot>
+    booking_writes_total{outcome}            saved, rejected (sold out), failed, timeout
+    booking_write_duration_seconds           submit until durable (or not)
+
+BookingWriter.stats(), read at scrape time once watch_booking_writer() is called:
+
+    booking_writer_queue_depth               bookings waiting for the writer thread
+    booking_writer_awaiting_fsync            written, waiting for an fsync (interval mode)
+    booking_writer_flush_seconds{stat}       last, max and avg time per batch flush
+    booking_writer_fsyncs_total              fsyncs of the booking log
+    booking_writer_errors_total              batches that failed to write
+    booking_writer_rejected_total            bookings refused by the admission check
+"""
+
+import asyncio
+import functools
+import os
+import time
+from typing import Any, Callable, Optional, Text
+
+from .metrics import FAST_BUCKETS, Registry, start_metrics_server
+
+registry = Registry()
+
+action_runs = registry.counter(
+    "action_runs_total", "Custom action runs by outcome", ("action", "outcome"))
+action_duration = registry.histogram(
+    "action_duration_seconds", "Time spent in a custom action's run()", ("action",))
+slot_validations = registry.counter(
+    "slot_validations_total", "booking_form slot validations", ("slot",))
+slot_rejections = registry.counter(
+    "slot_rejections_total", "booking_form slot values rejected by validation", ("slot",))
+slot_validation_duration = registry.histogram(
+    "slot_validation_duration_seconds", "Time spent validating a booking_form slot",
+    ("slot",), buckets=FAST_BUCKETS)
+booking_writes = registry.counter(
+    "booking_writes_total", "Booking confirmations by write outcome", ("outcome",))
+booking_write_duration = registry.histogram(
+    "booking_write_duration_seconds", "Time from submitting a booking until it is durable")
+
+_booking_writer: Optional[Any] = None
+
+
+def watch_booking_writer(writer: Any) -> None:
+    """Export a BookingWriter's stats() through the booking_writer_* metrics"""
+    global _booking_writer
+    _booking_writer = writer
+
+
+def _writer_stat(name: Text) -> Optional[float]:
+    return _booking_writer.stats()[name] if _booking_writer is not None else None
+
+
+def _writer_flush_seconds() -> Any:
+    if _booking_writer is None:
+        return None
+    stats = _booking_writer.stats()
+    return {(stat,): stats[f"{stat}_flush_ms"] / 1000 for stat in ("last", "max", "avg")}
+
+
+registry.gauge("booking_writer_queue_depth", "Bookings waiting for the writer thread",
+               callback=lambda: _writer_stat("queue_depth"))
+registry.gauge("booking_writer_awaiting_fsync", "Bookings written but not yet fsynced",
+               callback=lambda: _writer_stat("awaiting_fsync"))
+registry.gauge("booking_writer_flush_seconds", "Time per booking batch flush (last, max, avg)",
+               ("stat",), callback=_writer_flush_seconds)
+registry.counter("booking_writer_fsyncs_total", "fsyncs of the booking log",
+                 callback=lambda: _writer_stat("fsyncs"))
+registry.counter("booking_writer_errors_total", "Booking batches that failed to write",
+                 callback=lambda: _writer_stat("errors"))
+registry.counter("booking_writer_rejected_total",
+                 "Bookings refused by the writer's admission check",
+                 callback=lambda: _writer_stat("rejected"))
+
+
+def timed_action(run: Callable) -> Callable:
+    """Count and time an Action.run (sync or async) under the action's name"""
+
+    def record(action: Any, started: float, outcome: Text) -> None:
+        name = action.name()
+        action_duration.observe(time.perf_counter() - started, name)
+        action_runs.inc(name, outcome)
+
+    if asyncio.iscoroutinefunction(run):
+        @functools.wraps(run)
+        async def async_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                result = await run(self, *args, **kwargs)
+            except Exception:
+                record(self, started, "error")
+                raise
+            record(self, started, "ok")
+            return result
+        return async_wrapper
+
+    @functools.wraps(run)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            result = run(self, *args, **kwargs)
+        except Exception:
+            record(self, started, "error")
+            raise
+        record(self, started, "ok")
+        return result
+    return wrapper
+
+
+def timed_validation(validate: Callable) -> Callable:
+    """Count, time and track rejections of a validate_<slot> method"""
+    slot = validate.__name__[len("validate_"):]
+
+    @functools.wraps(validate)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        result = validate(self, *args, **kwargs)
+        slot_validation_duration.observe(time.perf_counter() - started, slot)
+        slot_validations.inc(slot)
+        if result.get(slot) is None:
+            slot_rejections.inc(slot)
+        return result
+    return wrapper
+
+
+def start_action_metrics_server() -> None:
+    start_metrics_server(registry, int(os.environ.get("ACTION_METRICS_PORT", "5056")))
@@ -0,0 +1,229 @@
+"""
+Room inventory and availability.
+
+Each room type has a configured number of rooms (inventory.yml) and an
+OccupancyTree over booked nights. The tree is a lazy segment tree supporting
+"add a stay" and "peak rooms in use over a date range" in O(log n), so
+availability checks stay fast no matter how many bookings exist. Stays that
+ended before the tracker started are never indexed, so historical bookings
+cost nothing after the initial scan.
+"""
+
+import os
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set, Text, Tuple
+
+from .booking_store import PROJECT_DIR, Booking, BookingView
+
+DEFAULT_ROOM_INVENTORY = {"Single": 10, "Double": 10, "Suite": 4, "Deluxe": 4}
+INVENTORY_PATH = os.environ.get("INVENTORY_PATH",
+                                os.path.join(PROJECT_DIR, "inventory.yml"))
+
+
+def load_room_inventory(path: Text = INVENTORY_PATH) -> Dict[Text, int]:
+    """Read room counts per type from inventory.yml (defaults if missing)"""
+    if not os.path.exists(path):
+        return dict(DEFAULT_ROOM_INVENTORY)
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    rooms = config.get("room_inventory") or {}
+    return {str(room).capitalize(): int(count) for room, count in rooms.items()}
+
+
+class OccupancyTree:
+    """
+    Segment tree over a window of days with range add and range max.
+
+    Day d maps to leaf (d - start). The window doubles when a stay ends
+    beyond it; days before start are clipped (they are in the past).
+    """
+
+    def __init__(self, start: int, size: int = 512) -> None:
+        self.start = start
+        self._intervals: List[Tuple[int, int, int]] = []
+        self._allocate(size)
+
+    def _allocate(self, size: int) -> None:
+        self.size = size
+        # _peak[n]: max over the node's range including _pending[n]
+        self._peak = [0] * (2 * size)
+        self._pending = [0] * (2 * size)
+
+    def _grow(self, last: int) -> None:
+        size = self.size
+        while self.start + size <= last:
+            size *= 2
+        self._allocate(size)
+        for first, end, amount in self._intervals:
+            self._update(1, 0, size - 1, first - self.start, end - self.start, amount)
+
+    def add(self, first: int, last: int, amount: int = 1) -> None:
+        """Add amount to every day in [first, last] (ordinals, inclusive)"""
+        first = max(first, self.start)
+        if last < first:
+            return
+        if last >= self.start + self.size:
+            self._grow(last)
+        self._intervals.append((first, last, amount))
+        self._update(1, 0, self.size - 1, first - self.start, last - self.start, amount)
+
+    def peak(self, first: int, last: int) -> int:
+        """Maximum occupancy on any day in [first, last]"""
+        first = max(first, self.start)
+        last = min(last, self.start + self.size - 1)
+        if last < first:
+            return 0
+        return self._query(1, 0, self.size - 1, first - self.start, last - self.start)
+
+    def _update(self, node: int, lo: int, hi: int, left: int, right: int, amount: int) -> None:
+        if right < lo or hi < left:
+            return
+        if left <= lo and hi <= right:
+            self._peak[node] += amount
+            self._pending[node] += amount
+            return
+        mid = (lo + hi) // 2
+        self._update(2 * node, lo, mid, left, right, amount)
+        self._update(2 * node + 1, mid + 1, hi, left, right, amount)
+        self._peak[node] = self._pending[node] + max(self._peak[2 * node],
+                                                     self._peak[2 * node + 1])
+
+    def _query(self, node: int, lo: int, hi: int, left: int, right: int) -> int:
+        if right < lo or hi < left:
+            return 0
+        if left <= lo and hi <= right:
+            return self._peak[node]
+        mid = (lo + hi) // 2
+        return self._pending[node] + max(
+            self._query(2 * node, lo, mid, left, right),
+            self._query(2 * node + 1, mid + 1, hi, left, right),
+        )
+
+
+class Inventory:
+    """Room counts plus one OccupancyTree per room type"""
+
+    def __init__(self, rooms: Dict[Text, int], today: Optional[date] = None) -> None:
+        self.rooms = dict(rooms)
+        self.start = (today or date.today()).toordinal()
+        self._trees = {room: OccupancyTree(self.start) for room in self.rooms}
+
+    def add_stay(self, room_type: Text, checkin: date, checkout: date) -> None:
+        tree = self._trees.get(room_type.capitalize())
+        if tree is not None and checkout > checkin:
+            # Nights run from check-in up to the day before check-out
+            tree.add(checkin.toordinal(), checkout.toordinal() - 1)
+
+    def remove_stay(self, room_type: Text, checkin: date, checkout: date) -> None:
+        tree = self._trees.get(room_type.capitalize())
+        if tree is not None and checkout > checkin:
+            tree.add(checkin.toordinal(), checkout.toordinal() - 1, -1)
+
+    def available(self, room_type: Text, checkin: date, checkout: date) -> int:
+        """Rooms of this type free on every night of the stay"""
+        room_type = room_type.capitalize()
+        if room_type not in self.rooms:
+            return 0
+        if checkout <= checkin:
+            checkout = checkin + timedelta(days=1)
+        peak = self._trees[room_type].peak(checkin.toordinal(), checkout.toordinal() - 1)
+        return max(0, self.rooms[room_type] - peak)
+
+    def summary(self, checkin: date, checkout: date) -> Dict[Text, Dict[Text, int]]:
+        """Per room type: total rooms, peak booked and available for a stay"""
+        result = {}
+        for room_type, total in self.rooms.items():
+            available = self.available(room_type, checkin, checkout)
+            result[room_type] = {
+                "total": total,
+                "booked": total - available,
+                "available": available,
+            }
+        return result
+
+
+class InventoryTracker:
+    """
+    Keeps an Inventory in sync with the booking log.
+
+    refresh() tails the log through a BookingView and only indexes new
+    bookings. reserve() is the admission hook for BookingWriter: it runs
+    under the log's file lock, re-checks availability against everything
+    on disk, and counts the booking right away so later bookings in the
+    same batch see it. release() takes the booking back out if its batch
+    then fails to write.
+    """
+
+    def __init__(self, view: BookingView, rooms: Optional[Dict[Text, int]] = None) -> None:
+        self.view = view
+        self.rooms = rooms if rooms is not None else load_room_inventory()
+        self._lock = threading.RLock()
+        self._reserved: Set[int] = set()
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.inventory = Inventory(self.rooms)
+        self._applied = 0
+        self._reloads = self.view.reloads
+
+    def refresh(self) -> Inventory:
+        with self._lock:
+            self.view.refresh()
+            if self.view.reloads != self._reloads:
+                self._rebuild()
+                self._reserved.clear()
+            bookings = self.view.bookings
+            for booking in bookings[self._applied:]:
+                if booking.id in self._reserved:
+                    self._reserved.discard(booking.id)
+                else:
+                    self._add(booking)
+            self._applied = len(bookings)
+            return self.inventory
+
+    def _add(self, booking: Booking) -> None:
+        stay = booking.stay()
+        if stay and booking.room_type:
+            self.inventory.add_stay(booking.room_type, *stay)
+
+    def available(self, room_type: Text, checkin: date, checkout: date) -> int:
+        with self._lock:
+            return self.refresh().available(room_type, checkin, checkout)
+
+    def summary(self, checkin: date, checkout: date) -> Dict[Text, Dict[Text, int]]:
+        with self._lock:
+            return self.refresh().summary(checkin, checkout)
+
+    def reserve(self, booking: Booking) -> bool:
+        """Admit a booking only if its room is still free for the whole stay"""
+        with self._lock:
+            self.refresh()
+            stay = booking.stay()
+            if stay is None or not booking.room_type:
+                return True  # nothing to check against
+            if self.inventory.available(booking.room_type, *stay) < 1:
+                return False
+            self.inventory.add_stay(booking.room_type, *stay)
+            if booking.id is not None:
+                self._reserved.add(booking.id)
+            return True
+
+    def release(self, booking: Booking) -> None:
+        """Undo reserve() for a booking that was never written"""
+        with self._lock:
+            if booking.id not in self._reserved:
+                return
+            self._reserved.discard(booking.id)
+            stay = booking.stay()
+            if stay and booking.room_type:
+                self.inventory.remove_stay(booking.room_type, *stay)
+
+    def stats(self) -> Dict[Text, Any]:
+        with self._lock:
+            return {
+                "rooms": dict(self.rooms),
+                "indexed_bookings": self._applied,
+            }
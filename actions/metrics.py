@@ -0,0 +1,242 @@
+"""
+Minimal Prometheus metrics: counters, gauges and histograms rendered in the
+text exposition format (version 0.0.4).
+
+Shared by the action server and the gateway. There is no dependency on
+prometheus_client. Every update is one dict lookup plus a short locked
+section, and label values are passed positionally, so instrumented hot
+paths stay cheap enough to leave on in production:
+
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    requests.inc("/chat")
+    latency = registry.histogram("request_seconds", "Latency", ("route",))
+    latency.observe(0.042, "/chat")
+    registry.render()  # text for GET /metrics
+"""
+
+import bisect
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Text, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request latencies from a few ms (cache hits) to timeouts
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds; in-process work such as slot validation
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+
+def _escape(value: Any) -> Text:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> Text:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+    callback: Optional[Callable[[], Any]] = None
+
+    def __init__(self, name: Text, documentation: Text, labelnames: Sequence[Text] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels(self, values: Tuple[Any, ...], extra: Text = "") -> Text:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _called_values(self) -> List[Tuple[Tuple[Any, ...], Any]]:
+        """(labels, value) pairs from callback(): a number or a dict of them"""
+        try:
+            result = self.callback()
+        except Exception as e:
+            logger.error(f"Metric {self.name} callback failed: {e}")
+            return []
+        return list(result.items()) if isinstance(result, dict) else [((), result)]
+
+    def header(self) -> List[Text]:
+        return [f"# HELP {self.name} {_escape(self.documentation)}",
+                f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[Text]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonic count per label combination (name should end in _total).
+    With callback, counts kept elsewhere are read at scrape time, like a
+    Gauge callback.
+    """
+
+    kind = "counter"
+
+    def __init__(self, *args: Any, callback: Optional[Callable[[], Any]] = None,
+                 **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[Any, ...], float] = {}
+        self.callback = callback
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[Text]:
+        if self.callback is not None:
+            values = self._called_values()
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{self._labels(labels)} {_format_value(value)}"
+                for labels, value in values if value is not None]
+
+
+class Gauge(_Metric):
+    """
+    Current value per label combination. With callback, the value is read
+    at scrape time instead: callback() returns a number, or a dict of
+    label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, *args: Any, callback: Optional[Callable[[], Any]] = None,
+                 **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[Any, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *labels: Any) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> List[Text]:
+        if self.callback is not None:
+            values = self._called_values()
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{self._labels(labels)} {_format_value(value)}"
+                for labels, value in values if value is not None]
+
+
+class Histogram(_Metric):
+    """Observations in fixed cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, *args: Any, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._values: Dict[Tuple[Any, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self) -> List[Text]:
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        lines = []
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """A set of metrics rendered together on one /metrics page"""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def _add(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: Text, documentation: Text, labelnames: Sequence[Text] = (),
+                callback: Optional[Callable[[], Any]] = None) -> Counter:
+        return self._add(Counter(name, documentation, labelnames, callback=callback))
+
+    def gauge(self, name: Text, documentation: Text, labelnames: Sequence[Text] = (),
+              callback: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames, callback=callback))
+
+    def histogram(self, name: Text, documentation: Text, labelnames: Sequence[Text] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def render(self) -> Text:
+        lines: List[Text] = []
+        for metric in self._metrics:
+            lines += metric.header()
+            lines += metric.samples()
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(registry: Registry, port: int,
+                         host: Text = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve GET /metrics on its own port from a daemon thread (port 0: off)"""
+    if not port:
+        return None
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: Text, *args: Any) -> None:
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.error(f"Metrics server not started on port {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
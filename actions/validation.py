@@ -0,0 +1,229 @@
+"""
+Validation engine for the booking form.
+
+All patterns and keyword tables are built once at import time. Each
+validator takes the raw slot value and returns a ValidationResult in a
+single pass: the canonical value to store, or None plus the message to
+send back to the guest.
+
+The module has no Rasa dependencies, so the gateway can run the same
+checks in-process.
+"""
+
+import re
+from datetime import date
+from typing import Any, Callable, Dict, NamedTuple, Optional, Text
+
+from .dates import normalize_date
+
+
+class ValidationResult(NamedTuple):
+    value: Any
+    message: Optional[Text] = None
+
+    @property
+    def valid(self) -> bool:
+        return self.value is not None
+
+
+def _reject(message: Text) -> ValidationResult:
+    return ValidationResult(None, message)
+
+
+WORD = re.compile(r"[a-z]+")
+
+# --- guest_name -------------------------------------------------------------
+
+NAME_CHARS = re.compile(r"^[a-zA-Z\s]+$")
+NAME_REQUEST_WORDS = re.compile(r"want|need|book|room|hotel|reservation")
+
+
+def validate_guest_name(slot_value: Any) -> ValidationResult:
+    name = str(slot_value or "")
+    stripped = name.strip()
+
+    if len(stripped) < 2:
+        return _reject("Please provide a valid name (at least 2 characters).")
+    if not NAME_CHARS.match(name):
+        return _reject("Please provide a valid name (letters only).")
+    if len(stripped) < 3:
+        return _reject("Please provide a full name (at least 3 characters).")
+    if len(stripped.split()) > 4:
+        return _reject("Please provide your actual name (first and last name).")
+    if NAME_REQUEST_WORDS.search(name.lower()):
+        return _reject("Please provide your actual name, not a request.")
+    return ValidationResult(stripped.title())
+
+
+# --- email / phone ----------------------------------------------------------
+
+EMAIL = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+PHONE_FORMATTING = re.compile(r"[\s\-\(\)\.]")
+PHONE = re.compile(r"^\+?[0-9]{7,15}$")
+
+
+def validate_email(slot_value: Any) -> ValidationResult:
+    if not slot_value or not EMAIL.match(str(slot_value)):
+        return _reject("Please provide a valid email address (e.g., name@example.com).")
+    return ValidationResult(str(slot_value).lower().strip())
+
+
+def validate_phone(slot_value: Any) -> ValidationResult:
+    if not PHONE.match(PHONE_FORMATTING.sub("", str(slot_value))):
+        return _reject("Please provide a valid phone number (at least 7 digits).")
+    return ValidationResult(str(slot_value).strip())
+
+
+# --- dates ------------------------------------------------------------------
+
+INVALID_CHECKIN_DATE = _reject(
+    "Please provide a valid date (e.g., 10/11/2024, 10th November, or tomorrow).")
+INVALID_CHECKOUT_DATE = _reject(
+    "Please provide a valid date (e.g., 12/11/2024, 12th November, or in 3 days).")
+CHECKIN_IN_PAST = _reject("The check-in date can't be in the past. Please choose another date.")
+
+
+def validate_checkin_date(slot_value: Any, today: Optional[date] = None) -> ValidationResult:
+    """Resolve the check-in to an ISO date, today or later"""
+    today = today or date.today()
+    checkin = normalize_date(slot_value, today)
+    if checkin is None:
+        return INVALID_CHECKIN_DATE
+    if checkin < today:
+        return CHECKIN_IN_PAST
+    return ValidationResult(checkin.isoformat())
+
+
+def validate_checkout_date(slot_value: Any, checkin: Any = None,
+                           today: Optional[date] = None) -> ValidationResult:
+    """Resolve the check-out to an ISO date after the check-in"""
+    today = today or date.today()
+    checkin_day = normalize_date(checkin, today)
+    # Yearless dates resolve from today, so "November 9" after a 10 November
+    # check-in is reported rather than read as next year
+    checkout = normalize_date(slot_value, today, anchor=checkin_day)
+    if checkout is None:
+        return INVALID_CHECKOUT_DATE
+    if checkin_day is not None and checkout <= checkin_day:
+        return _reject(f"The check-out date must be after check-in "
+                       f"({checkin_day.strftime('%d %B %Y')}). Please choose another date.")
+    return ValidationResult(checkout.isoformat())
+
+
+# --- num_guests -------------------------------------------------------------
+
+DIGITS = re.compile(r"\d+")
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+MAX_GUESTS = 10
+
+
+def validate_num_guests(slot_value: Any) -> ValidationResult:
+    text = str(slot_value)
+    match = DIGITS.search(text)
+    if match:
+        num = int(match.group())
+    else:
+        # Whole words only, so "none" or "someone" is not read as "one"
+        num = next((NUMBER_WORDS[word] for word in WORD.findall(text.lower())
+                    if word in NUMBER_WORDS), None)
+        if num is None:
+            return _reject("Please provide a valid number of guests (e.g., 2 or two).")
+
+    if num < 1 or num > MAX_GUESTS:
+        return _reject("Please provide a number between 1 and 10 guests.")
+    return ValidationResult(str(num))
+
+
+# --- keyword slots ----------------------------------------------------------
+
+# Checked in this order, so the first listed room wins ("Deluxe suite" -> Suite)
+ROOM_TYPES = ("single", "double", "suite", "deluxe")
+PAYMENT_METHOD = re.compile(r"credit\s?card|debit\s?card|cash|paypal")
+
+# Keyword -> canonical result, built once so a match is a single dict lookup
+ROOM_RESULTS = {room: ValidationResult(room.capitalize()) for room in ROOM_TYPES}
+PAYMENT_RESULTS = {
+    "creditcard": ValidationResult("Credit Card"),
+    "debitcard": ValidationResult("Debit Card"),
+    "cash": ValidationResult("Cash"),
+    "paypal": ValidationResult("Paypal"),
+}
+YES = ValidationResult("Yes")
+NO = ValidationResult("No")
+BREAKFAST_ANSWERS = {
+    **{word: NO for word in ("no", "n", "nope", "nah", "not")},
+    **{word: YES for word in ("yes", "y", "yeah", "yep", "sure", "ok", "okay")},
+}
+NO_SPECIAL_REQUESTS_RESULT = ValidationResult("None")
+NO_SPECIAL_REQUESTS = frozenset([
+    "none", "nothing", "no", "nope", "n/a", "na", "no special requests", "nothing special",
+])
+MAX_SPECIAL_REQUESTS_LENGTH = 200
+
+
+INVALID_ROOM_TYPE = _reject("Please choose a valid room type: Single, Double, Suite, or Deluxe.")
+SPECIAL_REQUESTS_TOO_LONG = _reject("Please keep special requests under 200 characters.")
+INVALID_BREAKFAST = _reject("Please answer with Yes or No.")
+INVALID_PAYMENT_METHOD = _reject(
+    "Please choose a valid payment method: Credit Card, Debit Card, Cash, or PayPal.")
+
+
+def validate_room_type(slot_value: Any) -> ValidationResult:
+    text = str(slot_value).lower()
+    for room in ROOM_TYPES:
+        if room in text:
+            return ROOM_RESULTS[room]
+    return INVALID_ROOM_TYPE
+
+
+def validate_special_requests(slot_value: Any) -> ValidationResult:
+    if not slot_value:
+        return NO_SPECIAL_REQUESTS_RESULT
+    text = str(slot_value)
+    if text.lower().strip() in NO_SPECIAL_REQUESTS:
+        return NO_SPECIAL_REQUESTS_RESULT
+    if len(text) > MAX_SPECIAL_REQUESTS_LENGTH:
+        return SPECIAL_REQUESTS_TOO_LONG
+    return ValidationResult(text.strip().capitalize())
+
+
+def validate_breakfast(slot_value: Any) -> ValidationResult:
+    answers = {BREAKFAST_ANSWERS[word] for word in WORD.findall(str(slot_value).lower())
+               if word in BREAKFAST_ANSWERS}
+    if YES in answers:
+        return YES
+    if NO in answers:
+        return NO
+    return INVALID_BREAKFAST
+
+
+def validate_payment_method(slot_value: Any) -> ValidationResult:
+    match = PAYMENT_METHOD.search(str(slot_value).lower())
+    if not match:
+        return INVALID_PAYMENT_METHOD
+    return PAYMENT_RESULTS[match.group().replace(" ", "")]
+
+
+VALIDATORS: Dict[Text, Callable[[Any], ValidationResult]] = {
+    "guest_name": validate_guest_name,
+    "email": validate_email,
+    "phone": validate_phone,
+    "checkin_date": validate_checkin_date,
+    "checkout_date": validate_checkout_date,
+    "num_guests": validate_num_guests,
+    "room_type": validate_room_type,
+    "special_requests": validate_special_requests,
+    "breakfast": validate_breakfast,
+    "payment_method": validate_payment_method,
+}
+
+
+def validate_slot(slot_name: Text, slot_value: Any,
+                  slots: Optional[Dict[Text, Any]] = None) -> ValidationResult:
+    """Validate one booking_form slot by name, given the slots filled so far"""
+    if slot_name == "checkout_date":
+        return validate_checkout_date(slot_value, checkin=(slots or {}).get("checkin_date"))
+    return VALIDATORS[slot_name](slot_value)
@@ -0,0 +1 @@
+# This file makes the addons directory a Python package (custom Rasa components)
@@ -0,0 +1,306 @@
+"""
+NLU result cache for short, repetitive replies ("yes", "cash", "double").
+
+Two pipeline components share one LRU cache per trained model:
+
+    pipeline:
+    - name: addons.nlu_cache.NLUCacheLookup     # first
+    - name: WhitespaceTokenizer
+      ...
+    - name: FallbackClassifier
+    - name: addons.nlu_cache.NLUCacheStore      # last
+
+NLUCacheLookup fills cache hits with the stored intent, intent ranking,
+entities and response selector output and takes them out of the message
+list, so the tokenizer, featurizers, DIETClassifier and ResponseSelector
+only ever see misses (on a full hit they get an empty list). NLUCacheStore
+caches what the pipeline produced for the misses and puts the hits back
+in their original order.
+
+Keys are the lower-cased, whitespace-collapsed text; only messages of at
+most max_words words are cached. Entity offsets are only reused when the
+text differs from the cached one by case alone. The cache belongs to the
+model it was filled by (execution_context.model_id), so loading a new
+model starts an empty cache.
+
+Rasa's server cannot take extra routes, so the cache's counters are served
+like the action server's, from a port of their own once a cache exists:
+GET http://<host>:NLU_CACHE_METRICS_PORT/metrics (default 5057, 0 turns it
+off).
+
+    nlu_cache_lookups_total{result}     hit, miss, uncacheable
+    nlu_cache_evictions_total           entries dropped by the LRU
+    nlu_cache_entries                   entries held
+    nlu_cache_hit_rate                  hits / (hits + misses)
+"""
+
+import copy
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.shared.nlu.constants import ENTITIES, TEXT
+from rasa.shared.nlu.training_data.message import Message
+
+from actions.metrics import Registry, start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+ENTITY_START = "start"
+ENTITY_END = "end"
+ENTITY_VALUE = "value"
+# Marks cached entities whose value is the literal span of the text (not
+# a synonym), so a hit can take the span from the new text's casing
+LITERAL_VALUE = "_literal_value"
+
+
+def cache_key(text: Text) -> Text:
+    return " ".join(text.lower().split())
+
+
+class NLUResultCache:
+    """LRU of parse results for one model, with hit-rate counters"""
+
+    def __init__(self, model_id: Optional[Text], max_size: int, log_every: int) -> None:
+        self.model_id = model_id
+        self.max_size = max_size
+        self.log_every = log_every
+        self._entries: "OrderedDict[Text, Tuple[Text, Dict[Text, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {"hits": 0, "misses": 0, "uncacheable": 0, "evictions": 0}
+
+    def get(self, key: Text) -> Optional[Tuple[Text, Dict[Text, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Text, text: Text, output: Dict[Text, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (text, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def count(self, name: Text, amount: int = 1) -> None:
+        if not amount:
+            return
+        with self._lock:
+            self.counters[name] += amount
+            lookups = self.counters["hits"] + self.counters["misses"]
+            should_log = name in ("hits", "misses") and lookups % self.log_every < amount
+        if should_log:
+            logger.info(f"NLU cache: {self.stats()}")
+
+    def stats(self) -> Dict[Text, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "model_id": self.model_id,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+    # Hits taken out by NLUCacheLookup, waiting for NLUCacheStore. The graph
+    # runs one parse at a time per thread, so a thread-local slot suffices.
+    def stash(self, total: int, hits: List[Tuple[int, Message]]) -> None:
+        self._local.pending = (total, hits)
+
+    def unstash(self) -> Tuple[Optional[int], List[Tuple[int, Message]]]:
+        pending = getattr(self._local, "pending", None)
+        self._local.pending = None
+        return pending if pending is not None else (None, [])
+
+
+_caches: Dict[Text, NLUResultCache] = {}
+_caches_lock = threading.Lock()
+_metrics_started = False
+
+
+def cache_for(model_id: Optional[Text], max_size: int, log_every: int) -> NLUResultCache:
+    """The cache for a model; caches of previously loaded models are dropped"""
+    global _metrics_started
+    with _caches_lock:
+        cache = _caches.get(model_id)
+        if cache is None:
+            _caches.clear()
+            cache = _caches[model_id] = NLUResultCache(model_id, max_size, log_every)
+        start_metrics = not _metrics_started
+        _metrics_started = True
+    if start_metrics:
+        start_metrics_server(registry, int(os.environ.get("NLU_CACHE_METRICS_PORT", "5057")))
+    return cache
+
+
+def clear_caches() -> None:
+    """Empty the live cache(s), e.g. so a profiler measures the full pipeline"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
+
+
+def cache_stats() -> List[Dict[Text, Any]]:
+    """Stats of the live cache(s), e.g. for a metrics endpoint"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
+
+
+def _total(name: Text) -> int:
+    return sum(stats[name] for stats in cache_stats())
+
+
+def _hit_rate() -> float:
+    hits, misses = _total("hits"), _total("misses")
+    return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+
+registry = Registry()
+registry.counter(
+    "nlu_cache_lookups_total", "NLU cache lookups by result", ("result",),
+    callback=lambda: {("hit",): _total("hits"), ("miss",): _total("misses"),
+                      ("uncacheable",): _total("uncacheable")})
+registry.counter(
+    "nlu_cache_evictions_total", "NLU cache entries dropped by the LRU",
+    callback=lambda: _total("evictions"))
+registry.gauge("nlu_cache_entries", "Parses held in the NLU cache",
+               callback=lambda: _total("size"))
+registry.gauge("nlu_cache_hit_rate", "NLU cache hits / (hits + misses)",
+               callback=_hit_rate)
+
+
+class _NLUCacheComponent(GraphComponent):
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {"max_size": 10000, "max_words": 6, "log_every": 1000}
+
+    def __init__(self, config: Dict[Text, Any], model_id: Optional[Text]) -> None:
+        self.max_words = config["max_words"]
+        self.cache = cache_for(model_id, config["max_size"], config["log_every"])
+
+    @classmethod
+    def create(
+        cls,
+        config: Dict[Text, Any],
+        model_storage: ModelStorage,
+        resource: Resource,
+        execution_context: ExecutionContext,
+    ) -> GraphComponent:
+        return cls(config, execution_context.model_id)
+
+    def cacheable(self, message: Message) -> Optional[Text]:
+        """The cache key for a message, or None if it is not cached"""
+        text = message.get(TEXT)
+        if not isinstance(text, str) or text.startswith("/"):
+            # /intent payloads are resolved by RegexMessageHandler
+            return None
+        key = cache_key(text)
+        if not key or len(key.split()) > self.max_words:
+            return None
+        return key
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.INTENT_CLASSIFIER], is_trainable=False
+)
+class NLUCacheLookup(_NLUCacheComponent):
+    """Serves cached parses and removes them from the rest of the pipeline"""
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        hits: List[Tuple[int, Message]] = []
+        misses: List[Message] = []
+        uncacheable = 0
+        for index, message in enumerate(messages):
+            key = self.cacheable(message)
+            if key is None:
+                uncacheable += 1
+            elif self._restore(message, key):
+                hits.append((index, message))
+                continue
+            misses.append(message)
+        self.cache.count("hits", len(hits))
+        self.cache.count("misses", len(misses) - uncacheable)
+        self.cache.count("uncacheable", uncacheable)
+        self.cache.stash(len(messages), hits)
+        return misses
+
+    def _restore(self, message: Message, key: Text) -> bool:
+        entry = self.cache.get(key)
+        if entry is None:
+            return False
+        cached_text, output = entry
+        text = message.get(TEXT)
+        entities = output.get(ENTITIES) or []
+        if entities and text.lower() != cached_text.lower():
+            # Same words, different spacing: offsets would not line up
+            return False
+        for name, value in output.items():
+            if name == ENTITIES:
+                value = [self._entity_for(entity, text) for entity in value]
+            else:
+                value = copy.deepcopy(value)
+            message.set(name, value, add_to_output=True)
+        return True
+
+    @staticmethod
+    def _entity_for(entity: Dict[Text, Any], text: Text) -> Dict[Text, Any]:
+        entity = copy.deepcopy(entity)
+        if entity.pop(LITERAL_VALUE, False):
+            entity[ENTITY_VALUE] = text[entity[ENTITY_START]:entity[ENTITY_END]]
+        return entity
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.INTENT_CLASSIFIER], is_trainable=False
+)
+class NLUCacheStore(_NLUCacheComponent):
+    """Caches freshly parsed messages and merges the cache hits back in"""
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        for message in messages:
+            key = self.cacheable(message)
+            if key is not None:
+                self.cache.put(key, message.get(TEXT), self._output_of(message))
+
+        total, hits = self.cache.unstash()
+        if not hits:
+            return messages
+        merged: List[Optional[Message]] = [None] * total
+        for index, message in hits:
+            merged[index] = message
+        misses = iter(messages)
+        return [message if message is not None else next(misses) for message in merged]
+
+    @staticmethod
+    def _output_of(message: Message) -> Dict[Text, Any]:
+        text = message.get(TEXT)
+        output = {}
+        for name in message.output_properties:
+            if name == TEXT:
+                continue
+            value = copy.deepcopy(message.get(name))
+            if name == ENTITIES:
+                for entity in value or []:
+                    start, end = entity.get(ENTITY_START), entity.get(ENTITY_END)
+                    entity[LITERAL_VALUE] = (
+                        start is not None and end is not None
+                        and entity.get(ENTITY_VALUE) == text[start:end]
+                    )
+            output[name] = value
+        return output
@@ -0,0 +1,285 @@
+"""
+SQLite tracker store for Rasa, with event compaction.
+
+Conversations survive restarts and can be shared by several Rasa processes
+on one host: the database runs in WAL mode, so readers never block the
+writer. Enable it in endpoints.yml:
+
+    tracker_store:
+      type: addons.tracker_store.SQLiteTrackerStore
+      db: trackers.db
+
+Each conversation is stored as its event list. When a conversation has
+more than keep_turns + compact_slack user turns, everything before the last
+keep_turns turns is replaced by a snapshot of the state at that point:
+the session start, one SlotSet per filled slot, and the active loop. The
+policies only look at the last max_history turns (5 in config.yml), so
+predictions are unchanged, but loading a tracker stays flat however long
+the conversation gets. Compacted events are gone for good: /tracker and
+`rasa export` only return the snapshot onwards.
+
+Conversations idle for longer than conversation_ttl seconds are deleted
+by a periodic sweep.
+
+Compaction happens when a tracker is loaded, so the tracker Rasa holds
+always matches what is stored and later saves only append. Several Rasa
+processes sharing one database need a shared lock store (e.g.
+`lock_store: type: redis`), just like with the built-in SQL store.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Text
+
+from rasa.core.brokers.broker import EventBroker
+from rasa.core.tracker_store import TrackerStore
+from rasa.shared.core.constants import ACTION_LISTEN_NAME, ACTION_SESSION_START_NAME
+from rasa.shared.core.domain import Domain
+from rasa.shared.core.events import (
+    ActionExecuted,
+    ActiveLoop,
+    ConversationPaused,
+    Event,
+    SessionStarted,
+    SlotSet,
+    UserUttered,
+    deserialise_events,
+)
+from rasa.shared.core.trackers import DialogueStateTracker
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SQLiteTrackerStore(TrackerStore):
+    """Tracker store backed by one local SQLite file"""
+
+    def __init__(
+        self,
+        domain: Optional[Domain] = None,
+        host: Optional[Text] = None,
+        db: Text = "trackers.db",
+        conversation_ttl: float = 7 * 24 * 3600,
+        keep_turns: int = 5,
+        compact_slack: int = 20,
+        sweep_interval: float = 60.0,
+        event_broker: Optional[EventBroker] = None,
+        **kwargs: Dict[Text, Any],
+    ) -> None:
+        super().__init__(domain, event_broker, **kwargs)
+        # url: in endpoints.yml also works as the database path
+        path = host or db
+        self.path = path if os.path.isabs(path) else os.path.join(PROJECT_DIR, path)
+        self.conversation_ttl = float(conversation_ttl)
+        self.keep_turns = max(int(keep_turns), 1)
+        self.compact_slack = max(int(compact_slack), 0)
+        self.sweep_interval = float(sweep_interval)
+        self._local = threading.local()
+        self._last_sweep = 0.0
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " sender_id TEXT PRIMARY KEY,"
+                " event_count INTEGER NOT NULL,"
+                " user_turns INTEGER NOT NULL,"
+                " compactions INTEGER NOT NULL DEFAULT 0,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS conversations_updated_at"
+                " ON conversations (updated_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " sender_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (sender_id, seq)) WITHOUT ROWID"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    async def _run(func: Any, *args: Any) -> Any:
+        # Keep the event loop free while SQLite waits on another writer
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    # --- TrackerStore interface ----------------------------------------------
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        """Append the tracker's events that are not stored yet"""
+        new_events = await self._run(self._save, tracker.sender_id, list(tracker.events))
+        if self.event_broker:
+            for event in new_events:
+                body = {"sender_id": tracker.sender_id}
+                body.update(event.as_dict())
+                self.event_broker.publish(body)
+
+    async def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        """Load a conversation, compacting it first if it has grown too long"""
+        events = await self._run(self._load, sender_id)
+        if events is None:
+            return None
+        return DialogueStateTracker.from_events(
+            sender_id, events, self.domain.slots, max_event_history=self.max_event_history
+        )
+
+    async def keys(self) -> Iterable[Text]:
+        rows = await self._run(self._keys)
+        return [sender_id for (sender_id,) in rows]
+
+    # --- storage ---------------------------------------------------------------
+
+    def _save(self, sender_id: Text, events: List[Event]) -> List[Event]:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            row = conn.execute(
+                "SELECT event_count, user_turns FROM conversations WHERE sender_id = ?",
+                (sender_id,),
+            ).fetchone()
+            stored, user_turns = row if row is not None else (0, 0)
+            if stored > len(events):
+                # Not the tracker we handed out (e.g. replaced wholesale):
+                # store it as given
+                conn.execute("DELETE FROM events WHERE sender_id = ?", (sender_id,))
+                stored, user_turns = 0, 0
+            new_events = events[stored:]
+            conn.executemany(
+                "INSERT INTO events (sender_id, seq, data) VALUES (?, ?, ?)",
+                [
+                    (sender_id, stored + i, json.dumps(event.as_dict()))
+                    for i, event in enumerate(new_events)
+                ],
+            )
+            user_turns += sum(1 for event in new_events if isinstance(event, UserUttered))
+            conn.execute(
+                "INSERT INTO conversations (sender_id, event_count, user_turns, updated_at)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(sender_id) DO UPDATE SET"
+                " event_count = excluded.event_count,"
+                " user_turns = excluded.user_turns,"
+                " updated_at = excluded.updated_at",
+                (sender_id, len(events), user_turns, now),
+            )
+            self._maybe_sweep(conn, now)
+        return new_events
+
+    def _load(self, sender_id: Text) -> Optional[List[Event]]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT user_turns, updated_at FROM conversations WHERE sender_id = ?",
+            (sender_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        user_turns, updated_at = row
+        if time.time() - updated_at > self.conversation_ttl:
+            with conn:
+                self._delete(conn, sender_id)
+            return None
+
+        rows = conn.execute(
+            "SELECT data FROM events WHERE sender_id = ? ORDER BY seq", (sender_id,)
+        ).fetchall()
+        events = deserialise_events([json.loads(data) for (data,) in rows])
+        if user_turns > self.keep_turns + self.compact_slack:
+            events = self._compact(conn, sender_id, events)
+        return events
+
+    def _compact(self, conn: sqlite3.Connection, sender_id: Text,
+                 events: List[Event]) -> List[Event]:
+        """Replace everything before the last keep_turns turns with a snapshot"""
+        tracker = DialogueStateTracker.from_events(sender_id, events, self.domain.slots)
+        applied = tracker.applied_events()
+        turns = [i for i, event in enumerate(applied) if isinstance(event, UserUttered)]
+        kept_turns = min(len(turns), self.keep_turns)
+        # Few turns since the last session start or restart: only the earlier
+        # sessions (which applied_events already skips) are dropped
+        cut = turns[-kept_turns] if len(turns) > self.keep_turns else 0
+        # Keep the action_listen that precedes the first kept user message
+        previous = applied[cut - 1] if cut > 0 else None
+        if isinstance(previous, ActionExecuted) and previous.action_name == ACTION_LISTEN_NAME:
+            cut -= 1
+        head = DialogueStateTracker.from_events(sender_id, applied[:cut], self.domain.slots)
+        first = applied[cut].timestamp if cut < len(applied) else time.time()
+        compacted = self._snapshot(head, first) + applied[cut:]
+
+        with conn:
+            conn.execute("DELETE FROM events WHERE sender_id = ?", (sender_id,))
+            conn.executemany(
+                "INSERT INTO events (sender_id, seq, data) VALUES (?, ?, ?)",
+                [
+                    (sender_id, seq, json.dumps(event.as_dict()))
+                    for seq, event in enumerate(compacted)
+                ],
+            )
+            conn.execute(
+                "UPDATE conversations SET event_count = ?, user_turns = ?,"
+                " compactions = compactions + 1 WHERE sender_id = ?",
+                (len(compacted), kept_turns, sender_id),
+            )
+        logger.debug(
+            f"Compacted tracker {sender_id}: {len(events)} -> {len(compacted)} events"
+        )
+        return compacted
+
+    @staticmethod
+    def _snapshot(head: DialogueStateTracker, timestamp: float) -> List[Event]:
+        """Events that rebuild head's state: session start, slots, active loop"""
+        # Just before the first kept event, so ordering by time is preserved
+        timestamp -= 0.001
+        snapshot: List[Event] = [
+            ActionExecuted(ACTION_SESSION_START_NAME, timestamp=timestamp),
+            SessionStarted(timestamp=timestamp),
+        ]
+        snapshot += [
+            SlotSet(name, slot.value, timestamp=timestamp)
+            for name, slot in head.slots.items()
+            if slot.value != slot.initial_value
+        ]
+        if head.active_loop_name:
+            snapshot.append(ActiveLoop(head.active_loop_name, timestamp=timestamp))
+        if head.is_paused():
+            snapshot.append(ConversationPaused(timestamp=timestamp))
+        return snapshot
+
+    def _delete(self, conn: sqlite3.Connection, sender_id: Text) -> None:
+        conn.execute("DELETE FROM events WHERE sender_id = ?", (sender_id,))
+        conn.execute("DELETE FROM conversations WHERE sender_id = ?", (sender_id,))
+
+    def _maybe_sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        cutoff = now - self.conversation_ttl
+        conn.execute(
+            "DELETE FROM events WHERE sender_id IN ("
+            " SELECT sender_id FROM conversations WHERE updated_at < ?)",
+            (cutoff,),
+        )
+        cur = conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,))
+        if cur.rowcount:
+            logger.debug(f"Expired {cur.rowcount} idle conversations")
+
+    def _keys(self) -> List[tuple]:
+        return self._conn().execute(
+            "SELECT sender_id FROM conversations WHERE updated_at >= ?",
+            (time.time() - self.conversation_ttl,),
+        ).fetchall()
@@ -0,0 +1,207 @@
+"""
+Microbenchmarks for the action server's form validation and booking writes.
+
+Calls every ValidateBookingForm.validate_<slot> method the way the action
+server does (Tracker, CollectingDispatcher, domain) on the sample replies
+from bench_validation.py, then runs ActionConfirmBooking against a scratch
+booking log: one guest at a time (latency of a durable write) and
+--writers guests at once (group-commit throughput).
+
+Usage (from the project root):
+    python benchmarks/bench_actions.py [--number 2000] [--bookings 500] [--writers 32]
+        [--output run.json] [--compare base.json] [--json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import inspect
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import yaml
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from results import add_output_arguments, document, emit, latency_stats  # noqa: E402
+from bench_validation import SAMPLES  # noqa: E402
+
+ROOM_TYPES = ["Single", "Double", "Suite", "Deluxe"]
+# Earlier form answers, so validators that look at other slots (checkout
+# after checkin, guests per room) see a realistic tracker
+FILLED_SLOTS = {
+    "guest_name": "John Smith", "email": "john.smith@example.com", "phone": "+1 555 123 4567",
+    "checkin_date": (date.today() + timedelta(days=30)).isoformat(),
+}
+
+
+def load_domain():
+    with open(os.path.join(PROJECT_DIR, "domain.yml"), "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def make_tracker(domain, slots, requested_slot=None):
+    from rasa_sdk import Tracker
+
+    all_slots = {name: None for name in domain.get("slots", {})}
+    all_slots.update(slots, requested_slot=requested_slot)
+    return Tracker.from_dict({
+        "sender_id": "bench",
+        "slots": all_slots,
+        "latest_message": {"text": None, "intent": {}, "entities": []},
+        "events": [],
+        "paused": False,
+        "followup_action": None,
+        "active_loop": {"name": "booking_form"},
+        "latest_action_name": "action_listen",
+    })
+
+
+def bench_validators(actions, domain, number):
+    """Mean and p99 microseconds per validate_<slot> call"""
+    from rasa_sdk.executor import CollectingDispatcher
+
+    form = actions.ValidateBookingForm()
+    results = {}
+    for slot, values in SAMPLES.items():
+        method = getattr(form, f"validate_{slot}")
+        trackers = [make_tracker(domain, dict(FILLED_SLOTS, **{slot: value}), slot)
+                    for value in values]
+        dispatcher = CollectingDispatcher()
+        seconds = []
+        rejected = 0
+        for i in range(number):
+            value, tracker = values[i % len(values)], trackers[i % len(values)]
+            dispatcher.messages.clear()
+            started = time.perf_counter()
+            result = method(value, dispatcher, tracker, domain)
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+            seconds.append(time.perf_counter() - started)
+            rejected += result.get(slot) is None
+        stats = latency_stats(seconds)
+        results[f"validate_{slot}"] = {
+            "calls": number,
+            "ops_per_s": round(number / sum(seconds), 1) if sum(seconds) else 0.0,
+            "mean_us": round(stats["mean_ms"] * 1000, 2),
+            "p99_us": round(stats["p99_ms"] * 1000, 2),
+            "rejection_rate": round(rejected / number, 3),
+        }
+    return results
+
+
+def booking_slots(i):
+    # Spread over the calendar so the inventory check never runs out of rooms
+    checkin = date.today() + timedelta(days=30 + i // len(ROOM_TYPES))
+    return {
+        "guest_name": f"Guest {i}", "email": f"guest{i}@example.com",
+        "phone": "+1 555 123 4567", "checkin_date": checkin.isoformat(),
+        "checkout_date": (checkin + timedelta(days=1)).isoformat(), "num_guests": "1",
+        "room_type": ROOM_TYPES[i % len(ROOM_TYPES)], "special_requests": "None",
+        "breakfast": "Yes", "payment_method": "Credit Card",
+    }
+
+
+async def confirm(action, domain, i):
+    """(seconds, saved) for one ActionConfirmBooking run"""
+    from rasa_sdk.executor import CollectingDispatcher
+
+    tracker = make_tracker(domain, booking_slots(i))
+    dispatcher = CollectingDispatcher()
+    started = time.perf_counter()
+    events = await action.run(dispatcher, tracker, domain)
+    # A rejection asks for another room type; a failed write warns the guest
+    saved = not events and not dispatcher.messages
+    return time.perf_counter() - started, saved
+
+
+async def bench_bookings(actions, domain, count, writers):
+    action = actions.ActionConfirmBooking()
+    results = {}
+
+    started = time.perf_counter()
+    sequential = [await confirm(action, domain, i) for i in range(count)]
+    elapsed = time.perf_counter() - started
+    results["confirm_booking_sequential"] = booking_result(sequential, elapsed)
+
+    semaphore = asyncio.Semaphore(writers)
+
+    async def limited(i):
+        async with semaphore:
+            return await confirm(action, domain, i)
+
+    started = time.perf_counter()
+    concurrent = await asyncio.gather(*(limited(count + i) for i in range(count)))
+    elapsed = time.perf_counter() - started
+    results[f"confirm_booking_x{writers}"] = booking_result(concurrent, elapsed)
+    return results
+
+
+def booking_result(runs, elapsed):
+    seconds = [s for s, _ in runs]
+    return {
+        "calls": len(runs),
+        "ops_per_s": round(len(runs) / elapsed, 1) if elapsed else 0.0,
+        **latency_stats(seconds),
+        "failed": sum(1 for _, saved in runs if not saved),
+    }
+
+
+def print_table(doc):
+    config = doc["config"]
+    print(f"validators: {config['number']} calls each")
+    print(f"{'method':<28}{'ops/s':>12}{'mean us':>10}{'p99 us':>10}{'rejected':>10}")
+    for name, r in doc["results"].items():
+        if name.startswith("validate_"):
+            print(f"{name:<28}{r['ops_per_s']:>12.0f}{r['mean_us']:>10.1f}{r['p99_us']:>10.1f}"
+                  f"{r['rejection_rate']:>10.0%}")
+    print(f"\nbookings: {config['bookings']} per run, durability {config['durability']}")
+    print(f"{'run':<28}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for name, r in doc["results"].items():
+        if name.startswith("confirm_booking"):
+            print(f"{name:<28}{r['ops_per_s']:>12.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                  f"{r['p99_ms']:>10.2f}{r['failed']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000, help="calls per validator")
+    parser.add_argument("--bookings", type=int, default=500, help="confirmations per run")
+    parser.add_argument("--writers", type=int, default=32, help="concurrent confirmations")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Must be set before actions.actions opens the booking log
+        os.environ["BOOKINGS_PATH"] = os.path.join(work_dir, "bookings.jsonl")
+        os.environ.setdefault("ACTION_METRICS_PORT", "0")
+        from actions import actions
+
+        domain = load_domain()
+        results = bench_validators(actions, domain, args.number)
+        # ActionConfirmBooking prints a line per booking
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.update(asyncio.run(bench_bookings(actions, domain, args.bookings,
+                                                      args.writers)))
+        actions.booking_writer.close()
+
+    config = {
+        "number": args.number,
+        "bookings": args.bookings,
+        "writers": args.writers,
+        "durability": os.environ.get("BOOKING_DURABILITY", "batch"),
+    }
+    emit(document("actions", config, results), args, print_table,
+         ["ops_per_s", "mean_us", "p50_ms", "p99_ms"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
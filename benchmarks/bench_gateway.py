@@ -0,0 +1,307 @@
+"""
+Load benchmark for the Flask (or aiohttp) gateway against a stub Rasa.
+
+Starts benchmarks/stub_rasa.py and the gateway as subprocesses (the gateway
+with a scratch booking log of --bookings records and rate limits off), then
+runs each scenario with --concurrency closed-loop clients for --duration
+seconds and reports requests per second and p50/p95/p99 latency per route:
+
+    health    GET /health, GET /health/ready
+    chat      POST /chat, one sender per client, distinct messages
+    bookings  GET /bookings (first page, filtered page)
+    session   POST /session/new, POST /session/reset, GET /session/active
+
+Pass --url to benchmark an already running gateway instead (nothing is
+started; point it at a stub, not a real Rasa). Results can be written with
+--output and compared with an earlier run with --compare.
+
+Usage (from the project root):
+    python benchmarks/bench_gateway.py [--gateway flask|async] [--concurrency 16] [--duration 10]
+        [--latency 50] [--scenario chat ...] [--output run.json] [--compare base.json] [--json]
+"""
+
+import argparse
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+FLASK_API_DIR = os.path.join(PROJECT_DIR, "flask_api")
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from results import add_output_arguments, document, emit, latency_stats  # noqa: E402
+
+CHAT_MESSAGES = [
+    "hi", "I want to book a room", "John Smith", "john.smith@example.com",
+    "+1 555 123 4567", "tomorrow", "in 3 days", "2", "double", "none", "yes",
+    "credit card", "what time is check-in?", "thanks",
+]
+ROOM_TYPES = ["Single", "Double", "Suite", "Deluxe"]
+
+# Launches the Flask app on the threaded werkzeug server `python api.py` uses,
+# without the debug reloader
+FLASK_LAUNCHER = (
+    "import os, api; from werkzeug.serving import run_simple; "
+    "run_simple('127.0.0.1', int(os.environ['PORT']), api.app, threaded=True)"
+)
+
+
+class Recorder:
+    """Latencies and status codes per route, for one client thread"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def request(self, http, route, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = http.request(method, url, timeout=30, **kwargs)
+            response.content  # read the whole body
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            response, status = None, type(e).__name__
+        self.samples[route].append(time.perf_counter() - started)
+        self.statuses[route][status] += 1
+        return response
+
+    def merge(self, other):
+        for route, samples in other.samples.items():
+            self.samples[route] += samples
+            self.statuses[route].update(other.statuses[route])
+
+
+# --- scenarios ---------------------------------------------------------------
+# Each is called in a loop by every client: (recorder, http, url, client, i)
+
+def scenario_health(rec, http, url, client, i):
+    if i % 2:
+        rec.request(http, "GET /health/ready", "GET", f"{url}/health/ready")
+    else:
+        rec.request(http, "GET /health", "GET", f"{url}/health")
+
+
+def scenario_chat(rec, http, url, client, i):
+    # Numbered so repeats are not coalesced by the gateway's sender gate
+    text = f"{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} #{i}"
+    rec.request(http, "POST /chat", "POST", f"{url}/chat",
+                json={"message": text, "sender": f"bench-{client}"})
+
+
+def scenario_bookings(rec, http, url, client, i):
+    if i % 2:
+        room_type = ROOM_TYPES[i % len(ROOM_TYPES)]
+        rec.request(http, "GET /bookings?room_type", "GET", f"{url}/bookings",
+                    params={"room_type": room_type, "limit": 20})
+    else:
+        rec.request(http, "GET /bookings", "GET", f"{url}/bookings")
+
+
+def scenario_session(rec, http, url, client, i):
+    response = rec.request(http, "POST /session/new", "POST", f"{url}/session/new", json={})
+    sender = (response.json() or {}).get("sender") if response is not None and response.ok else None
+    if sender:
+        rec.request(http, "POST /session/reset", "POST", f"{url}/session/reset",
+                    json={"sender": sender})
+    if i % 10 == 0:
+        rec.request(http, "GET /session/active", "GET", f"{url}/session/active")
+
+
+SCENARIOS = {
+    "health": scenario_health,
+    "chat": scenario_chat,
+    "bookings": scenario_bookings,
+    "session": scenario_session,
+}
+
+
+def run_scenario(func, url, concurrency, duration):
+    """Closed loop: each client sends its next request when the last returns"""
+    deadline = time.monotonic() + duration
+    recorders = [Recorder() for _ in range(concurrency)]
+
+    def client(n):
+        http = requests.Session()
+        for i in itertools.count():
+            if time.monotonic() >= deadline:
+                break
+            func(recorders[n], http, url, n, i)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = Recorder()
+    for rec in recorders:
+        total.merge(rec)
+    results = {}
+    for route, samples in total.samples.items():
+        statuses = total.statuses[route]
+        failed = sum(n for status, n in statuses.items()
+                     if not isinstance(status, int) or status >= 500)
+        results[route] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 1),
+            **latency_stats(samples),
+            "errors": failed,
+            "rejected": statuses.get(429, 0) + statuses.get(503, 0),
+            "statuses": {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        }
+    return results
+
+
+# --- processes -----------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def seed_bookings(path, count):
+    """A scratch booking log with count bookings spread over the next year"""
+    from datetime import date, timedelta
+
+    from actions.booking_store import Booking, BookingStore
+
+    store = BookingStore(path=path)
+    today = date.today()
+    bookings = []
+    for i in range(count):
+        checkin = today + timedelta(days=1 + i % 365)
+        bookings.append(Booking(
+            guest_name=f"Guest {i}", email=f"guest{i}@example.com", phone="+1 555 123 4567",
+            checkin_date=checkin.isoformat(),
+            checkout_date=(checkin + timedelta(days=1 + i % 5)).isoformat(),
+            num_guests=1 + i % 4, room_type=ROOM_TYPES[i % len(ROOM_TYPES)],
+            special_requests="none", breakfast=bool(i % 2), payment_method="Credit Card",
+            created_at=today.isoformat() + " 12:00:00",
+        ))
+    if bookings:
+        store.append_many(bookings)
+
+
+def start_servers(args, work_dir):
+    """Start the stub Rasa and the gateway; returns (gateway URL, processes)"""
+    processes = []
+    stub_port, gateway_port = free_port(), free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    processes.append(subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "stub_rasa.py"), "--port", str(stub_port),
+         "--latency", str(args.latency), "--jitter", str(args.jitter)],
+        stdout=subprocess.DEVNULL))
+    wait_until_up(f"{stub_url}/status", processes[-1])
+
+    bookings_path = os.path.join(work_dir, "bookings.jsonl")
+    seed_bookings(bookings_path, args.bookings)
+    env = dict(
+        os.environ,
+        PORT=str(gateway_port),
+        RASA_API_URL=stub_url,
+        ACTION_SERVER_URL=stub_url,
+        BOOKINGS_PATH=bookings_path,
+        SESSION_DB=os.path.join(work_dir, "sessions.db"),
+        CONVERSATION_LOG_PATH=os.path.join(work_dir, "conversations.jsonl"),
+        WARMUP_REQUIRED="0",
+        HEALTH_PROBE_INTERVAL="1",
+    )
+    if not args.keep_rate_limits:
+        env.update(RATE_LIMIT_IP="0", RATE_LIMIT_SENDER="0")
+    command = ([sys.executable, "async_api.py"] if args.gateway == "async"
+               else [sys.executable, "-c", FLASK_LAUNCHER])
+    log = open(os.path.join(work_dir, "gateway.log"), "w")
+    processes.append(subprocess.Popen(command, cwd=FLASK_API_DIR, env=env,
+                                      stdout=log, stderr=subprocess.STDOUT))
+    gateway_url = f"http://127.0.0.1:{gateway_port}"
+    wait_until_up(f"{gateway_url}/health/live", processes[-1])
+    # Let the health prober see the stub before /health/ready is measured
+    time.sleep(1.5)
+    return gateway_url, processes
+
+
+def print_table(doc):
+    config = doc["config"]
+    print(f"gateway: {config['gateway']}  clients: {config['concurrency']}  "
+          f"{config['duration']:g}s per scenario  stub latency: {config['latency_ms']:g} ms")
+    print(f"{'route':<26}{'req':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'err':>6}{'429/503':>9}")
+    for route, r in doc["results"].items():
+        print(f"{route:<26}{r['requests']:>8}{r['rps']:>9.1f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['max_ms']:>9.1f}{r['errors']:>6}"
+              f"{r['rejected']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--gateway", choices=["flask", "async"], default="flask")
+    parser.add_argument("--url", help="benchmark a running gateway instead of starting one")
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--latency", type=float, default=50, help="stub Rasa latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="stub latency jitter in ms")
+    parser.add_argument("--bookings", type=int, default=5000, help="bookings in the scratch log")
+    parser.add_argument("--keep-rate-limits", action="store_true",
+                        help="keep the gateway's per-IP/per-sender rate limits on")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    processes = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            url = args.url.rstrip("/") if args.url else None
+            if url is None:
+                url, processes = start_servers(args, work_dir)
+            results = {}
+            for name in args.scenario:
+                if not args.json:
+                    print(f"running {name}...", file=sys.stderr)
+                results.update(run_scenario(SCENARIOS[name], url, args.concurrency, args.duration))
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=10)
+
+    config = {
+        "gateway": "external" if args.url else args.gateway,
+        "scenarios": args.scenario,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "latency_ms": args.latency,
+        "jitter_ms": args.jitter,
+        "bookings": args.bookings,
+        "rate_limits": args.keep_rate_limits,
+    }
+    emit(document("gateway", config, results), args, print_table, ["rps", "p50_ms", "p99_ms"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
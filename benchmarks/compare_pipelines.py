@@ -0,0 +1,133 @@
+"""
+Intent F1 versus parse latency for alternative NLU pipelines.
+
+Splits data/nlu.yml into a training and a held-out set (same split for
+every config), trains an NLU-only model per config, then parses the
+held-out examples with each model, NLU result cache emptied, and reports
+macro intent F1, accuracy, p50/p99 parse latency and model size. With
+--budget-ms, also names the most accurate config whose p99 fits the
+budget.
+
+Usage (from the project root):
+    python benchmarks/compare_pipelines.py [--config config.yml config_fast.yml] [--budget-ms 50] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rasa.model_training import train_nlu  # noqa: E402
+from rasa.shared.nlu.constants import INTENT, INTENT_NAME_KEY, TEXT  # noqa: E402
+from rasa.shared.nlu.training_data.loading import load_data  # noqa: E402
+
+from addons.nlu_cache import clear_caches  # noqa: E402
+from profile_nlu import DEFAULT_NLU_DATA, latency_summary, load_parser  # noqa: E402
+
+DEFAULT_CONFIGS = [os.path.join(PROJECT_DIR, name) for name in ("config.yml", "config_fast.yml")]
+
+
+def intent_scores(pairs):
+    """Macro F1 and accuracy over (expected, predicted) intent pairs"""
+    labels = {expected for expected, _ in pairs}
+    f1_scores = []
+    for label in sorted(labels):
+        tp = sum(1 for e, p in pairs if e == label and p == label)
+        fp = sum(1 for e, p in pairs if e != label and p == label)
+        fn = sum(1 for e, p in pairs if e == label and p != label)
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1_scores.append(2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+    correct = sum(1 for expected, predicted in pairs if expected == predicted)
+    return {
+        "macro_f1": sum(f1_scores) / len(f1_scores) if f1_scores else 0.0,
+        "accuracy": correct / len(pairs) if pairs else 0.0,
+    }
+
+
+def evaluate(config, train_path, test_examples, work_dir, warmup):
+    """Train one config and score it on the held-out examples"""
+    name = os.path.splitext(os.path.basename(config))[0]
+    started = time.perf_counter()
+    model_path = train_nlu(config, train_path, os.path.join(work_dir, name), fixed_model_name=name)
+    train_seconds = time.perf_counter() - started
+    if not model_path:
+        raise RuntimeError(f"training with {config} produced no model")
+
+    parse = load_parser(model_path)
+    for text, _ in test_examples[:warmup]:
+        parse(text)
+
+    pairs, seconds = [], []
+    for text, expected in test_examples:
+        clear_caches()
+        started = time.perf_counter()
+        message = parse(text)
+        seconds.append(time.perf_counter() - started)
+        pairs.append((expected, (message.get(INTENT) or {}).get(INTENT_NAME_KEY)))
+
+    return {
+        "config": config,
+        **intent_scores(pairs),
+        **latency_summary(seconds),
+        "train_s": train_seconds,
+        "model_kib": os.path.getsize(model_path) / 1024,
+    }
+
+
+def choose(results, budget_ms):
+    """Most accurate result whose p99 fits the budget, or None"""
+    fitting = [r for r in results if r["p99_ms"] <= budget_ms]
+    return max(fitting, key=lambda r: (r["macro_f1"], -r["p99_ms"])) if fitting else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--config", nargs="+", default=DEFAULT_CONFIGS, help="pipeline configs")
+    parser.add_argument("--nlu", default=DEFAULT_NLU_DATA, help="NLU training data")
+    parser.add_argument("--train-frac", type=float, default=0.8, help="share used for training")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the split")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed parses per model")
+    parser.add_argument("--budget-ms", type=float, help="p99 latency budget for a parse")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    train_data, test_data = load_data(args.nlu).train_test_split(
+        train_frac=args.train_frac, random_seed=args.seed)
+    test_examples = [(m.get(TEXT), m.get(INTENT)) for m in test_data.intent_examples]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        train_path = os.path.join(work_dir, "train.yml")
+        train_data.persist_nlu(train_path)
+        results = [evaluate(config, train_path, test_examples, work_dir, args.warmup)
+                   for config in args.config]
+
+    chosen = choose(results, args.budget_ms) if args.budget_ms is not None else None
+    if args.json:
+        print(json.dumps({
+            "held_out": len(test_examples),
+            "results": results,
+            "budget_ms": args.budget_ms,
+            "chosen": chosen["config"] if chosen else None,
+        }, indent=2))
+        return 0
+
+    print(f"held-out examples: {len(test_examples)}")
+    print(f"{'config':<24}{'F1':>7}{'acc':>7}{'p50 ms':>9}{'p99 ms':>9}{'train s':>9}{'KiB':>9}")
+    for r in results:
+        print(f"{os.path.basename(r['config']):<24}{r['macro_f1']:>7.3f}{r['accuracy']:>7.3f}"
+              f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['train_s']:>9.1f}{r['model_kib']:>9.0f}")
+    if args.budget_ms is not None:
+        print(f"within {args.budget_ms:g} ms p99: "
+              f"{os.path.basename(chosen['config']) if chosen else 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
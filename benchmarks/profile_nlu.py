@@ -0,0 +1,206 @@
+"""
+Per-component latency and memory profile of the NLU pipeline.
+
+Loads a trained model's predict graph with a timing hook on every node and
+parses each example in data/nlu.yml through it. Reports p50/p99 time per
+component (WhitespaceTokenizer, the featurizers, DIETClassifier, ...) and
+for the whole parse. With --memory, a second pass reports the peak Python
+memory each component allocates (tracemalloc: TensorFlow's own buffers are
+not included). The NLU result cache is emptied before every parse so the
+full pipeline is measured; pass --warm-cache to measure cache hits instead.
+
+Usage (from the project root, with a trained model in models/):
+    python benchmarks/profile_nlu.py [--model models/x.tar.gz] [--repeat 5] [--memory] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# addons.* pipeline components are imported from the project root
+sys.path.insert(0, PROJECT_DIR)
+# No NLU cache metrics port next to a running Rasa server
+os.environ.setdefault("NLU_CACHE_METRICS_PORT", "0")
+
+from rasa.core.channels.channel import UserMessage  # noqa: E402
+from rasa.engine.constants import PLACEHOLDER_MESSAGE  # noqa: E402
+from rasa.engine.graph import ExecutionContext, GraphNodeHook  # noqa: E402
+from rasa.engine.runner.dask import DaskGraphRunner  # noqa: E402
+from rasa.engine.storage.local_model_storage import LocalModelStorage  # noqa: E402
+from rasa.model import get_latest_model  # noqa: E402
+from rasa.shared.nlu.constants import INTENT, TEXT  # noqa: E402
+from rasa.shared.nlu.training_data.loading import load_data  # noqa: E402
+
+from addons.nlu_cache import clear_caches  # noqa: E402
+
+DEFAULT_NLU_DATA = os.path.join(PROJECT_DIR, "data", "nlu.yml")
+
+
+class ProfilingHook(GraphNodeHook):
+    """Records wall time (and optionally peak allocations) per graph node"""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.enabled = True
+        self.timings = defaultdict(list)
+        self.peaks = defaultdict(int)
+
+    def on_before_node(self, node_name, execution_context, config, received_inputs):
+        started_memory = None
+        if self.memory:
+            tracemalloc.reset_peak()
+            started_memory = tracemalloc.get_traced_memory()[0]
+        return {"started": time.perf_counter(), "memory": started_memory}
+
+    def on_after_node(self, node_name, execution_context, config, output, input_hook_data):
+        elapsed = time.perf_counter() - input_hook_data["started"]
+        if not self.enabled:
+            return
+        self.timings[node_name].append(elapsed)
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1] - input_hook_data["memory"]
+            self.peaks[node_name] = max(self.peaks[node_name], peak)
+
+
+def load_parser(model_path, hooks=None):
+    """parse(text) -> parsed Message, using the model's NLU predict graph"""
+    model_storage, metadata = LocalModelStorage.from_model_archive(
+        Path(tempfile.mkdtemp()), Path(model_path))
+    runner = DaskGraphRunner.create(
+        graph_schema=metadata.predict_schema,
+        model_storage=model_storage,
+        execution_context=ExecutionContext(graph_schema=metadata.predict_schema,
+                                           model_id=metadata.model_id),
+        hooks=hooks or [],
+    )
+
+    def parse(text):
+        results = runner.run(inputs={PLACEHOLDER_MESSAGE: [UserMessage(text)]},
+                             targets=[metadata.nlu_target])
+        return results[metadata.nlu_target][0]
+
+    return parse
+
+
+def load_examples(nlu_path=DEFAULT_NLU_DATA):
+    """[(text, intent)] for every intent example in an NLU data file"""
+    training_data = load_data(nlu_path)
+    return [(m.get(TEXT), m.get(INTENT)) for m in training_data.intent_examples]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def latency_summary(seconds):
+    return {
+        "calls": len(seconds),
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p99_ms": percentile(seconds, 99) * 1000,
+        "mean_ms": sum(seconds) / len(seconds) * 1000 if seconds else 0.0,
+    }
+
+
+def timed_parses(parse, texts, repeat, warm_cache=False):
+    """Parse every text repeat times; returns per-parse wall times"""
+    seconds = []
+    for _ in range(repeat):
+        for text in texts:
+            if not warm_cache:
+                clear_caches()
+            started = time.perf_counter()
+            parse(text)
+            seconds.append(time.perf_counter() - started)
+    return seconds
+
+
+def profile(model_path, nlu_path, repeat, warmup, memory, warm_cache):
+    texts = [text for text, _ in load_examples(nlu_path)]
+    hook = ProfilingHook()
+    parse = load_parser(model_path, hooks=[hook])
+
+    # First parses build TensorFlow graphs and fill caches
+    hook.enabled = False
+    for text in texts[:warmup]:
+        parse(text)
+    hook.enabled = True
+
+    total = timed_parses(parse, texts, repeat, warm_cache)
+    parse_total = sum(total)
+    components = {}
+    for node, seconds in hook.timings.items():
+        components[node] = latency_summary(seconds)
+        components[node]["share"] = sum(seconds) / parse_total if parse_total else 0.0
+
+    if memory:
+        hook.timings.clear()
+        hook.memory = True
+        tracemalloc.start()
+        try:
+            timed_parses(parse, texts, 1, warm_cache)
+        finally:
+            tracemalloc.stop()
+        for node, peak in hook.peaks.items():
+            components.setdefault(node, {})["peak_kib"] = peak / 1024
+
+    return {
+        "model": str(model_path),
+        "examples": len(texts),
+        "repeat": repeat,
+        "warm_cache": warm_cache,
+        "parse": latency_summary(total),
+        "components": components,
+    }
+
+
+def print_report(report):
+    print(f"model: {report['model']}  examples: {report['examples']} x {report['repeat']}"
+          f"{'  (warm cache)' if report['warm_cache'] else ''}")
+    print(f"{'component':<44}{'p50 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'share':>8}{'peak KiB':>10}")
+    for node, stats in report["components"].items():
+        peak = stats.get("peak_kib")
+        print(f"{node:<44}{stats.get('p50_ms', 0):>9.2f}{stats.get('p99_ms', 0):>9.2f}"
+              f"{stats.get('mean_ms', 0):>9.2f}{stats.get('share', 0):>7.1%}"
+              f"{(f'{peak:.0f}' if peak is not None else '-'):>10}")
+    parse = report["parse"]
+    print(f"{'whole parse':<44}{parse['p50_ms']:>9.2f}{parse['p99_ms']:>9.2f}{parse['mean_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", help="model archive (default: latest in models/)")
+    parser.add_argument("--nlu", default=DEFAULT_NLU_DATA, help="NLU examples to parse")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the examples")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed parses first")
+    parser.add_argument("--memory", action="store_true", help="also measure peak memory")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="keep the NLU result cache between parses")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    model_path = args.model or get_latest_model(os.path.join(PROJECT_DIR, "models"))
+    if not model_path:
+        parser.error("no trained model found; run `rasa train` first or pass --model")
+
+    report = profile(model_path, args.nlu, args.repeat, args.warmup, args.memory, args.warm_cache)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""
+Story-driven load generator: simulated guests holding whole conversations.
+
+Builds conversation scripts from data/stories.yml: every `intent:` step
+becomes a message drawn from that intent's examples in data/nlu.yml, and
+every `active_loop: booking_form` becomes a full form fill in the domain's
+required_slots order. Form answers come from the provide_* examples and
+are split into valid and invalid ones with actions.validation; with
+--invalid-rate a guest first gives an invalid answer, then a valid one.
+
+Guests arrive as a Poisson process (--rate per second), each with its own
+sender id, wait a random think time (--think, exponential mean in seconds)
+before every message, and talk to the gateway's POST /chat. Reports
+per-turn latency (overall and by kind of turn), end-to-end booking
+latency, peak concurrent guests, and completion and error rates.
+
+The gateway rate limits per client IP: run it with RATE_LIMIT_IP=0, or
+with RATE_LIMIT_TRUST_PROXY=1 and --spoof-ips so each guest gets its own
+X-Forwarded-For address. Against a real Rasa, confirmed bookings are
+written to the booking log, so point BOOKINGS_PATH at a scratch file.
+
+Usage (from the project root, gateway on :5001, e.g. with benchmarks/stub_rasa.py):
+    python benchmarks/replay_stories.py [--guests 2000] [--rate 50] [--think 3]
+        [--invalid-rate 0.2] [--output run.json] [--compare base.json] [--json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import aiohttp
+import yaml
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from actions.validation import validate_slot  # noqa: E402
+from results import add_output_arguments, document, emit, latency_stats  # noqa: E402
+
+ENTITY_PATTERN = re.compile(r"\[([^\]]+)\]\((\w+)\)")
+FORM_NAME = "booking_form"
+
+# Answers no validator accepts, on top of the rejected NLU examples
+INVALID_EXTRA = {
+    "guest_name": ["J", "I want to book a room", "12345"],
+    "email": ["not-an-email", "john at example dot com"],
+    "phone": ["12345", "call me maybe"],
+    "checkin_date": ["whenever", "yesterday"],
+    "checkout_date": ["later", "soon"],
+    "num_guests": ["a few", "50 people"],
+    "room_type": ["penthouse", "the big one"],
+    "special_requests": ["x" * 250],
+    "breakfast": ["maybe"],
+    "payment_method": ["bitcoin", "IOU"],
+}
+# Used when no NLU example is valid (e.g. every checkout date is before
+# the chosen check-in)
+VALID_FALLBACK = {
+    "guest_name": "John Smith",
+    "email": "john.smith@example.com",
+    "phone": "+1 555 123 4567",
+    "checkin_date": "tomorrow",
+    "num_guests": "2",
+    "room_type": "double",
+    "special_requests": "none",
+    "breakfast": "yes",
+    "payment_method": "credit card",
+}
+
+
+@dataclass
+class Turn:
+    kind: str          # intent name, or "form:<slot>"
+    text: str
+    valid: bool = True
+
+
+@dataclass
+class GuestStats:
+    turns: list = field(default_factory=list)       # (kind, seconds, status)
+    conversations: list = field(default_factory=list)  # per-conversation dicts
+    active: int = 0
+    peak_active: int = 0
+
+
+def load_yaml(*parts):
+    with open(os.path.join(PROJECT_DIR, *parts), "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_examples():
+    """{intent: [(text with annotations stripped, {entity: value})]}"""
+    examples = {}
+    for item in load_yaml("data", "nlu.yml").get("nlu", []):
+        if "intent" not in item:
+            continue
+        lines = [line.strip()[2:] for line in item.get("examples", "").splitlines()
+                 if line.strip().startswith("- ")]
+        examples[item["intent"]] = [
+            (ENTITY_PATTERN.sub(r"\1", line), dict((v, k) for k, v in ENTITY_PATTERN.findall(line)))
+            for line in lines
+        ]
+    return examples
+
+
+def load_stories():
+    """[(name, steps)] where a step is ("intent", name) or ("form", None)"""
+    stories = []
+    for story in load_yaml("data", "stories.yml").get("stories", []):
+        steps = []
+        for step in story.get("steps", []):
+            if "intent" in step:
+                steps.append(("intent", step["intent"]))
+            elif step.get("active_loop") == FORM_NAME:
+                steps.append(("form", None))
+        if steps:
+            stories.append((story.get("story", f"story {len(stories) + 1}"), steps))
+    return stories
+
+
+class ConversationFactory:
+    """Turns story steps into concrete messages for one guest"""
+
+    def __init__(self, invalid_rate, rng):
+        domain = load_yaml("domain.yml")
+        self.required_slots = domain["forms"][FORM_NAME]["required_slots"]
+        self.examples = load_examples()
+        self.invalid_rate = invalid_rate
+        self.rng = rng
+        # Candidate answers per slot: (text said, value the slot would get)
+        self.answers = {}
+        for slot in self.required_slots:
+            entity = self._slot_entity(domain, slot)
+            candidates = []
+            for text, entities in self.examples.get(self._slot_intent(slot, entity), []):
+                candidates.append((text, entities.get(entity, text)))
+            candidates += [(text, text) for text in INVALID_EXTRA.get(slot, [])]
+            self.answers[slot] = candidates
+
+    def _slot_entity(self, domain, slot):
+        for mapping in domain["slots"][slot].get("mappings", []):
+            if mapping.get("type") == "from_entity":
+                return mapping["entity"]
+        return slot
+
+    def _slot_intent(self, slot, entity):
+        for name in (f"provide_{slot}", f"provide_{entity}"):
+            if name in self.examples:
+                return name
+        return None
+
+    def message(self, intent):
+        examples = self.examples.get(intent) or [(intent, {})]
+        return self.rng.choice(examples)[0]
+
+    def form_turns(self):
+        turns, filled = [], {}
+        for slot in self.required_slots:
+            valid, invalid = [], []
+            for text, value in self.answers[slot]:
+                result = validate_slot(slot, value, filled)
+                (valid if result.value is not None else invalid).append((text, result.value))
+            if invalid and self.rng.random() < self.invalid_rate:
+                turns.append(Turn(f"form:{slot}", self.rng.choice(invalid)[0], valid=False))
+            if valid:
+                text, value = self.rng.choice(valid)
+            else:
+                text = VALID_FALLBACK.get(slot) or self._checkout_after(filled)
+                value = validate_slot(slot, text, filled).value
+            turns.append(Turn(f"form:{slot}", text))
+            filled[slot] = value
+        return turns
+
+    @staticmethod
+    def _checkout_after(filled):
+        checkin = filled.get("checkin_date")
+        try:
+            day = date.fromisoformat(checkin) + timedelta(days=3)
+        except (TypeError, ValueError):
+            day = date.today() + timedelta(days=4)
+        return day.strftime("%B %d")
+
+    def conversation(self, steps):
+        turns = []
+        for kind, intent in steps:
+            if kind == "form":
+                turns += self.form_turns()
+            else:
+                turns.append(Turn(intent, self.message(intent)))
+        return turns
+
+
+async def run_guest(http, url, guest_id, story, turns, think, spoof_ip, stats, confirm_text):
+    """One simulated guest working through a conversation"""
+    stats.active += 1
+    stats.peak_active = max(stats.peak_active, stats.active)
+    headers = {"X-Forwarded-For": spoof_ip} if spoof_ip else {}
+    started = time.perf_counter()
+    service_time = 0.0
+    outcome = "completed"
+    confirmed = False
+    try:
+        for turn in turns:
+            if think:
+                await asyncio.sleep(min(random.expovariate(1 / think), 5 * think))
+            sent = time.perf_counter()
+            try:
+                async with http.post(f"{url}/chat", headers=headers,
+                                     json={"sender": guest_id, "message": turn.text}) as response:
+                    body = await response.json(content_type=None)
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                body, status = None, type(e).__name__
+            elapsed = time.perf_counter() - sent
+            service_time += elapsed
+            stats.turns.append((turn.kind, elapsed, status))
+            if status != 200:
+                outcome = "shed" if status in (429, 503) else "error"
+                break
+            if turn.kind == "affirm" and confirm_text:
+                confirmed = confirmed or any(
+                    confirm_text in (reply.get("text") or "")
+                    for reply in (body or {}).get("responses", []))
+    finally:
+        stats.active -= 1
+    stats.conversations.append({
+        "story": story,
+        "outcome": outcome,
+        "books": any(turn.kind == "affirm" for turn in turns),
+        "confirmed": confirmed,
+        "seconds": time.perf_counter() - started,
+        "service_seconds": service_time,
+    })
+
+
+async def run_load(args, factory, stories, confirm_text):
+    stats = GuestStats()
+    rng = factory.rng
+    run_id = f"{int(time.time()) % 100000}"
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    tasks = []
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as http:
+        started = time.perf_counter()
+        for n in range(args.guests):
+            story, steps = rng.choice(stories)
+            turns = factory.conversation(steps)
+            spoof_ip = (f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+                        if args.spoof_ips else None)
+            tasks.append(asyncio.create_task(run_guest(
+                http, args.url, f"guest-{run_id}-{n}", story, turns, args.think,
+                spoof_ip, stats, confirm_text)))
+            if args.rate:
+                await asyncio.sleep(rng.expovariate(args.rate))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return stats, elapsed
+
+
+def summarize(stats, elapsed):
+    results = {}
+    turns = stats.turns
+    ok = [seconds for _, seconds, status in turns if status == 200]
+    results["turns"] = {
+        "requests": len(turns),
+        "rps": round(len(turns) / elapsed, 1) if elapsed else 0.0,
+        **latency_stats(ok),
+        "error_rate": round(sum(1 for *_, s in turns if s != 200 and s not in (429, 503))
+                            / len(turns), 4) if turns else 0.0,
+        "shed_rate": round(sum(1 for *_, s in turns if s in (429, 503)) / len(turns), 4)
+        if turns else 0.0,
+    }
+
+    by_kind = defaultdict(list)
+    for kind, seconds, status in turns:
+        if status == 200:
+            by_kind["form" if kind.startswith("form:") else kind].append(seconds)
+    for kind, seconds in sorted(by_kind.items()):
+        results[f"turn:{kind}"] = {"requests": len(seconds), **latency_stats(seconds)}
+
+    conversations = stats.conversations
+    completed = [c for c in conversations if c["outcome"] == "completed"]
+    results["conversations"] = {
+        "guests": len(conversations),
+        "completion_rate": round(len(completed) / len(conversations), 4) if conversations else 0.0,
+        "errored": sum(1 for c in conversations if c["outcome"] == "error"),
+        "shed": sum(1 for c in conversations if c["outcome"] == "shed"),
+        "peak_concurrent": stats.peak_active,
+    }
+    bookings = [c for c in completed if c["books"]]
+    if bookings:
+        results["booking_end_to_end"] = {
+            "bookings": len(bookings),
+            "confirmed": sum(1 for c in bookings if c["confirmed"]),
+            **latency_stats([c["seconds"] for c in bookings]),
+            "service_p50_ms": latency_stats([c["service_seconds"] for c in bookings])["p50_ms"],
+            "service_p99_ms": latency_stats([c["service_seconds"] for c in bookings])["p99_ms"],
+        }
+    return results
+
+
+def print_table(doc):
+    config, results = doc["config"], doc["results"]
+    conversations = results["conversations"]
+    print(f"{conversations['guests']} guests at {config['rate']:g}/s, think {config['think']:g}s, "
+          f"invalid answers {config['invalid_rate']:.0%}; peak {conversations['peak_concurrent']} "
+          f"concurrent")
+    print(f"completed {conversations['completion_rate']:.1%}  errored {conversations['errored']}  "
+          f"shed {conversations['shed']}")
+    turns = results["turns"]
+    print(f"turns: {turns['requests']} ({turns['rps']:.1f}/s), error rate {turns['error_rate']:.2%}, "
+          f"shed rate {turns['shed_rate']:.2%}")
+    print(f"{'latency':<26}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, r in results.items():
+        if name == "turns" or name.startswith("turn:") or name == "booking_end_to_end":
+            n = r.get("requests", r.get("bookings"))
+            print(f"{name:<26}{n:>8}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+                  f"{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}")
+    booking = results.get("booking_end_to_end")
+    if booking:
+        print(f"booking service time (sum of turn latencies): p50 {booking['service_p50_ms']:.0f} ms, "
+              f"p99 {booking['service_p99_ms']:.0f} ms; confirmed by the bot: {booking['confirmed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:5001", help="gateway base URL")
+    parser.add_argument("--guests", type=int, default=1000, help="conversations to run")
+    parser.add_argument("--rate", type=float, default=20, help="new guests per second (0: all at once)")
+    parser.add_argument("--think", type=float, default=3, help="mean think time in seconds")
+    parser.add_argument("--invalid-rate", type=float, default=0.2,
+                        help="chance a form answer is first given invalid")
+    parser.add_argument("--story", nargs="+", help="only stories whose name contains one of these")
+    parser.add_argument("--connections", type=int, default=1000, help="max open connections")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds per request")
+    parser.add_argument("--spoof-ips", action="store_true",
+                        help="one X-Forwarded-For address per guest")
+    parser.add_argument("--seed", type=int, help="random seed for repeatable conversations")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    args.url = args.url.rstrip("/")
+
+    stories = load_stories()
+    if args.story:
+        stories = [(name, steps) for name, steps in stories
+                   if any(part.lower() in name.lower() for part in args.story)]
+    if not stories:
+        parser.error("no stories to replay")
+    rng = random.Random(args.seed)
+    factory = ConversationFactory(args.invalid_rate, rng)
+    confirm_text = ((load_yaml("domain.yml").get("responses", {})
+                     .get("utter_confirm_booking") or [{}])[0].get("text") or "")[:40]
+
+    stats, elapsed = asyncio.run(run_load(args, factory, stories, confirm_text))
+    config = {
+        "url": args.url,
+        "guests": args.guests,
+        "rate": args.rate,
+        "think": args.think,
+        "invalid_rate": args.invalid_rate,
+        "stories": [name for name, _ in stories],
+        "seed": args.seed,
+        "elapsed_s": round(elapsed, 1),
+    }
+    emit(document("replay_stories", config, summarize(stats, elapsed)), args, print_table,
+         ["rps", "p50_ms", "p99_ms", "completion_rate"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
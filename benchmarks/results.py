@@ -0,0 +1,132 @@
+"""
+Shared result helpers for the benchmark scripts.
+
+Every script can write its results as one JSON document (--output) with the
+run's metadata, and compare them against an earlier document (--compare):
+
+    {"benchmark": "gateway", "run": {...}, "config": {...}, "results": {...}}
+
+results maps a scenario name to flat numbers (rps, p50_ms, p99_ms, ...).
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metrics where a higher value is better; for the rest (latencies, errors)
+# lower is better
+HIGHER_IS_BETTER = ("rps", "ops_per_s", "completion_rate")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def latency_stats(seconds):
+    """p50/p95/p99/max/mean in milliseconds"""
+    if not seconds:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "mean_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(seconds, 50) * 1000, 3),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 3),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 3),
+        "max_ms": round(max(seconds) * 1000, 3),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 3),
+    }
+
+
+def run_info():
+    """Where and on what code a benchmark ran"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def document(benchmark, config, results):
+    return {"benchmark": benchmark, "run": run_info(), "config": config, "results": results}
+
+
+def save(doc, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current, baseline, metrics):
+    """{scenario: {metric: (baseline, current, change)}} for shared scenarios"""
+    changes = {}
+    for scenario, values in current["results"].items():
+        before = baseline.get("results", {}).get(scenario)
+        if not before:
+            continue
+        changes[scenario] = {}
+        for metric in metrics:
+            old, new = before.get(metric), values.get(metric)
+            if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+                change = (new - old) / old if old else None
+                changes[scenario][metric] = (old, new, change)
+    return changes
+
+
+def print_comparison(changes, baseline):
+    run = baseline.get("run", {})
+    print(f"\nvs. baseline {run.get('commit') or '?'} ({run.get('timestamp') or '?'}):")
+    for scenario, metrics in changes.items():
+        parts = []
+        for metric, (old, new, change) in metrics.items():
+            if change is None:
+                parts.append(f"{metric} {old:g} -> {new:g}")
+                continue
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            mark = "+" if better else "-" if change else " "
+            parts.append(f"{metric} {old:g} -> {new:g} ({change:+.1%}{mark})")
+        print(f"  {scenario:<20}" + ", ".join(parts))
+
+
+def emit(doc, args, table, metrics):
+    """Print (table or JSON), then --output and --compare handling"""
+    if getattr(args, "json", False):
+        print(json.dumps(doc, indent=2))
+    else:
+        table(doc)
+    if getattr(args, "output", None):
+        save(doc, args.output)
+    if getattr(args, "compare", None):
+        baseline = load(args.compare)
+        changes = compare(doc, baseline, metrics)
+        if args.json:
+            print(json.dumps({scenario: {metric: {"baseline": old, "current": new, "change": change}
+                                         for metric, (old, new, change) in values.items()}
+                              for scenario, values in changes.items()}, indent=2),
+                  file=sys.stderr)
+        else:
+            print_comparison(changes, baseline)
+
+
+def add_output_arguments(parser):
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare with")
@@ -0,0 +1,173 @@
+"""
+Stand-in for the Rasa server (and action server health check) in benchmarks.
+
+Answers the endpoints the gateway calls, after a configurable delay, so the
+gateway can be load tested without a trained model:
+
+    GET  /status                                 model loaded
+    GET  /health                                 (as the action server)
+    POST /webhooks/rest/webhook[?stream=true]    echoes the message
+    POST /conversations/<id>/tracker/events      accepts any event
+    GET  /conversations/<id>/tracker             events received so far
+
+Each reply has --replies bot messages; with ?stream=true they are sent as
+line-delimited JSON, --stream-gap ms apart, like the streaming REST channel.
+
+Usage (standalone, or started in-process by bench_gateway.py):
+    python benchmarks/stub_rasa.py [--port 5005] [--latency 50] [--jitter 10]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class StubRasaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The gateway keeps a pool of keep-alive connections open
+    request_queue_size = 256
+
+    def __init__(self, address, latency_ms=50.0, jitter_ms=0.0, replies=1,
+                 stream_gap_ms=0.0):
+        super().__init__(address, StubRasaHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.replies = replies
+        self.stream_gap_ms = stream_gap_ms
+        self.trackers = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        seconds = (self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def count(self, path):
+        with self.lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+
+
+class StubRasaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this, delayed ACKs add
+    # ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/status":
+            self.send_json({"model_id": "stub", "model_file": "models/stub.tar.gz",
+                            "num_active_training_jobs": 0})
+        elif path in ("/", "/health"):
+            self.send_json({"status": "ok"})
+        elif path.startswith("/conversations/") and path.endswith("/tracker"):
+            sender_id = path.split("/")[2]
+            with self.server.lock:
+                events = list(self.server.trackers.get(sender_id, []))
+            self.send_json({"sender_id": sender_id, "events": events})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.read_json()
+        if body is None:
+            self.send_json({"error": "invalid JSON"}, 400)
+            return
+        self.server.delay()
+        if url.path == "/webhooks/rest/webhook":
+            self.server.count("webhook")
+            sender_id = body.get("sender", "default")
+            messages = [{"recipient_id": sender_id,
+                         "text": f"You said: {body.get('message', '')}" if i == 0 else f"Reply {i + 1}"}
+                        for i in range(self.server.replies)]
+            if "stream=true" in (url.query or ""):
+                self.stream(messages)
+            else:
+                self.send_json(messages)
+        elif url.path.startswith("/conversations/") and url.path.endswith("/tracker/events"):
+            self.server.count("tracker_events")
+            sender_id = url.path.split("/")[2]
+            events = body if isinstance(body, list) else [body]
+            with self.server.lock:
+                self.server.trackers.setdefault(sender_id, []).extend(events)
+            self.send_json({"sender_id": sender_id, "events": events})
+        elif url.path == "/model/parse":
+            self.server.count("parse")
+            self.send_json({"text": body.get("text"), "intent": {"name": "stub", "confidence": 1.0},
+                            "entities": []})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def stream(self, messages):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, message in enumerate(messages):
+            if i and self.server.stream_gap_ms:
+                time.sleep(self.server.stream_gap_ms / 1000)
+            chunk = (json.dumps(message) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_stub(host="127.0.0.1", port=0, **options):
+    """Serve a StubRasaServer from a daemon thread (port 0: any free port)"""
+    server = StubRasaServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="stub-rasa", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--latency", type=float, default=50, help="ms per POST")
+    parser.add_argument("--jitter", type=float, default=0, help="+/- ms of random jitter")
+    parser.add_argument("--replies", type=int, default=1, help="bot messages per turn")
+    parser.add_argument("--stream-gap", type=float, default=0,
+                        help="ms between streamed messages")
+    args = parser.parse_args()
+
+    server = StubRasaServer((args.host, args.port), latency_ms=args.latency,
+                            jitter_ms=args.jitter, replies=args.replies,
+                            stream_gap_ms=args.stream_gap)
+    print(f"Stub Rasa on {server.url} ({args.latency:g}±{args.jitter:g} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
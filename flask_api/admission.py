@@ -0,0 +1,301 @@
+"""
+Admission control in front of Rasa
+Sheds load early instead of letting every request wait out the upstream
+timeout during a spike:
+
+- RateLimiter: token buckets per key (sender, client IP) -> 429
+- ConcurrencyLimiter: caps concurrent upstream calls; extra callers wait in
+  a bounded queue until a deadline -> 503
+- CircuitBreaker: after repeated upstream failures, fails fast for a
+  cool-down period, then lets a trial request through -> 503
+
+Every rejection carries a retry_after hint for the Retry-After header.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class Rejected(Exception):
+    """A request was refused before reaching Rasa"""
+
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+    def body(self):
+        return {"error": self.message, "retry_after": self.retry_after}
+
+    def header(self):
+        """Retry-After value (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimiter:
+    """
+    Token bucket per key: rate tokens/second up to burst.
+
+    Buckets live in an LRU bounded by max_keys; an evicted key simply
+    starts again with a full bucket. rate <= 0 disables the limiter.
+    """
+
+    def __init__(self, name, rate, burst, max_keys=100000):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._limited = 0
+
+    def check(self, key, cost=1):
+        """Take cost tokens for key or raise Rejected (429)"""
+        if self.rate <= 0 or key is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = None
+            else:
+                retry_after = (cost - tokens) / self.rate
+                self._limited += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if retry_after is not None:
+            raise Rejected(429, f"Rate limit exceeded ({self.name})", retry_after)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate_per_s": self.rate,
+                "burst": self.burst,
+                "tracked_keys": len(self._buckets),
+                "limited": self._limited,
+            }
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures;
+    open -> half_open after reset_timeout; half_open lets up to
+    half_open_max trial calls through and closes on the first success
+    (or re-opens on a failure). A trial that ends without an outcome must
+    hand its slot back with release(); if trials still hold every slot
+    after reset_timeout, the breaker re-opens so it cannot stay half_open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, half_open_max=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        self._counters = {"opened": 0, "short_circuited": 0}
+
+    def before_call(self):
+        """Raise Rejected (503) while open; otherwise let the call through"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    self._counters["short_circuited"] += 1
+                    raise Rejected(503, "Chatbot is temporarily unavailable", remaining)
+                self._state = self.HALF_OPEN
+                self._half_opened_at = now
+                self._trials = 0
+            if self._state == self.HALF_OPEN:
+                if self._trials >= self.half_open_max:
+                    if now - self._half_opened_at >= self.reset_timeout:
+                        # Trials never reported back; start another open period
+                        self._state = self.OPEN
+                        self._opened_at = now
+                    self._counters["short_circuited"] += 1
+                    raise Rejected(503, "Chatbot is temporarily unavailable", self.reset_timeout)
+                self._trials += 1
+
+    def release(self):
+        """End a call that produced no outcome (e.g. the caller failed), freeing its trial slot"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._counters["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        return self._state
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_s": self.reset_timeout,
+                **self._counters,
+            }
+
+
+class _LimiterStats:
+    def __init__(self, limit, max_queue, queue_timeout):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_in_flight = 0
+        self.peak_queued = 0
+        self.counters = {
+            "admitted": 0,
+            "queued_total": 0,
+            "shed_queue_full": 0,
+            "shed_timeout": 0,
+        }
+        self.total_wait_ms = 0.0
+
+    def admit(self, waited_s=None):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.counters["admitted"] += 1
+        if waited_s is not None:
+            self.total_wait_ms += waited_s * 1000
+
+    def enqueue(self):
+        if self.queued >= self.max_queue:
+            self.counters["shed_queue_full"] += 1
+            raise Rejected(503, "Server is busy, please retry shortly", self.queue_timeout)
+        self.queued += 1
+        self.counters["queued_total"] += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+
+    def timed_out(self):
+        self.counters["shed_timeout"] += 1
+        return Rejected(503, "Server is busy, please retry shortly", self.queue_timeout)
+
+    def snapshot(self):
+        queued_total = self.counters["queued_total"]
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "queue_timeout_s": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "peak_in_flight": self.peak_in_flight,
+            "peak_queue_depth": self.peak_queued,
+            **self.counters,
+            "avg_queue_wait_ms": self.total_wait_ms / queued_total if queued_total else 0.0,
+        }
+
+
+class ConcurrencyLimiter:
+    """At most limit concurrent upstream calls; bounded FIFO-ish wait queue"""
+
+    def __init__(self, limit, max_queue=100, queue_timeout=2.0):
+        self._stats = _LimiterStats(limit, max_queue, queue_timeout)
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        stats = self._stats
+        with self._cond:
+            if stats.in_flight < stats.limit and stats.queued == 0:
+                stats.admit()
+                return
+            stats.enqueue()
+            started = time.monotonic()
+            deadline = started + stats.queue_timeout
+            try:
+                while stats.in_flight >= stats.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise stats.timed_out()
+                    self._cond.wait(remaining)
+            finally:
+                stats.queued -= 1
+            stats.admit(time.monotonic() - started)
+
+    def release(self):
+        with self._cond:
+            self._stats.in_flight -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        with self._cond:
+            return self._stats.snapshot()
+
+
+class AsyncConcurrencyLimiter:
+    """asyncio version of ConcurrencyLimiter (one per event loop)"""
+
+    def __init__(self, limit, max_queue=100, queue_timeout=2.0):
+        self._stats = _LimiterStats(limit, max_queue, queue_timeout)
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        stats = self._stats
+        if stats.in_flight < stats.limit and stats.queued == 0:
+            stats.admit()
+            return
+        stats.enqueue()
+        started = time.monotonic()
+        try:
+            async with self._cond:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: stats.in_flight < stats.limit),
+                    stats.queue_timeout)
+                stats.admit(time.monotonic() - started)
+        except asyncio.TimeoutError:
+            raise stats.timed_out()
+        finally:
+            stats.queued -= 1
+
+    async def release(self):
+        self._stats.in_flight -= 1
+        async with self._cond:
+            self._cond.notify()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+    def stats(self):
+        return self._stats.snapshot()
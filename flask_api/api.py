@@ -3,14 +3,31 @@ Flask API for Hotel Booking Chatbot
 Provides REST endpoints to interact with the Rasa chatbot from any frontend
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import requests
 import uuid
+import functools
+import json
 import logging
 import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from admission import CircuitBreaker, ConcurrencyLimiter, RateLimiter, Rejected
+from conversation_log import create_conversation_log
+from health import HealthProber, READY, WARMING_UP, UNKNOWN, action_server_url
+from http_cache import (
+    CachedBody, ResponseCache, StaticFiles, content_etag, is_fresh, negotiate
+)
+from rasa_client import RasaClient
+from sender_gate import SenderBusy, SenderGate
+from session_store import create_session_store
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,41 +36,280 @@ logger = logging.getLogger(__name__)
 basedir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = os.path.dirname(basedir)
 
-app = Flask(__name__, 
-            static_folder='static',
-            static_url_path='/static')
+# The booking log is shared with the action server (actions/booking_store.py)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from actions.booking_store import (  # noqa: E402
+    BookingStore, BookingView, INDEXED_FIELDS, LEGACY_BOOKINGS_PATH
+)
+from actions.inventory import InventoryTracker  # noqa: E402
+from prevalidation import PreValidator  # noqa: E402
+import metrics  # noqa: E402
+
+# Static files are served by static_file() below, from memory
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for frontend integration
 
+booking_store = BookingStore(legacy_path=LEGACY_BOOKINGS_PATH)
+# Parsed view of the log; each /bookings poll only parses newly appended records
+booking_view = BookingView(booking_store.path)
+# Room availability over the same view (O(log n) per room type and query)
+inventory_tracker = InventoryTracker(booking_view)
+BOOKINGS_PAGE_SIZE = 50
+BOOKINGS_MAX_PAGE_SIZE = 500
+
+# Serialized bodies with strong ETags (304 on If-None-Match) and gzip/brotli
+# variants, for /bookings pages (per log version and query), /docs and the
+# frontend's static files
+BOOKINGS_RESPONSE_CACHE = int(os.environ.get("BOOKINGS_RESPONSE_CACHE", "128"))
+bookings_cache = ResponseCache(BOOKINGS_RESPONSE_CACHE)
+static_files = StaticFiles(os.path.join(basedir, 'static'))
+
 # Rasa server configuration
-RASA_API_URL = "http://localhost:5005"
+RASA_API_URL = os.environ.get("RASA_API_URL", "http://localhost:5005").rstrip("/")
 RASA_WEBHOOKS_URL = f"{RASA_API_URL}/webhooks/rest/webhook"
 
-# Store active sessions (in production, use Redis or a database)
-active_sessions = {}
+# Shared keep-alive connection pool for every upstream call
+RASA_POOL_SIZE = int(os.environ.get("RASA_POOL_SIZE", "20"))
+RASA_CONNECT_TIMEOUT = float(os.environ.get("RASA_CONNECT_TIMEOUT", "3.05"))
+RASA_READ_TIMEOUT = float(os.environ.get("RASA_READ_TIMEOUT", "10"))
+rasa_client = RasaClient(RASA_API_URL,
+                         pool_size=RASA_POOL_SIZE,
+                         connect_timeout=RASA_CONNECT_TIMEOUT,
+                         read_timeout=RASA_READ_TIMEOUT,
+                         observer=metrics.observe_upstream)
+metrics.upstream_in_flight.callback = lambda: rasa_client.in_flight
+
+# Admission control: token buckets per sender and client IP (429), a cap on
+# concurrent upstream calls with a bounded, deadline-limited wait queue, and
+# a circuit breaker that fails fast while Rasa is failing (503). A rate of 0
+# disables that limiter.
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get("UPSTREAM_MAX_CONCURRENCY", str(RASA_POOL_SIZE)))
+UPSTREAM_MAX_QUEUE = int(os.environ.get("UPSTREAM_MAX_QUEUE", "100"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT", "2"))
+RATE_LIMIT_SENDER = float(os.environ.get("RATE_LIMIT_SENDER", "2"))
+RATE_LIMIT_SENDER_BURST = int(os.environ.get("RATE_LIMIT_SENDER_BURST", "5"))
+RATE_LIMIT_IP = float(os.environ.get("RATE_LIMIT_IP", "20"))
+RATE_LIMIT_IP_BURST = int(os.environ.get("RATE_LIMIT_IP_BURST", "40"))
+# Only trust X-Forwarded-For behind a proxy that sets it
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", "10"))
+upstream_limiter = ConcurrencyLimiter(UPSTREAM_MAX_CONCURRENCY,
+                                      max_queue=UPSTREAM_MAX_QUEUE,
+                                      queue_timeout=UPSTREAM_QUEUE_TIMEOUT)
+upstream_breaker = CircuitBreaker(failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                                  reset_timeout=BREAKER_RESET_TIMEOUT)
+sender_rate_limiter = RateLimiter("sender", RATE_LIMIT_SENDER, RATE_LIMIT_SENDER_BURST)
+ip_rate_limiter = RateLimiter("ip", RATE_LIMIT_IP, RATE_LIMIT_IP_BURST)
+
+# Turns for one sender run one at a time; a double-clicked send or client
+# retry (same text within the window, or same Idempotency-Key) shares the
+# first copy's upstream call instead of replaying the turn in Rasa
+SENDER_COALESCE_WINDOW = float(os.environ.get("SENDER_COALESCE_WINDOW", "2"))
+IDEMPOTENCY_KEY_TTL = float(os.environ.get("IDEMPOTENCY_KEY_TTL", "300"))
+SENDER_MAX_QUEUED = int(os.environ.get("SENDER_MAX_QUEUED", "5"))
+SENDER_QUEUE_TIMEOUT = float(os.environ.get("SENDER_QUEUE_TIMEOUT", "30"))
+SENDER_BUSY_ERROR = {
+    "error": "Too many messages from this sender are still being processed"
+}
+sender_gate = SenderGate(window=SENDER_COALESCE_WINDOW,
+                         key_ttl=IDEMPOTENCY_KEY_TTL,
+                         max_queued=SENDER_MAX_QUEUED,
+                         queue_timeout=SENDER_QUEUE_TIMEOUT)
+
+# /chat/batch fan-out: one shared pool bounds upstream concurrency across
+# all batch requests; each sender's messages stay on one worker, in order
+CHAT_BATCH_MAX_ITEMS = int(os.environ.get("CHAT_BATCH_MAX_ITEMS", "100"))
+CHAT_BATCH_CONCURRENCY = int(os.environ.get("CHAT_BATCH_CONCURRENCY",
+                                            str(min(RASA_POOL_SIZE, 16))))
+chat_batch_executor = ThreadPoolExecutor(max_workers=CHAT_BATCH_CONCURRENCY,
+                                         thread_name_prefix="chat-batch")
+
+# Clearly invalid answers to a booking_form question (bad email, phone,
+# guest count, ...) are rejected here with the action server's own message
+# instead of a round trip through Rasa. Empty PREVALIDATE_SLOTS disables it.
+PREVALIDATE_SLOTS = [s.strip() for s in os.environ.get(
+    "PREVALIDATE_SLOTS",
+    "email,phone,checkin_date,num_guests,room_type,breakfast,payment_method"
+).split(",") if s.strip()]
+prevalidator = None
+if PREVALIDATE_SLOTS:
+    try:
+        prevalidator = PreValidator(os.path.join(parent_dir, "domain.yml"),
+                                    os.path.join(parent_dir, "data", "nlu.yml"),
+                                    slots=PREVALIDATE_SLOTS)
+    except Exception as e:
+        logger.error(f"Pre-validation disabled: {e}")
+
+# Rasa and action server are probed in the background; /health* endpoints
+# answer from the cached result instead of calling upstream per request
+HEALTH_PROBE_INTERVAL = float(os.environ.get("HEALTH_PROBE_INTERVAL", "5"))
+HEALTH_PROBE_TIMEOUT = float(os.environ.get("HEALTH_PROBE_TIMEOUT", "2"))
+# warmup.py's record (./run.sh server) is reported in the health responses;
+# with WARMUP_REQUIRED=1 the gateway is not ready until it covers the model
+# Rasa is serving (only for a Rasa that is always started through run.sh)
+WARMUP_MARKER = os.environ.get("WARMUP_MARKER", os.path.join(parent_dir, "warmup.json"))
+WARMUP_REQUIRED = os.environ.get("WARMUP_REQUIRED", "0") == "1"
+health_prober = HealthProber(RASA_API_URL,
+                             action_server_url(os.path.join(parent_dir, "endpoints.yml")),
+                             interval=HEALTH_PROBE_INTERVAL,
+                             timeout=HEALTH_PROBE_TIMEOUT,
+                             warmup_marker=WARMUP_MARKER,
+                             require_warmup=WARMUP_REQUIRED)
+health_prober.start()
+
+# Active sessions, bounded by LRU + idle TTL. Use SESSION_BACKEND=sqlite to
+# share sessions between gunicorn workers on one host.
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_DB = os.environ.get("SESSION_DB", os.path.join(parent_dir, "sessions.db"))
+SESSION_TTL = int(os.environ.get("SESSION_TTL", "3600"))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "10000"))
+SESSION_MAX_BYTES = int(os.environ.get("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+active_sessions = create_session_store(SESSION_BACKEND,
+                                       path=SESSION_DB,
+                                       max_sessions=SESSION_MAX,
+                                       ttl=SESSION_TTL,
+                                       max_bytes=SESSION_MAX_BYTES)
+metrics.session_store_size.callback = lambda: len(active_sessions)
+
+# One JSON record per chat turn, queued and written by a background thread
+# (rotated by size and day, gzipped); turns are dropped rather than waited
+# for when the queue is full. Empty CONVERSATION_LOG_PATH disables it.
+CONVERSATION_LOG_PATH = os.environ.get("CONVERSATION_LOG_PATH",
+                                       os.path.join(parent_dir, "logs", "conversations.jsonl"))
+conversation_log = create_conversation_log(CONVERSATION_LOG_PATH)
+if conversation_log is not None:
+    metrics.registry.gauge(
+        "gateway_conversation_log_records", "Conversation log records by outcome", ("outcome",),
+        callback=lambda: {(name,): value for name, value in conversation_log.stats().items()
+                          if name in ("written", "dropped", "sampled_out", "queue_depth")})
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_route = metrics.route_label(request.url_rule.rule if request.url_rule else None)
+    g.metrics_started = time.perf_counter()
+    metrics.http_in_flight.inc(g.metrics_route)
+
+
+def observe_request(route, method, status, started):
+    metrics.http_in_flight.dec(route)
+    metrics.http_requests.inc(route, method, status)
+    metrics.http_duration.observe(time.perf_counter() - started, route, method)
+
+
+def record_request_metrics(status):
+    route = g.pop('metrics_route', None)
+    if route is None:
+        return
+    observe_request(route, request.method, status, g.metrics_started)
+
+
+@app.after_request
+def finish_request_metrics(response):
+    if response.is_streamed:
+        # The body (SSE, NDJSON) is generated after this returns, so the
+        # request is only finished once the server closes the response
+        route = g.pop('metrics_route', None)
+        if route is not None:
+            response.call_on_close(functools.partial(
+                observe_request, route, request.method, response.status_code,
+                g.metrics_started))
+        return response
+    record_request_metrics(response.status_code)
+    return response
+
+
+@app.teardown_request
+def abort_request_metrics(error):
+    # Only still pending when a handler raised past the error handlers
+    record_request_metrics(500)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics for the gateway (text exposition format)"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def cached_response(cached):
+    """Response for a CachedBody: 304 if the client's copy is current, else compressed if accepted"""
+    status, body, headers = negotiate(cached, request.headers)
+    return Response(body, status=status, headers=headers)
 
 
 @app.route('/')
 def index():
     """Serve the frontend chat interface"""
-    return send_from_directory('static', 'index.html')
+    return cached_response(static_files.get('index.html'))
 
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    try:
-        response = requests.get(f"{RASA_API_URL}/status", timeout=5)
-        rasa_status = "running" if response.status_code == 200 else "down"
-    except:
+@app.route('/static/<path:filename>')
+def static_file(filename):
+    """Serve a frontend asset (ETag, Last-Modified, gzip)"""
+    cached = static_files.get(filename)
+    if cached is None:
+        return jsonify({"error": "Not found"}), 404
+    return cached_response(cached)
+
+
+def health_payload():
+    """Cached health of the gateway and its upstreams"""
+    snapshot = health_prober.snapshot()
+    rasa = snapshot["components"]["rasa"]["status"]
+    if rasa == READY:
+        rasa_status = "running"
+    elif rasa in (WARMING_UP, UNKNOWN):
+        rasa_status = rasa
+    else:
         rasa_status = "down"
-    
-    return jsonify({
+    return {
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
-        "rasa_status": rasa_status
+        "rasa_status": rasa_status,
+        "action_server_status": snapshot["components"]["action_server"]["status"],
+        **snapshot
+    }
+
+
+def readiness_payload():
+    """(HTTP status, body) for the readiness probe"""
+    ready, snapshot = health_prober.readiness()
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "timestamp": datetime.now().isoformat(),
+        **snapshot
+    }
+    return (200 if ready else 503), body
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint (served from the background prober's cache)"""
+    return jsonify(health_payload()), 200
+
+
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the gateway process is up and serving requests"""
+    return jsonify({
+        "status": "alive",
+        "timestamp": datetime.now().isoformat()
     }), 200
 
 
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: Rasa has a warmed-up model loaded and the action server answers"""
+    status, body = readiness_payload()
+    response = jsonify(body)
+    response.status_code = status
+    if status != 200:
+        response.headers['Retry-After'] = str(int(HEALTH_PROBE_INTERVAL) or 1)
+    return response
+
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """
@@ -84,9 +340,227 @@ def chat():
         
         user_message = data['message']
         sender_id = data.get('sender', str(uuid.uuid4()))
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        
+        try:
+            ip_rate_limiter.check(client_ip())
+            sender_rate_limiter.check(sender_id)
+        except Rejected as e:
+            return rejection_response(e)
+        
+        try:
+            (body, status), coalesced = sender_gate.run(
+                sender_id, user_message,
+                lambda: relay_message(sender_id, user_message),
+                idempotency_key=idempotency_key
+            )
+        except SenderBusy:
+            return jsonify(SENDER_BUSY_ERROR), 429
+        
+        response = jsonify(body)
+        response.status_code = status
+        if coalesced:
+            response.headers['X-Coalesced'] = 'true'
+        if 'retry_after' in body:
+            response.headers['Retry-After'] = Rejected(status, "", body['retry_after']).header()
+        return response
         
-        # Log the conversation
-        logger.info(f"User [{sender_id}]: {user_message}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({
+            "error": "Internal server error",
+            "details": str(e)
+        }), 500
+
+
+def client_ip():
+    """Client address used for per-IP rate limiting"""
+    if RATE_LIMIT_TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr
+
+
+def rejection_response(rejected):
+    """429/503 response for a request refused by admission control"""
+    response = jsonify(rejected.body())
+    response.status_code = rejected.status
+    response.headers['Retry-After'] = rejected.header()
+    return response
+
+
+def call_rasa(method, path, consume=None, **kwargs):
+    """
+    Upstream call through admission control.
+    
+    Waits for a concurrency slot (bounded queue, deadline), then checks the
+    circuit breaker and records the outcome. Raises Rejected when shed.
+    With consume, returns consume(response) instead of the response; it
+    runs while the slot is still held (e.g. to read a streamed body).
+    """
+    with upstream_limiter:
+        upstream_breaker.before_call()
+        try:
+            response = rasa_client.request(method, path, **kwargs)
+            result = consume(response) if consume is not None else response
+        except requests.exceptions.RequestException:
+            upstream_breaker.record_failure()
+            raise
+        except BaseException:
+            # consume() or the caller's emit failed (e.g. the client went
+            # away): no verdict on Rasa, but a trial slot must be handed back
+            upstream_breaker.release()
+            raise
+        if response.status_code >= 500:
+            upstream_breaker.record_failure()
+        else:
+            upstream_breaker.record_success()
+        return result
+
+
+def read_rasa_reply(response):
+    """(status, bot messages or error text) from a webhook response"""
+    if response.status_code != 200:
+        return response.status_code, response.text
+    return 200, response.json()
+
+
+def stream_rasa_reply(emit):
+    """
+    Like read_rasa_reply for ?stream=true, where Rasa writes one JSON
+    message per line as soon as it is uttered; emit(message) is called for
+    each before the next one arrives.
+    """
+    def consume(response):
+        if response.status_code != 200:
+            return response.status_code, response.text
+        bot_responses = []
+        for line in response.iter_lines():
+            if line.strip():
+                message = json.loads(line)
+                bot_responses.append(message)
+                emit(message)
+        return 200, bot_responses
+    return consume
+
+
+def admission_stats():
+    return {
+        "concurrency": upstream_limiter.stats(),
+        "breaker": upstream_breaker.stats(),
+        "rate_limits": {
+            "sender": sender_rate_limiter.stats(),
+            "ip": ip_rate_limiter.stats()
+        }
+    }
+
+
+def session_record(user_message, bot_responses, session=None):
+    """Session data after a turn, including the form slot now being asked for"""
+    awaiting_slot, prompt = (prevalidator.awaiting(bot_responses)
+                             if prevalidator else (None, None))
+    return {
+        "last_message": user_message,
+        "timestamp": datetime.now().isoformat(),
+        "awaiting_slot": awaiting_slot,
+        "prompt": prompt,
+        "turns": (session or {}).get("turns", 0) + 1
+    }
+
+
+def prevalidate_turn(sender_id, user_message, session):
+    """
+    (response body, new session record) for a form answer that
+    pre-validation rejects, or None if the message has to go to Rasa.
+    Only computes the turn; the caller stores the session record.
+    """
+    if prevalidator is None:
+        return None
+    bot_responses = prevalidator.check(session.get("awaiting_slot"),
+                                       session.get("prompt"), user_message)
+    if bot_responses is None:
+        return None
+    # Rasa never saw this turn, so the same question is still pending
+    record = {
+        **session,
+        "last_message": user_message,
+        "timestamp": datetime.now().isoformat(),
+        "turns": session.get("turns", 0) + 1
+    }
+    return {
+        "sender": sender_id,
+        "responses": [{"recipient_id": sender_id, **resp} for resp in bot_responses],
+        "timestamp": datetime.now().isoformat(),
+        "prevalidated": True
+    }, record
+
+
+def answer_locally(sender_id, user_message, session=None):
+    """
+    Response body for a form answer that pre-validation rejects, or None
+    if the message has to go to Rasa. Runs inside the sender's turn, so the
+    session record reflects the previous turn.
+    """
+    if prevalidator is None:
+        return None
+    if session is None:
+        session = active_sessions.get(sender_id) or {}
+    turn = prevalidate_turn(sender_id, user_message, session)
+    if turn is None:
+        return None
+    body, record = turn
+    active_sessions.set(sender_id, record)
+    return body
+
+
+def log_turn(sender_id, user_message, session, body, status, started, upstream_seconds=None):
+    """
+    Queue the conversation log record for one turn. session is the record
+    from before the turn; the REST webhook does not return Rasa's intent,
+    so the form slot the message answered is logged instead.
+    """
+    if conversation_log is None or not conversation_log.wants(sender_id, status):
+        return
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "sender": sender_id,
+        "turn": session.get("turns", 0) + 1,
+        "message": user_message,
+        "slot": session.get("awaiting_slot"),
+        "status": status,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "upstream_ms": (round(upstream_seconds * 1000, 2)
+                        if upstream_seconds is not None else None),
+    }
+    if status == 200:
+        record["responses"] = [resp.get("text") for resp in body.get("responses", [])]
+        record["prevalidated"] = body.get("prevalidated", False)
+    else:
+        record["error"] = body.get("error")
+    conversation_log.log(record)
+
+
+def relay_message(sender_id, user_message, emit=None):
+    """
+    Send one user message to Rasa; returns (response body, HTTP status).
+    With emit, Rasa streams its reply and emit(message) is called for each
+    bot message as soon as it arrives.
+    """
+    started = time.perf_counter()
+    session = active_sessions.get(sender_id) or {}
+    timings = {}
+    body, status = _relay_message(sender_id, user_message, emit, session, timings)
+    log_turn(sender_id, user_message, session, body, status, started, timings.get("upstream"))
+    return body, status
+
+
+def _relay_message(sender_id, user_message, emit, session, timings):
+    try:
+        local_body = answer_locally(sender_id, user_message, session)
+        if local_body is not None:
+            if emit is not None:
+                for resp in local_body["responses"]:
+                    emit(resp)
+            return local_body, 200
         
         # Send message to Rasa
         rasa_payload = {
@@ -94,55 +568,257 @@ def chat():
             "message": user_message
         }
         
-        response = requests.post(
-            RASA_WEBHOOKS_URL,
-            json=rasa_payload,
-            timeout=10
-        )
+        upstream_started = time.perf_counter()
+        if emit is None:
+            status, bot_responses = call_rasa('POST', "/webhooks/rest/webhook",
+                                              consume=read_rasa_reply, json=rasa_payload)
+        else:
+            status, bot_responses = call_rasa('POST', "/webhooks/rest/webhook?stream=true",
+                                              consume=stream_rasa_reply(emit),
+                                              json=rasa_payload, stream=True)
+        timings["upstream"] = time.perf_counter() - upstream_started
         
-        if response.status_code != 200:
-            logger.error(f"Rasa error: {response.text}")
-            return jsonify({
+        if status != 200:
+            logger.error(f"Rasa error: {bot_responses}")
+            return {
                 "error": "Failed to get response from chatbot",
-                "details": response.text
-            }), 500
-        
-        bot_responses = response.json()
-        
-        # Log bot responses
-        for resp in bot_responses:
-            logger.info(f"Bot [{sender_id}]: {resp.get('text', '')}")
+                "details": bot_responses
+            }, 500
         
         # Update session
-        active_sessions[sender_id] = {
-            "last_message": user_message,
-            "timestamp": datetime.now().isoformat()
-        }
+        active_sessions.set(sender_id, session_record(user_message, bot_responses, session))
         
-        return jsonify({
+        return {
             "sender": sender_id,
             "responses": bot_responses,
             "timestamp": datetime.now().isoformat()
-        }), 200
+        }, 200
         
+    except Rejected as e:
+        # Shed turns are counted in the conversation log, not logged here
+        return e.body(), e.status
+    
     except requests.exceptions.Timeout:
         logger.error("Rasa request timeout")
-        return jsonify({
+        return {
             "error": "Request timeout - chatbot is taking too long to respond"
-        }), 504
+        }, 504
     
     except requests.exceptions.ConnectionError:
         logger.error("Cannot connect to Rasa server")
-        return jsonify({
+        return {
             "error": "Cannot connect to chatbot server. Please ensure Rasa is running."
-        }), 503
+        }, 503
     
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        return jsonify({
+        return {
             "error": "Internal server error",
             "details": str(e)
-        }), 500
+        }, 500
+
+
+def parse_chat_batch(data):
+    """
+    Split a /chat/batch body into per-sender lanes.
+    
+    Returns (items, lanes): items is a list of (sender, message, error) in
+    request order and lanes maps each sender to its item indexes, in order.
+    Raises ValueError if the body itself is malformed.
+    """
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("Request body must contain a non-empty 'items' list")
+    if len(items) > CHAT_BATCH_MAX_ITEMS:
+        raise ValueError(f"At most {CHAT_BATCH_MAX_ITEMS} items per batch")
+    
+    parsed = []
+    lanes = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or 'message' not in item:
+            parsed.append((None, None, "Missing 'message' in item"))
+            continue
+        sender_id = str(item.get('sender') or uuid.uuid4())
+        parsed.append((sender_id, item['message'], None))
+        lanes.setdefault(sender_id, []).append(index)
+    return parsed, lanes
+
+
+def batch_result(index, sender_id, body, status):
+    return {"index": index, "sender": sender_id, "status": status, **body}
+
+
+def skipped_result(index, sender_id):
+    # Later messages depend on the conversation state the failed one left
+    return batch_result(index, sender_id, {
+        "error": "Skipped - an earlier message from this sender failed"
+    }, 424)
+
+
+def batch_summary(results, started):
+    failed = sum(1 for r in results if r["status"] != 200)
+    return {
+        "results": results,
+        "count": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def run_lane(sender_id, indexes, items):
+    """Relay one sender's messages in order, stopping at the first failure"""
+    results = []
+    for position, index in enumerate(indexes):
+        message = items[index][1]
+        try:
+            sender_rate_limiter.check(sender_id)
+            # Queued behind any /chat turn for the same sender; repeated
+            # messages inside a batch are real turns, so never coalesced
+            (body, status), _ = sender_gate.run(sender_id, message,
+                                                lambda: relay_message(sender_id, message),
+                                                coalesce=False)
+        except Rejected as e:
+            body, status = e.body(), e.status
+        except SenderBusy:
+            body, status = SENDER_BUSY_ERROR, 429
+        results.append(batch_result(index, sender_id, body, status))
+        if status != 200:
+            results += [skipped_result(i, sender_id) for i in indexes[position + 1:]]
+            break
+    return results
+
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Send many users' messages in one call
+    
+    Request JSON:
+    {
+        "items": [
+            {"sender": "user1", "message": "Hello"},
+            {"sender": "user2", "message": "Book a room"},
+            {"sender": "user1", "message": "John Smith"}
+        ]
+    }
+    
+    Different senders are relayed in parallel (up to CHAT_BATCH_CONCURRENCY
+    at once); messages from the same sender are relayed strictly in order.
+    Results come back in request order, each with its own status.
+    """
+    started = time.perf_counter()
+    try:
+        ip_rate_limiter.check(client_ip())
+    except Rejected as e:
+        return rejection_response(e)
+    try:
+        items, lanes = parse_chat_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    results = [None] * len(items)
+    for index, (sender_id, _, error) in enumerate(items):
+        if error:
+            results[index] = batch_result(index, sender_id, {"error": error}, 400)
+    
+    futures = [chat_batch_executor.submit(run_lane, sender_id, indexes, items)
+               for sender_id, indexes in lanes.items()]
+    for future in futures:
+        for result in future.result():
+            results[result["index"]] = result
+    
+    return jsonify(batch_summary(results, started)), 200
+
+
+def sse_event(event, data):
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def turn_outcome(sender_id, body, status, coalesced):
+    """('done' | 'error', payload) for the event that closes a streamed turn"""
+    if status != 200:
+        return "error", {"status": status, **body}
+    return "done", {
+        "sender": sender_id,
+        "timestamp": body.get("timestamp"),
+        "coalesced": coalesced,
+        "prevalidated": body.get("prevalidated", False)
+    }
+
+
+def run_streamed_turn(sender_id, user_message, idempotency_key, events):
+    """Relay one turn with streaming, putting (event, data) pairs on events"""
+    emit = lambda message: events.put(("message", message))  # noqa: E731
+    try:
+        (body, status), coalesced = sender_gate.run(
+            sender_id, user_message,
+            lambda: relay_message(sender_id, user_message, emit=emit),
+            idempotency_key=idempotency_key
+        )
+        if coalesced and status == 200:
+            # The original turn streamed to another connection
+            for message in body["responses"]:
+                emit(message)
+        events.put(turn_outcome(sender_id, body, status, coalesced))
+    except SenderBusy:
+        events.put(("error", {"status": 429, **SENDER_BUSY_ERROR}))
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        events.put(("error", {"status": 500, "error": "Internal server error",
+                              "details": str(e)}))
+    finally:
+        events.put(None)
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Send a message and receive the bot's messages as Server-Sent Events,
+    each one as soon as Rasa utters it
+    
+    Request JSON: same as /chat
+    
+    Events:
+        message   one bot message ({"recipient_id": ..., "text": ...})
+        done      {"sender": ..., "timestamp": ..., "coalesced": false, ...}
+        error     {"status": 504, "error": ...}
+    """
+    data = request.get_json(silent=True)
+    if not data or 'message' not in data:
+        return jsonify({
+            "error": "Missing 'message' in request body"
+        }), 400
+    
+    user_message = data['message']
+    sender_id = data.get('sender', str(uuid.uuid4()))
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    
+    try:
+        ip_rate_limiter.check(client_ip())
+        sender_rate_limiter.check(sender_id)
+    except Rejected as e:
+        return rejection_response(e)
+    
+    # The turn runs on its own thread so it finishes (and the session stays
+    # consistent) even if the client disconnects mid-stream
+    events = queue.Queue()
+    threading.Thread(target=run_streamed_turn,
+                     args=(sender_id, user_message, idempotency_key, events),
+                     name="chat-stream", daemon=True).start()
+    
+    def stream():
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield sse_event(*event)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 
 @app.route('/session/new', methods=['POST'])
@@ -157,9 +833,9 @@ def new_session():
     }
     """
     sender_id = str(uuid.uuid4())
-    active_sessions[sender_id] = {
+    active_sessions.set(sender_id, {
         "created_at": datetime.now().isoformat()
-    }
+    })
     
     logger.info(f"New session created: {sender_id}")
     
@@ -195,17 +871,19 @@ def reset_session():
         
         sender_id = data['sender']
         
-        # Tell Rasa to reset the conversation
-        response = requests.post(
-            f"{RASA_API_URL}/conversations/{sender_id}/tracker/events",
+        # Tell Rasa to reset the conversation (restarting twice is harmless,
+        # so this call may be retried)
+        response = call_rasa(
+            'POST',
+            f"/conversations/{sender_id}/tracker/events",
             json={"event": "restart"},
-            timeout=5
+            read_timeout=5,
+            retry=True
         )
         
         if response.status_code == 200:
             # Remove from active sessions
-            if sender_id in active_sessions:
-                del active_sessions[sender_id]
+            active_sessions.delete(sender_id)
             
             logger.info(f"Session reset: {sender_id}")
             
@@ -219,6 +897,9 @@ def reset_session():
                 "details": response.text
             }), 500
             
+    except Rejected as e:
+        return rejection_response(e)
+    
     except Exception as e:
         logger.error(f"Error resetting session: {str(e)}")
         return jsonify({
@@ -235,50 +916,159 @@ def active_sessions_list():
     Response JSON:
     {
         "active_sessions": 5,
-        "sessions": {...}
+        "sessions": {...},
+        "store": {"backend": "memory", "evicted_ttl": 0, ...}
     }
     """
+    sessions = active_sessions.all()
     return jsonify({
-        "active_sessions": len(active_sessions),
-        "sessions": active_sessions
+        "active_sessions": len(sessions),
+        "sessions": sessions,
+        "store": active_sessions.stats()
     }), 200
 
 
+@app.route('/upstream/stats', methods=['GET'])
+def upstream_stats():
+    """
+    Get connection pool usage for the upstream Rasa client
+    
+    Response JSON:
+    {
+        "pool_size": 20,
+        "in_flight": 2,
+        "requests": 1234,
+        "pools": [...],
+        "sender_gate": {"turns": 812, "coalesced": 14, ...},
+        "prevalidation": {"answered_locally": 57, ...}
+    }
+    """
+    return jsonify({
+        **rasa_client.stats(),
+        "sender_gate": sender_gate.stats(),
+        "admission": admission_stats(),
+        "prevalidation": prevalidator.stats() if prevalidator else None,
+        "conversation_log": conversation_log.stats() if conversation_log else None
+    }), 200
+
+
+def _parse_date_param(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def parse_booking_query(args):
+    """
+    Turn /bookings query parameters into BookingView.query arguments
+    (raises ValueError with a user-facing message on bad input)
+    """
+    filters = {field: args[field] for field in INDEXED_FIELDS if args.get(field)}
+
+    try:
+        limit = int(args.get('limit', BOOKINGS_PAGE_SIZE))
+        cursor = int(args['cursor']) if args.get('cursor') else None
+    except ValueError:
+        raise ValueError("'limit' and 'cursor' must be integers")
+    if not 1 <= limit <= BOOKINGS_MAX_PAGE_SIZE:
+        raise ValueError(f"'limit' must be between 1 and {BOOKINGS_MAX_PAGE_SIZE}")
+
+    return {
+        "filters": filters,
+        "checkin_from": _parse_date_param(args, 'checkin_from'),
+        "checkin_to": _parse_date_param(args, 'checkin_to'),
+        "cursor": cursor,
+        "limit": limit,
+    }
+
+
+def bookings_page(query, refresh=True):
+    """Build the paginated /bookings response from the in-memory view"""
+    if refresh:
+        booking_view.refresh()
+    page, next_cursor, total = booking_view.query(**query)
+    payload = {
+        "bookings": [booking.to_dict() for booking in page],
+        "count": len(page),
+        "total": total,
+        "next_cursor": next_cursor
+    }
+    if total == 0:
+        payload["message"] = "No bookings found"
+    return payload
+
+
+def cached_bookings_page(query, headers):
+    """
+    CachedBody for a /bookings page. The ETag is the log's version plus the
+    query, so a poll of an unchanged log is answered with a 304 (or the
+    already serialized body) without running the query.
+    """
+    booking_view.refresh()
+    version = booking_view.version
+    etag = content_etag(version, json.dumps(query, sort_keys=True, default=str))
+    last_modified = booking_view.last_modified
+
+    def build():
+        payload = bookings_page(query, refresh=False)
+        if booking_view.version != version:
+            # Another request refreshed the view meanwhile; tag by content
+            return CachedBody.json(payload, cache_control="private, no-cache")
+        return CachedBody.json(payload, etag=etag, last_modified=last_modified,
+                               cache_control="private, no-cache")
+
+    if is_fresh(headers, etag, last_modified):
+        # negotiate() answers 304 from the validators alone
+        return CachedBody(b"", "application/json", etag=etag, last_modified=last_modified,
+                          cache_control="private, no-cache")
+    return bookings_cache.get(etag, build)
+
+
+def bookings_ndjson(query):
+    """Stream matching bookings straight from the log, one JSON object per line"""
+    for booking in booking_store.iter_bookings(query["filters"],
+                                               query["checkin_from"],
+                                               query["checkin_to"]):
+        yield json.dumps(booking.to_dict(), ensure_ascii=False) + "\n"
+
+
 @app.route('/bookings', methods=['GET'])
 def get_bookings():
     """
-    Get all bookings from the bookings.txt file
+    Query bookings with filters and cursor pagination
+    
+    Query parameters (all optional):
+        email, guest_name, room_type, payment_method  exact match, case-insensitive
+        checkin_from, checkin_to                      YYYY-MM-DD, inclusive
+        limit                                         page size (default 50, max 500)
+        cursor                                        next_cursor from the previous page
+        format=ndjson                                 stream every match as NDJSON
     
     Response JSON:
     {
-        "bookings": [...],
-        "total": 10
+        "bookings": [{"id": 1, "guest_name": "Nahro", ...}],
+        "count": 1,
+        "total": 10,
+        "next_cursor": 1
     }
     """
     try:
-        bookings_file = os.path.join(parent_dir, 'bookings.txt')
-        with open(bookings_file, 'r') as f:
-            content = f.read()
-        
-        # Parse bookings (simple parsing, split by separator)
-        bookings_raw = content.split('============================================================')
-        bookings = []
-        
-        for booking in bookings_raw:
-            if booking.strip() and 'BOOKING CONFIRMATION' in booking:
-                bookings.append(booking.strip())
-        
+        query = parse_booking_query(request.args)
+    except ValueError as e:
         return jsonify({
-            "bookings": bookings,
-            "total": len(bookings)
-        }), 200
+            "error": str(e)
+        }), 400
+    
+    try:
+        if request.args.get('format') == 'ndjson':
+            return Response(bookings_ndjson(query), mimetype='application/x-ndjson')
+        
+        return cached_response(cached_bookings_page(query, request.headers))
         
-    except FileNotFoundError:
-        return jsonify({
-            "bookings": [],
-            "total": 0,
-            "message": "No bookings found"
-        }), 200
     except Exception as e:
         logger.error(f"Error reading bookings: {str(e)}")
         return jsonify({
@@ -287,77 +1077,205 @@ def get_bookings():
         }), 500
 
 
-@app.route('/docs', methods=['GET'])
-def api_docs():
+def availability_for(args):
     """
-    API Documentation
+    Build the /availability response
+    (raises ValueError with a user-facing message on bad input)
     """
-    docs = {
-        "title": "Hotel Booking Chatbot API",
-        "version": "1.0.0",
-        "description": "REST API for interacting with the hotel booking chatbot",
-        "endpoints": [
-            {
-                "path": "/health",
-                "method": "GET",
-                "description": "Check API and Rasa server health"
-            },
-            {
-                "path": "/chat",
-                "method": "POST",
-                "description": "Send a message to the chatbot",
-                "body": {
-                    "message": "string (required)",
-                    "sender": "string (optional)"
-                }
-            },
-            {
-                "path": "/session/new",
-                "method": "POST",
-                "description": "Create a new conversation session"
-            },
-            {
-                "path": "/session/reset",
-                "method": "POST",
-                "description": "Reset an existing conversation",
-                "body": {
-                    "sender": "string (required)"
-                }
-            },
-            {
-                "path": "/session/active",
-                "method": "GET",
-                "description": "Get list of active sessions"
-            },
-            {
-                "path": "/bookings",
-                "method": "GET",
-                "description": "Get all bookings from the system"
-            },
-            {
-                "path": "/docs",
-                "method": "GET",
-                "description": "This documentation"
+    checkin = _parse_date_param(args, 'checkin')
+    checkout = _parse_date_param(args, 'checkout')
+    if checkin is None or checkout is None:
+        raise ValueError("'checkin' and 'checkout' are required (YYYY-MM-DD)")
+    if checkout <= checkin:
+        raise ValueError("'checkout' must be after 'checkin'")
+    
+    rooms = inventory_tracker.summary(checkin, checkout)
+    room_type = args.get('room_type')
+    if room_type:
+        room_type = room_type.capitalize()
+        if room_type not in rooms:
+            raise ValueError(f"Unknown room type: {args.get('room_type')}")
+        rooms = {room_type: rooms[room_type]}
+    
+    return {
+        "checkin": checkin.isoformat(),
+        "checkout": checkout.isoformat(),
+        "nights": (checkout - checkin).days,
+        "rooms": rooms
+    }
+
+
+@app.route('/availability', methods=['GET'])
+def get_availability():
+    """
+    Check room availability for a stay
+    
+    Query parameters:
+        checkin, checkout  YYYY-MM-DD (checkout exclusive)
+        room_type          optional, limit the answer to one room type
+    
+    Response JSON:
+    {
+        "checkin": "2024-11-10",
+        "checkout": "2024-11-12",
+        "nights": 2,
+        "rooms": {"Double": {"total": 10, "booked": 3, "available": 7}, ...}
+    }
+    """
+    try:
+        return jsonify(availability_for(request.args)), 200
+    except ValueError as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error checking availability: {str(e)}")
+        return jsonify({
+            "error": "Failed to check availability",
+            "details": str(e)
+        }), 500
+
+
+# Static API documentation, shared by the Flask and async gateways
+API_DOCS = {
+    "title": "Hotel Booking Chatbot API",
+    "version": "1.0.0",
+    "description": "REST API for interacting with the hotel booking chatbot",
+    "endpoints": [
+        {
+            "path": "/health",
+            "method": "GET",
+            "description": "Cached status and probe latency of Rasa and the action server"
+        },
+        {
+            "path": "/health/live",
+            "method": "GET",
+            "description": "Liveness probe: the API process is serving requests"
+        },
+        {
+            "path": "/health/ready",
+            "method": "GET",
+            "description": "Readiness probe: 200 once Rasa has a model loaded and the action server answers, else 503"
+        },
+        {
+            "path": "/chat",
+            "method": "POST",
+            "description": "Send a message to the chatbot",
+            "body": {
+                "message": "string (required)",
+                "sender": "string (optional)"
             }
-        ],
-        "examples": {
-            "chat": {
-                "request": {
-                    "message": "I want to book a room",
-                    "sender": "user123"
-                },
-                "response": {
-                    "sender": "user123",
-                    "responses": [
-                        {"text": "Great! What's your name?"}
-                    ],
-                    "timestamp": "2024-11-16T13:45:00"
-                }
+        },
+        {
+            "path": "/chat/batch",
+            "method": "POST",
+            "description": "Send many senders' messages at once; parallel across senders, in order per sender",
+            "body": {
+                "items": "[{sender, message}, ...] (required, at most CHAT_BATCH_MAX_ITEMS)"
+            }
+        },
+        {
+            "path": "/chat/stream",
+            "method": "POST",
+            "description": "Send a message; bot messages come back as Server-Sent Events as soon as they are uttered",
+            "body": {
+                "message": "string (required)",
+                "sender": "string (optional)"
+            }
+        },
+        {
+            "path": "/chat/ws",
+            "method": "GET",
+            "description": "WebSocket chat, one connection per session (async gateway only); send {message}, receive message/done/error frames"
+        },
+        {
+            "path": "/session/new",
+            "method": "POST",
+            "description": "Create a new conversation session"
+        },
+        {
+            "path": "/session/reset",
+            "method": "POST",
+            "description": "Reset an existing conversation",
+            "body": {
+                "sender": "string (required)"
+            }
+        },
+        {
+            "path": "/session/active",
+            "method": "GET",
+            "description": "Get list of active sessions"
+        },
+        {
+            "path": "/upstream/stats",
+            "method": "GET",
+            "description": "Get connection pool usage for the Rasa client"
+        },
+        {
+            "path": "/metrics",
+            "method": "GET",
+            "description": "Prometheus metrics: per-route request counts and latency, "
+                           "upstream connect/response time, in-flight requests, sessions"
+        },
+        {
+            "path": "/bookings",
+            "method": "GET",
+            "description": "Query bookings with filters and cursor pagination",
+            "query": {
+                "email": "string (optional)",
+                "guest_name": "string (optional)",
+                "room_type": "string (optional)",
+                "payment_method": "string (optional)",
+                "checkin_from": "YYYY-MM-DD (optional)",
+                "checkin_to": "YYYY-MM-DD (optional)",
+                "limit": "integer 1-500 (optional, default 50)",
+                "cursor": "integer (optional, next_cursor from previous page)",
+                "format": "ndjson (optional, stream all matches)"
+            }
+        },
+        {
+            "path": "/availability",
+            "method": "GET",
+            "description": "Check room availability for a stay",
+            "query": {
+                "checkin": "YYYY-MM-DD (required)",
+                "checkout": "YYYY-MM-DD (required)",
+                "room_type": "string (optional)"
+            }
+        },
+        {
+            "path": "/docs",
+            "method": "GET",
+            "description": "This documentation"
+        }
+    ],
+    "examples": {
+        "chat": {
+            "request": {
+                "message": "I want to book a room",
+                "sender": "user123"
+            },
+            "response": {
+                "sender": "user123",
+                "responses": [
+                    {"text": "Great! What's your name?"}
+                ],
+                "timestamp": "2024-11-16T13:45:00"
             }
         }
     }
-    
-    return jsonify(docs), 200
+}
+
+
+API_DOCS_BODY = CachedBody.json(API_DOCS, cache_control="public, max-age=300")
+
+
+@app.route('/docs', methods=['GET'])
+def api_docs():
+    """
+    API Documentation
+    """
+    return cached_response(API_DOCS_BODY)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,793 @@
+"""
+Async gateway for Hotel Booking Chatbot
+Serves the same routes and JSON contract as api.py on a single asyncio event
+loop, with a non-blocking aiohttp client to Rasa. A conversation waiting on
+Rasa costs a coroutine instead of a worker thread.
+
+Run with:  python async_api.py
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+
+from api import (
+    API_DOCS_BODY,
+    CHAT_BATCH_CONCURRENCY,
+    HEALTH_PROBE_INTERVAL,
+    IDEMPOTENCY_KEY_TTL,
+    RATE_LIMIT_TRUST_PROXY,
+    RASA_API_URL,
+    RASA_CONNECT_TIMEOUT,
+    RASA_READ_TIMEOUT,
+    SENDER_BUSY_ERROR,
+    SENDER_COALESCE_WINDOW,
+    SENDER_MAX_QUEUED,
+    SENDER_QUEUE_TIMEOUT,
+    UPSTREAM_MAX_QUEUE,
+    UPSTREAM_QUEUE_TIMEOUT,
+    active_sessions,
+    admission_stats,
+    availability_for,
+    batch_result,
+    batch_summary,
+    static_files,
+    booking_store,
+    conversation_log,
+    cached_bookings_page,
+    health_payload,
+    log_turn,
+    ip_rate_limiter,
+    parse_booking_query,
+    parse_chat_batch,
+    prevalidate_turn,
+    prevalidator,
+    rasa_client,
+    readiness_payload,
+    sender_rate_limiter,
+    session_record,
+    skipped_result,
+    sse_event,
+    turn_outcome,
+    upstream_breaker,
+)
+from admission import AsyncConcurrencyLimiter, Rejected
+from http_cache import negotiate
+import metrics
+from rasa_client import IDEMPOTENT_METHODS, backoff_delay
+from sender_gate import AsyncSenderGate, SenderBusy
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent upstream sockets; requests beyond this wait on
+# the connector instead of opening new connections
+ASYNC_RASA_POOL_SIZE = int(os.environ.get("ASYNC_RASA_POOL_SIZE", "200"))
+# Concurrent upstream calls admitted before requests queue (see admission.py)
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get("UPSTREAM_MAX_CONCURRENCY",
+                                              str(ASYNC_RASA_POOL_SIZE)))
+# Ping interval for /chat/ws; dead connections are dropped after a missed pong
+CHAT_WS_HEARTBEAT = float(os.environ.get("CHAT_WS_HEARTBEAT", "30"))
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """Per-route request counts, latency and in-flight gauge (see metrics.py)"""
+    resource = request.match_info.route.resource
+    route = metrics.route_label(resource.canonical if resource is not None else None)
+    started = time.perf_counter()
+    status = 500
+    metrics.http_in_flight.inc(route)
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        metrics.http_in_flight.dec(route)
+        metrics.http_requests.inc(route, request.method, status)
+        metrics.http_duration.observe(time.perf_counter() - started, route, request.method)
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Mirror flask_cors defaults: allow any origin and answer preflights"""
+    if request.method == 'OPTIONS':
+        response = web.Response(status=200)
+    else:
+        response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    if request.method == 'OPTIONS':
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = request.headers.get(
+            'Access-Control-Request-Headers', 'Content-Type')
+    return response
+
+
+def json_response(data, status=200):
+    return web.json_response(data, status=status)
+
+
+def cached_response(request, cached):
+    """Response for a CachedBody: 304 if the client's copy is current, else compressed if accepted"""
+    status, body, headers = negotiate(cached, request.headers)
+    return web.Response(body=body, status=status, headers=headers)
+
+
+def rejection_response(rejected):
+    """429/503 response for a request refused by admission control"""
+    response = json_response(rejected.body(), rejected.status)
+    response.headers['Retry-After'] = rejected.header()
+    return response
+
+
+def client_ip(request):
+    """Client address used for per-IP rate limiting"""
+    if RATE_LIMIT_TRUST_PROXY and 'X-Forwarded-For' in request.headers:
+        return request.headers['X-Forwarded-For'].split(',')[0].strip()
+    return request.remote
+
+
+async def rasa_request(app, method, path, read_timeout=None, on_message=None,
+                       retry=None, **kwargs):
+    """
+    Send a request to Rasa and return (status, parsed json or text).
+
+    Goes through the same admission control as api.call_rasa: a concurrency
+    slot first, then the circuit breaker. Raises Rejected when shed.
+    With on_message, the body is read as Rasa's line-delimited stream and
+    on_message is awaited for each message as it arrives.
+    Retries follow RasaClient.request: idempotent methods (or retry=True)
+    are retried on connection errors and timeouts with backoff.
+    """
+    if retry is None:
+        retry = method.upper() in IDEMPOTENT_METHODS
+    attempts = 1 + (rasa_client.max_retries if retry else 0)
+    async with app['upstream_limiter']:
+        upstream_breaker.before_call()
+        try:
+            for attempt in range(attempts):
+                try:
+                    status, body = await _send_to_rasa(app, method, path, read_timeout,
+                                                       on_message, **kwargs)
+                    break
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                    if attempt + 1 >= attempts:
+                        raise
+                app['upstream_stats']["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt, rasa_client.backoff_base,
+                                                  rasa_client.backoff_max))
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            upstream_breaker.record_failure()
+            raise
+        except BaseException:
+            # on_message failed (e.g. the client went away), a reply did not
+            # parse, or the task was cancelled: hand a trial slot back
+            upstream_breaker.release()
+            raise
+        if status >= 500:
+            upstream_breaker.record_failure()
+        else:
+            upstream_breaker.record_success()
+        return status, body
+
+
+async def _send_to_rasa(app, method, path, read_timeout=None, on_message=None, **kwargs):
+    session = app['rasa_session']
+    timeout = aiohttp.ClientTimeout(
+        sock_connect=RASA_CONNECT_TIMEOUT,
+        sock_read=read_timeout if read_timeout is not None else RASA_READ_TIMEOUT,
+    )
+    stats = app['upstream_stats']
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    try:
+        async with session.request(method, f"{RASA_API_URL}{path}",
+                                   timeout=timeout, **kwargs) as response:
+            if response.status == 200 and on_message is not None:
+                messages = []
+                async for line in response.content:
+                    if line.strip():
+                        message = json.loads(line)
+                        messages.append(message)
+                        await on_message(message)
+                return response.status, messages
+            if response.status == 200:
+                return response.status, await response.json(content_type=None)
+            return response.status, await response.text()
+    finally:
+        stats["in_flight"] -= 1
+
+
+async def index(request):
+    """Serve the frontend chat interface"""
+    return cached_response(request, static_files.get('index.html'))
+
+
+async def static_file(request):
+    """Serve a frontend asset (ETag, Last-Modified, gzip)"""
+    cached = static_files.get(request.match_info['filename'])
+    if cached is None:
+        return json_response({"error": "Not found"}, 404)
+    return cached_response(request, cached)
+
+
+async def health_check(request):
+    """Health check endpoint (served from the background prober's cache)"""
+    return json_response(health_payload())
+
+
+async def health_live(request):
+    """Liveness: the event loop is up and serving requests"""
+    return json_response({
+        "status": "alive",
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+async def health_ready(request):
+    """Readiness: Rasa has a warmed-up model loaded and the action server answers"""
+    status, body = readiness_payload()
+    response = json_response(body, status)
+    if status != 200:
+        response.headers['Retry-After'] = str(int(HEALTH_PROBE_INTERVAL) or 1)
+    return response
+
+
+async def chat(request):
+    """Send a message to the chatbot (same contract as POST /chat in api.py)"""
+    try:
+        data = await request.json()
+
+        if not data or 'message' not in data:
+            return json_response({
+                "error": "Missing 'message' in request body"
+            }, 400)
+
+        user_message = data['message']
+        sender_id = data.get('sender', str(uuid.uuid4()))
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+        try:
+            ip_rate_limiter.check(client_ip(request))
+            sender_rate_limiter.check(sender_id)
+        except Rejected as e:
+            return rejection_response(e)
+
+        try:
+            (body, status), coalesced = await request.app['sender_gate'].run(
+                sender_id, user_message,
+                lambda: relay_message(request.app, sender_id, user_message),
+                idempotency_key=idempotency_key
+            )
+        except SenderBusy:
+            return json_response(SENDER_BUSY_ERROR, 429)
+
+        response = json_response(body, status)
+        if coalesced:
+            response.headers['X-Coalesced'] = 'true'
+        if 'retry_after' in body:
+            response.headers['Retry-After'] = Rejected(status, "", body['retry_after']).header()
+        return response
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return json_response({
+            "error": "Internal server error",
+            "details": str(e)
+        }, 500)
+
+
+async def session_call(func, *args):
+    """
+    Call func (a session store method, or something that reads the store).
+    With a blocking store (SQLite) it runs in the default executor so disk
+    I/O never stalls the event loop; the memory store is called inline.
+    """
+    if not active_sessions.blocking:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def relay_message(app, sender_id, user_message, emit=None):
+    """
+    Send one user message to Rasa; returns (response body, HTTP status).
+    With emit (a coroutine function), Rasa streams its reply and each bot
+    message is passed to emit as soon as it arrives.
+    """
+    started = time.perf_counter()
+    session = await session_call(active_sessions.get, sender_id) or {}
+    timings = {}
+    body, status = await _relay_message(app, sender_id, user_message, emit, session, timings)
+    log_turn(sender_id, user_message, session, body, status, started, timings.get("upstream"))
+    return body, status
+
+
+async def _relay_message(app, sender_id, user_message, emit, session, timings):
+    try:
+        local_turn = prevalidate_turn(sender_id, user_message, session)
+        if local_turn is not None:
+            local_body, record = local_turn
+            await session_call(active_sessions.set, sender_id, record)
+            if emit is not None:
+                for resp in local_body["responses"]:
+                    await emit(resp)
+            return local_body, 200
+
+        upstream_started = time.perf_counter()
+        status, body = await rasa_request(
+            app, 'POST',
+            '/webhooks/rest/webhook' if emit is None else '/webhooks/rest/webhook?stream=true',
+            on_message=emit,
+            json={"sender": sender_id, "message": user_message}
+        )
+        timings["upstream"] = time.perf_counter() - upstream_started
+
+        if status != 200:
+            logger.error(f"Rasa error: {body}")
+            return {
+                "error": "Failed to get response from chatbot",
+                "details": body
+            }, 500
+
+        bot_responses = body
+
+        await session_call(active_sessions.set, sender_id,
+                           session_record(user_message, bot_responses, session))
+
+        return {
+            "sender": sender_id,
+            "responses": bot_responses,
+            "timestamp": datetime.now().isoformat()
+        }, 200
+
+    except Rejected as e:
+        # Shed turns are counted in the conversation log, not logged here
+        return e.body(), e.status
+
+    except asyncio.TimeoutError:
+        logger.error("Rasa request timeout")
+        return {
+            "error": "Request timeout - chatbot is taking too long to respond"
+        }, 504
+
+    except aiohttp.ClientConnectionError:
+        logger.error("Cannot connect to Rasa server")
+        return {
+            "error": "Cannot connect to chatbot server. Please ensure Rasa is running."
+        }, 503
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return {
+            "error": "Internal server error",
+            "details": str(e)
+        }, 500
+
+
+async def run_lane(app, sender_id, indexes, items):
+    """Relay one sender's messages in order, stopping at the first failure"""
+    results = []
+    for position, index in enumerate(indexes):
+        message = items[index][1]
+
+        async def send():
+            # Slots are taken per message so other senders interleave
+            # between this sender's turns
+            async with app['chat_batch_slots']:
+                return await relay_message(app, sender_id, message)
+
+        try:
+            sender_rate_limiter.check(sender_id)
+            (body, status), _ = await app['sender_gate'].run(sender_id, message, send,
+                                                             coalesce=False)
+        except Rejected as e:
+            body, status = e.body(), e.status
+        except SenderBusy:
+            body, status = SENDER_BUSY_ERROR, 429
+        results.append(batch_result(index, sender_id, body, status))
+        if status != 200:
+            results += [skipped_result(i, sender_id) for i in indexes[position + 1:]]
+            break
+    return results
+
+
+async def chat_batch(request):
+    """Send many users' messages in one call (same contract as api.py)"""
+    started = time.perf_counter()
+    try:
+        ip_rate_limiter.check(client_ip(request))
+    except Rejected as e:
+        return rejection_response(e)
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    try:
+        items, lanes = parse_chat_batch(data)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    results = [None] * len(items)
+    for index, (sender_id, _, error) in enumerate(items):
+        if error:
+            results[index] = batch_result(index, sender_id, {"error": error}, 400)
+
+    lane_results = await asyncio.gather(*(
+        run_lane(request.app, sender_id, indexes, items)
+        for sender_id, indexes in lanes.items()
+    ))
+    for lane in lane_results:
+        for result in lane:
+            results[result["index"]] = result
+
+    return json_response(batch_summary(results, started))
+
+
+async def run_streamed_turn(app, sender_id, user_message, idempotency_key, send_event):
+    """Relay one turn with streaming; send_event(event, data) is a coroutine"""
+    async def emit(message):
+        await send_event("message", message)
+
+    try:
+        (body, status), coalesced = await app['sender_gate'].run(
+            sender_id, user_message,
+            lambda: relay_message(app, sender_id, user_message, emit=emit),
+            idempotency_key=idempotency_key
+        )
+        if coalesced and status == 200:
+            # The original turn streamed to another connection
+            for message in body["responses"]:
+                await emit(message)
+        await send_event(*turn_outcome(sender_id, body, status, coalesced))
+    except SenderBusy:
+        await send_event("error", {"status": 429, **SENDER_BUSY_ERROR})
+
+
+async def chat_stream(request):
+    """Send a message; bot messages come back as Server-Sent Events"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data or 'message' not in data:
+        return json_response({
+            "error": "Missing 'message' in request body"
+        }, 400)
+
+    user_message = data['message']
+    sender_id = data.get('sender', str(uuid.uuid4()))
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+    try:
+        ip_rate_limiter.check(client_ip(request))
+        sender_rate_limiter.check(sender_id)
+    except Rejected as e:
+        return rejection_response(e)
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'Access-Control-Allow-Origin': '*',
+    })
+    await response.prepare(request)
+
+    disconnected = False
+
+    async def send_event(event, payload):
+        # Once the client is gone the rest of the turn is relayed and
+        # recorded without being written anywhere
+        nonlocal disconnected
+        if disconnected or request.transport is None or request.transport.is_closing():
+            disconnected = True
+            return
+        try:
+            await response.write(sse_event(event, payload).encode('utf-8'))
+        except ConnectionResetError:
+            disconnected = True
+
+    # A disconnect cannot fail the turn (send_event swallows it), and the
+    # shield keeps it running if this handler is cancelled, so the session
+    # is still recorded; the done callback logs errors of an orphaned turn
+    turn = asyncio.ensure_future(run_streamed_turn(
+        request.app, sender_id, user_message, idempotency_key, send_event))
+    turn.add_done_callback(_log_turn_error)
+    try:
+        await asyncio.shield(turn)
+    except Exception:
+        pass  # logged by _log_turn_error
+    return response
+
+
+def _log_turn_error(turn):
+    if not turn.cancelled() and turn.exception() is not None:
+        logger.error(f"Unexpected error: {str(turn.exception())}")
+
+
+async def chat_ws(request):
+    """
+    WebSocket chat: one long-lived connection per browser session.
+
+    GET /chat/ws?sender=<id>. The server first sends
+    {"type": "session", "sender": ...}. The client then sends
+    {"message": "...", "id": <optional turn id>} for each turn and receives
+    {"type": "message", "turn": id, "text": ...} frames as bot messages
+    are uttered, then {"type": "done" | "error", "turn": id, ...}.
+    """
+    ws = web.WebSocketResponse(heartbeat=CHAT_WS_HEARTBEAT)
+    await ws.prepare(request)
+    sender_id = request.query.get('sender') or str(uuid.uuid4())
+    await ws.send_json({"type": "session", "sender": sender_id})
+
+    async for frame in ws:
+        if frame.type != aiohttp.WSMsgType.TEXT:
+            continue
+        try:
+            data = json.loads(frame.data)
+        except ValueError:
+            data = None
+        turn_id = data.get('id') if isinstance(data, dict) else None
+
+        async def send_event(event, payload, turn_id=turn_id):
+            if not ws.closed:
+                await ws.send_json({"type": event, "turn": turn_id, **payload})
+
+        if not isinstance(data, dict) or 'message' not in data:
+            await send_event("error", {"status": 400,
+                                       "error": "Missing 'message' in request body"})
+            continue
+        try:
+            ip_rate_limiter.check(client_ip(request))
+            sender_rate_limiter.check(sender_id)
+        except Rejected as e:
+            await send_event("error", {"status": e.status, **e.body()})
+            continue
+        # Turns on one connection run in order; the next frame is read
+        # once this turn is done
+        try:
+            await run_streamed_turn(request.app, sender_id, data['message'],
+                                    data.get('idempotency_key'), send_event)
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            await send_event("error", {"status": 500, "error": "Internal server error",
+                                       "details": str(e)})
+    return ws
+
+
+async def new_session(request):
+    """Create a new conversation session"""
+    sender_id = str(uuid.uuid4())
+    await session_call(active_sessions.set, sender_id, {
+        "created_at": datetime.now().isoformat()
+    })
+
+    logger.info(f"New session created: {sender_id}")
+
+    return json_response({
+        "sender": sender_id,
+        "message": "New session created successfully"
+    }, 201)
+
+
+async def reset_session(request):
+    """Reset a conversation session"""
+    try:
+        data = await request.json()
+
+        if not data or 'sender' not in data:
+            return json_response({
+                "error": "Missing 'sender' in request body"
+            }, 400)
+
+        sender_id = data['sender']
+
+        # Restarting twice is harmless, so this call may be retried
+        status, body = await rasa_request(
+            request.app, 'POST', f"/conversations/{sender_id}/tracker/events",
+            json={"event": "restart"}, read_timeout=5, retry=True
+        )
+
+        if status == 200:
+            await session_call(active_sessions.delete, sender_id)
+
+            logger.info(f"Session reset: {sender_id}")
+
+            return json_response({
+                "sender": sender_id,
+                "message": "Session reset successfully"
+            })
+        else:
+            return json_response({
+                "error": "Failed to reset session",
+                "details": body
+            }, 500)
+
+    except Rejected as e:
+        return rejection_response(e)
+
+    except Exception as e:
+        logger.error(f"Error resetting session: {str(e)}")
+        return json_response({
+            "error": "Failed to reset session",
+            "details": str(e)
+        }, 500)
+
+
+async def active_sessions_list(request):
+    """Get list of active sessions"""
+    sessions = await session_call(active_sessions.all)
+    return json_response({
+        "active_sessions": len(sessions),
+        "sessions": sessions,
+        "store": await session_call(active_sessions.stats)
+    })
+
+
+async def upstream_stats(request):
+    """Get connection usage for the async Rasa client"""
+    return json_response({
+        "base_url": RASA_API_URL,
+        "pool_size": ASYNC_RASA_POOL_SIZE,
+        "connect_timeout": RASA_CONNECT_TIMEOUT,
+        "read_timeout": RASA_READ_TIMEOUT,
+        **request.app['upstream_stats'],
+        "sender_gate": request.app['sender_gate'].stats(),
+        "admission": {
+            **admission_stats(),
+            "concurrency": request.app['upstream_limiter'].stats(),
+        },
+        "prevalidation": prevalidator.stats() if prevalidator else None,
+        "conversation_log": conversation_log.stats() if conversation_log else None,
+    })
+
+
+async def get_bookings(request):
+    """Query bookings (file I/O runs on the default executor)"""
+    try:
+        query = parse_booking_query(request.query)
+    except ValueError as e:
+        return json_response({
+            "error": str(e)
+        }, 400)
+
+    try:
+        loop = asyncio.get_running_loop()
+
+        if request.query.get('format') == 'ndjson':
+            return await stream_bookings(request, query)
+
+        def respond():
+            # Query, serialization and compression all stay off the event loop
+            return negotiate(cached_bookings_page(query, request.headers), request.headers)
+
+        status, body, headers = await loop.run_in_executor(None, respond)
+        return web.Response(body=body, status=status, headers=headers)
+
+    except Exception as e:
+        logger.error(f"Error reading bookings: {str(e)}")
+        return json_response({
+            "error": "Failed to read bookings",
+            "details": str(e)
+        }, 500)
+
+
+async def stream_bookings(request, query):
+    """Write matching bookings as NDJSON, reading the log in small chunks"""
+    loop = asyncio.get_running_loop()
+    bookings = booking_store.iter_bookings(query["filters"],
+                                           query["checkin_from"],
+                                           query["checkin_to"])
+    response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+    await response.prepare(request)
+    while True:
+        chunk = await loop.run_in_executor(
+            None, lambda: list(itertools.islice(bookings, 500)))
+        if not chunk:
+            break
+        await response.write("".join(
+            json.dumps(booking.to_dict(), ensure_ascii=False) + "\n"
+            for booking in chunk).encode("utf-8"))
+    await response.write_eof()
+    return response
+
+
+async def get_availability(request):
+    """Check room availability for a stay"""
+    try:
+        loop = asyncio.get_running_loop()
+        payload = await loop.run_in_executor(None, availability_for, request.query)
+        return json_response(payload)
+    except ValueError as e:
+        return json_response({
+            "error": str(e)
+        }, 400)
+    except Exception as e:
+        logger.error(f"Error checking availability: {str(e)}")
+        return json_response({
+            "error": "Failed to check availability",
+            "details": str(e)
+        }, 500)
+
+
+async def api_docs(request):
+    """API Documentation"""
+    return cached_response(request, API_DOCS_BODY)
+
+
+async def prometheus_metrics(request):
+    """Prometheus metrics for the gateway (text exposition format)"""
+    # gateway_sessions reads the session store
+    body = await session_call(metrics.registry.render)
+    return web.Response(body=body.encode(),
+                        headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+async def on_startup(app):
+    # One keep-alive session for all upstream calls
+    connector = aiohttp.TCPConnector(limit=ASYNC_RASA_POOL_SIZE,
+                                     keepalive_timeout=30)
+    app['rasa_session'] = aiohttp.ClientSession(
+        connector=connector, trace_configs=[metrics.upstream_trace_config()])
+    app['upstream_stats'] = {"requests": 0, "retries": 0, "in_flight": 0,
+                             "peak_in_flight": 0}
+    metrics.upstream_in_flight.callback = lambda: app['upstream_stats']["in_flight"]
+    app['chat_batch_slots'] = asyncio.Semaphore(CHAT_BATCH_CONCURRENCY)
+    app['upstream_limiter'] = AsyncConcurrencyLimiter(UPSTREAM_MAX_CONCURRENCY,
+                                                      max_queue=UPSTREAM_MAX_QUEUE,
+                                                      queue_timeout=UPSTREAM_QUEUE_TIMEOUT)
+    app['sender_gate'] = AsyncSenderGate(window=SENDER_COALESCE_WINDOW,
+                                         key_ttl=IDEMPOTENCY_KEY_TTL,
+                                         max_queued=SENDER_MAX_QUEUED,
+                                         queue_timeout=SENDER_QUEUE_TIMEOUT)
+
+
+async def on_cleanup(app):
+    await app['rasa_session'].close()
+
+
+def create_app():
+    app = web.Application(middlewares=[metrics_middleware, cors_middleware])
+    app.router.add_get('/', index)
+    app.router.add_get('/static/{filename:.+}', static_file)
+    app.router.add_get('/health', health_check)
+    app.router.add_get('/health/live', health_live)
+    app.router.add_get('/health/ready', health_ready)
+    app.router.add_post('/chat', chat)
+    app.router.add_post('/chat/batch', chat_batch)
+    app.router.add_post('/chat/stream', chat_stream)
+    app.router.add_get('/chat/ws', chat_ws)
+    app.router.add_post('/session/new', new_session)
+    app.router.add_post('/session/reset', reset_session)
+    app.router.add_get('/session/active', active_sessions_list)
+    app.router.add_get('/upstream/stats', upstream_stats)
+    app.router.add_get('/bookings', get_bookings)
+    app.router.add_get('/availability', get_availability)
+    app.router.add_get('/docs', api_docs)
+    app.router.add_get('/metrics', prometheus_metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get("PORT", "5001"))
+    print("\n" + "="*60)
+    print("🚀 Hotel Booking Chatbot API (async mode) Starting...")
+    print("="*60)
+    print(f"🌐 Frontend: http://localhost:{port}")
+    print(f"🤖 Rasa Server: {RASA_API_URL}")
+    print(f"🔗 Max upstream connections: {ASYNC_RASA_POOL_SIZE}")
+    print("="*60 + "\n")
+
+    web.run_app(create_app(), host='0.0.0.0', port=port)
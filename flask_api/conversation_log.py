@@ -0,0 +1,217 @@
+"""
+Structured conversation log for the gateway
+Request threads hand one JSON record per chat turn to ConversationLog.log(),
+which only puts it on a bounded queue. A background thread writes the
+records in batches to a JSON-lines file that is rotated by size and by time
+(rotated files optionally gzipped, oldest pruned). When the queue is full
+the record is dropped and counted, so a slow disk never stalls /chat.
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationLog:
+    """
+    Bounded-queue, batching writer for conversation records.
+
+    sample_rate keeps that fraction of senders (chosen by a hash of the
+    sender id, so a kept conversation is logged in full). Failed turns are
+    always kept.
+    """
+
+    def __init__(self, path, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 max_bytes=50 * 1024 * 1024, rotate_interval=86400, backups=14,
+                 compress=True, sample_rate=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backups = backups
+        self.compress = compress
+        self.sample_rate = sample_rate
+        self._sample_cutoff = int(sample_rate * 0xFFFFFFFF)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._size = 0
+        self._period = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "logged": 0,
+            "sampled_out": 0,
+            "dropped": 0,
+            "written": 0,
+            "batches": 0,
+            "rotations": 0,
+            "write_errors": 0,
+        }
+        self._thread = threading.Thread(target=self._run, name="conversation-log",
+                                        daemon=True)
+        self._thread.start()
+
+    def wants(self, sender_id, status=200):
+        """Whether a turn from this sender should be logged at all"""
+        if status != 200 or self.sample_rate >= 1:
+            return True
+        if zlib.crc32(str(sender_id).encode()) <= self._sample_cutoff:
+            return True
+        self._count("sampled_out")
+        return False
+
+    def log(self, record):
+        """Queue a record without blocking; False if it was dropped"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("logged")
+        return True
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_rotate(0)
+                continue
+            batch = []
+            while record is not None:
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = record is None
+            if batch:
+                self._write(batch)
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, batch):
+        data = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                       for record in batch).encode("utf-8")
+        try:
+            if self._file is None:
+                self._open()
+            self._maybe_rotate(len(data))
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+        except Exception as e:
+            logger.error(f"Conversation log write failed: {e}")
+            self._count("write_errors")
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            return
+        with self._stats_lock:
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        stat = os.fstat(self._file.fileno())
+        self._size = stat.st_size
+        # An existing file belongs to the period it was last written in
+        self._period = self._period_of(stat.st_mtime if stat.st_size else time.time())
+
+    def _period_of(self, timestamp):
+        return int(timestamp // self.rotate_interval) if self.rotate_interval > 0 else 0
+
+    def _maybe_rotate(self, incoming):
+        if self._file is None or self._size == 0:
+            return
+        too_big = self.max_bytes > 0 and self._size + incoming > self.max_bytes
+        if too_big or self._period_of(time.time()) != self._period:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+        suffix = 1
+        while glob.glob(glob.escape(target) + "*"):
+            target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+            suffix += 1
+        try:
+            os.replace(self.path, target)
+            if self.compress:
+                with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(target)
+            self._count("rotations")
+            self._prune()
+        except OSError as e:
+            logger.error(f"Conversation log rotation failed: {e}")
+            self._count("write_errors")
+
+    def _prune(self):
+        if self.backups <= 0:
+            return
+        rotated = sorted(glob.glob(glob.escape(self.path) + ".*"), key=os.path.getmtime)
+        for old in rotated[:-self.backups]:
+            os.remove(old)
+
+    def stats(self):
+        """Snapshot of queue depth and record counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "queue_depth": self._queue.qsize(),
+            **stats,
+        }
+
+    def close(self, timeout=5.0):
+        """Write everything queued and stop the writer thread"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+def create_conversation_log(path):
+    """Build the gateway's log from CONVERSATION_LOG_* variables (None: off)"""
+    if not path:
+        return None
+    conversation_log = ConversationLog(
+        path,
+        max_queue=int(os.environ.get("CONVERSATION_LOG_QUEUE", "10000")),
+        batch_size=int(os.environ.get("CONVERSATION_LOG_BATCH", "500")),
+        flush_interval=float(os.environ.get("CONVERSATION_LOG_FLUSH_INTERVAL", "1")),
+        max_bytes=int(os.environ.get("CONVERSATION_LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+        rotate_interval=float(os.environ.get("CONVERSATION_LOG_ROTATE_INTERVAL", "86400")),
+        backups=int(os.environ.get("CONVERSATION_LOG_BACKUPS", "14")),
+        compress=os.environ.get("CONVERSATION_LOG_COMPRESS", "1") != "0",
+        sample_rate=float(os.environ.get("CONVERSATION_LOG_SAMPLE", "1")),
+    )
+    atexit.register(conversation_log.close)
+    return conversation_log
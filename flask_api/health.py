@@ -0,0 +1,219 @@
+"""
+Background health prober for the gateway
+Polls Rasa and the action server on an interval and keeps the latest result
+in memory, so /health, /health/live and /health/ready never wait on an
+upstream call.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from rasa_client import RasaClient
+
+logger = logging.getLogger(__name__)
+
+# Component states
+READY = "ready"
+WARMING_UP = "warming_up"
+DOWN = "down"
+UNKNOWN = "unknown"
+
+
+def action_server_url(endpoints_path, default="http://localhost:5055"):
+    """Base URL of the action server from endpoints.yml (action_endpoint.url)"""
+    url = os.environ.get("ACTION_SERVER_URL")
+    if url:
+        return url.rstrip('/')
+    try:
+        import yaml
+
+        with open(endpoints_path, 'r', encoding='utf-8') as f:
+            endpoints = yaml.safe_load(f) or {}
+        url = (endpoints.get("action_endpoint") or {}).get("url")
+    except Exception as e:
+        logger.error(f"Could not read action endpoint from {endpoints_path}: {e}")
+        url = None
+    if not url:
+        return default
+    # The SDK serves /webhook and /health from the same root
+    url = url.rstrip('/')
+    return url[:-len('/webhook')] if url.endswith('/webhook') else url
+
+
+class HealthProber:
+    """
+    Probes Rasa (GET /status) and the action server (GET /health).
+
+    Rasa answers 409 until a model is loaded, which is reported as
+    warming_up. A snapshot older than stale_after seconds (the prober itself
+    is stuck) makes the gateway not ready. warmup.py's record in
+    warmup_marker is reported as "warmup"; with require_warmup, the gateway
+    is also not ready until that record is for the model Rasa is serving.
+    Rasa's own status only reflects whether a model is loaded.
+    """
+
+    def __init__(self, rasa_url, action_url, interval=5.0, timeout=2.0,
+                 stale_after=None, warmup_marker=None, require_warmup=False):
+        self.interval = interval
+        self.warmup_marker = warmup_marker
+        self.require_warmup = require_warmup
+        self.timeout = timeout
+        self.stale_after = stale_after or max(3 * interval, timeout + interval)
+        # Dedicated one-connection clients so probes never queue behind chat
+        # traffic in the main pool, and no retries to keep latency honest
+        self._clients = {
+            "rasa": RasaClient(rasa_url, pool_size=1, connect_timeout=timeout,
+                               read_timeout=timeout, max_retries=0),
+            "action_server": RasaClient(action_url, pool_size=1, connect_timeout=timeout,
+                                        read_timeout=timeout, max_retries=0),
+        }
+        self._components = {name: self._initial(client.base_url)
+                            for name, client in self._clients.items()}
+        self._checked_at = None
+        self._warmup = None
+        self._warmed_up = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _initial(url):
+        return {
+            "status": UNKNOWN,
+            "url": url,
+            "latency_ms": None,
+            "checked_at": None,
+            "last_ok": None,
+            "consecutive_failures": 0,
+            "error": None,
+        }
+
+    def start(self):
+        """Start polling in a daemon thread (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"Health probe failed: {e}")
+            self._stop.wait(self.interval)
+
+    def probe(self):
+        """Probe every component once and update the snapshot"""
+        results = {
+            "rasa": self._probe_rasa(),
+            "action_server": self._probe_action_server(),
+        }
+        warmup = self._read_warmup()
+        warmed = self._warmed(warmup, results["rasa"][3])
+        now = time.time()
+        stamp = datetime.fromtimestamp(now).isoformat()
+        with self._lock:
+            for name, (status, latency_ms, error, details) in results.items():
+                component = dict(self._components[name])
+                component.update(details)
+                component["status"] = status
+                component["latency_ms"] = latency_ms
+                component["checked_at"] = stamp
+                component["error"] = error
+                if status == DOWN:
+                    component["consecutive_failures"] += 1
+                else:
+                    component["consecutive_failures"] = 0
+                    component["last_ok"] = stamp
+                self._components[name] = component
+            self._warmup = warmup
+            self._warmed_up = warmed
+            self._checked_at = now
+
+    def _read_warmup(self):
+        """warmup.py's record of the last warm-up, or None"""
+        if not self.warmup_marker:
+            return None
+        try:
+            with open(self.warmup_marker, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read warm-up marker {self.warmup_marker}: {e}")
+            return None
+
+    @staticmethod
+    def _warmed(warmup, rasa_details):
+        # A marker left over from an earlier model does not count
+        return bool(warmup) and warmup.get("model_id") == rasa_details.get("model_id")
+
+    def _get(self, name, path):
+        started = time.perf_counter()
+        try:
+            response = self._clients[name].get(path)
+        except requests.exceptions.RequestException as e:
+            return None, round((time.perf_counter() - started) * 1000, 2), type(e).__name__
+        return response, round((time.perf_counter() - started) * 1000, 2), None
+
+    def _probe_rasa(self):
+        response, latency_ms, error = self._get("rasa", "/status")
+        if response is None:
+            return DOWN, latency_ms, error, {}
+        if response.status_code == 409:
+            # Server is up but no model is loaded yet
+            return WARMING_UP, latency_ms, None, {"model_id": None, "model_file": None}
+        if response.status_code != 200:
+            return DOWN, latency_ms, f"HTTP {response.status_code}", {}
+        try:
+            status = response.json()
+        except ValueError:
+            status = {}
+        details = {"model_id": status.get("model_id"), "model_file": status.get("model_file")}
+        return (READY if details["model_file"] else WARMING_UP), latency_ms, None, details
+
+    def _probe_action_server(self):
+        response, latency_ms, error = self._get("action_server", "/health")
+        if response is None:
+            return DOWN, latency_ms, error, {}
+        if response.status_code != 200:
+            return DOWN, latency_ms, f"HTTP {response.status_code}", {}
+        return READY, latency_ms, None, {}
+
+    def snapshot(self):
+        """Latest probe results; never touches the network"""
+        with self._lock:
+            components = {name: dict(c) for name, c in self._components.items()}
+            checked_at = self._checked_at
+            warmup = self._warmup
+            warmed_up = self._warmed_up
+        age = time.time() - checked_at if checked_at is not None else None
+        return {
+            "components": components,
+            "probe_age_s": round(age, 3) if age is not None else None,
+            "stale": age is None or age > self.stale_after,
+            "warmup": warmup,
+            "warmed_up": warmed_up,
+        }
+
+    def readiness(self):
+        """
+        (ready, snapshot) - ready once Rasa has a model and actions answer
+        (and, with require_warmup, warmup.py has warmed that model)
+        """
+        snapshot = self.snapshot()
+        ready = not snapshot["stale"] and all(
+            c["status"] == READY for c in snapshot["components"].values())
+        if self.require_warmup and not snapshot["warmed_up"]:
+            ready = False
+        return ready, snapshot
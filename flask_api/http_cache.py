@@ -0,0 +1,207 @@
+"""
+Conditional requests and compression for cacheable gateway responses
+Bodies are serialized once into a CachedBody (strong ETag, Last-Modified,
+lazily compressed variants). negotiate() answers If-None-Match /
+If-Modified-Since with 304 and picks gzip or brotli from Accept-Encoding;
+the Flask and aiohttp gateways only turn its result into a response.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def serialize(data):
+    """Compact UTF-8 JSON, the same bytes for the same data in both gateways"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_etag(*parts):
+    """Strong ETag over bytes or strings"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+class CachedBody:
+    """A pre-serialized response body and its validators"""
+
+    def __init__(self, body, content_type, etag=None, last_modified=None,
+                 cache_control="no-cache"):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag or content_etag(body)
+        self.last_modified = last_modified
+        self.cache_control = cache_control
+        self._encoded = {}
+
+    @classmethod
+    def json(cls, data, **kwargs):
+        return cls(serialize(data), "application/json", **kwargs)
+
+    def encoded(self, encoding):
+        """Body compressed with encoding (computed once per encoding)"""
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=COMPRESS_LEVEL, mtime=0)
+            self._encoded[encoding] = data
+        return data
+
+
+def choose_encoding(accept_encoding, size):
+    """Best supported content coding in an Accept-Encoding header, or None"""
+    if not accept_encoding or size < COMPRESS_MIN_BYTES:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _opaque_tags(if_none_match):
+    tags = set()
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        # Compressed variants carry the coding as a suffix of the same tag
+        for encoding in ENCODINGS:
+            if tag.endswith("-" + encoding):
+                tag = tag[:-len(encoding) - 1]
+        tags.add(tag)
+    return tags
+
+
+def is_fresh(headers, etag, last_modified=None):
+    """Whether the client's copy (If-None-Match, else If-Modified-Since) is current"""
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match:
+        tags = _opaque_tags(if_none_match)
+        return "*" in tags or etag.strip('"') in tags
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def negotiate(cached, headers):
+    """(status, body bytes, headers) for a GET of cached"""
+    encoding = choose_encoding(headers.get("Accept-Encoding"), len(cached.body))
+    etag = cached.etag if encoding is None else f'{cached.etag[:-1]}-{encoding}"'
+    response_headers = {
+        "ETag": etag,
+        "Cache-Control": cached.cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if cached.last_modified is not None:
+        response_headers["Last-Modified"] = formatdate(cached.last_modified, usegmt=True)
+    if is_fresh(headers, cached.etag, cached.last_modified):
+        return 304, b"", response_headers
+    response_headers["Content-Type"] = cached.content_type
+    if encoding is None:
+        return 200, cached.body, response_headers
+    response_headers["Content-Encoding"] = encoding
+    return 200, cached.encoded(encoding), response_headers
+
+
+class ResponseCache:
+    """Small thread-safe LRU of CachedBody objects by key"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Cached body for key, calling build() on a miss"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+        cached = build()
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = cached
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return cached
+
+
+class StaticFiles:
+    """
+    Files under a directory held in memory as CachedBody objects; a file is
+    re-read only when its size or mtime changes (one stat() per request)
+    """
+
+    def __init__(self, directory, cache_control="no-cache"):
+        self.directory = os.path.realpath(directory)
+        self.cache_control = cache_control
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """CachedBody for a relative path, or None if there is no such file"""
+        path = os.path.realpath(os.path.join(self.directory, name))
+        if not path.startswith(self.directory + os.sep):
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        key = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._files.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        with open(path, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript",
+                                                                "application/json"):
+            content_type += "; charset=utf-8"
+        cached = CachedBody(body, content_type, last_modified=st.st_mtime,
+                            cache_control=self.cache_control)
+        with self._lock:
+            self._files[path] = (key, cached)
+        return cached
@@ -0,0 +1,102 @@
+"""
+Prometheus metrics for the gateway (GET /metrics, both api.py and async_api.py)
+
+Routes are labelled by their URL rule (/conversations/<id>/... style paths
+never become one series per sender) and upstream calls by Rasa endpoint.
+Upstream time is split into connect (new TCP connection; absent when a
+keep-alive connection was reused) and response (request sent until the
+response headers arrive).
+"""
+
+import os
+import sys
+import time
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from actions.metrics import CONTENT_TYPE, FAST_BUCKETS, Registry  # noqa: E402,F401
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "gateway_http_requests_total", "Gateway requests by route, method and status",
+    ("route", "method", "status"))
+http_duration = registry.histogram(
+    "gateway_http_request_duration_seconds", "Gateway request latency",
+    ("route", "method"))
+http_in_flight = registry.gauge(
+    "gateway_http_requests_in_flight", "Gateway requests being served", ("route",))
+upstream_requests = registry.counter(
+    "gateway_upstream_requests_total", "Calls to Rasa by endpoint and status (or error)",
+    ("endpoint", "status"))
+upstream_connect = registry.histogram(
+    "gateway_upstream_connect_seconds", "Time to open a new connection to Rasa",
+    ("endpoint",), buckets=FAST_BUCKETS + (0.1, 0.25, 0.5, 1.0, 3.0))
+upstream_response = registry.histogram(
+    "gateway_upstream_response_seconds", "Time from sending a call to Rasa until its response",
+    ("endpoint",))
+# Read at scrape time; each gateway points these at its own state
+upstream_in_flight = registry.gauge(
+    "gateway_upstream_in_flight", "Calls to Rasa waiting for a response")
+session_store_size = registry.gauge(
+    "gateway_sessions", "Sessions in the session store")
+
+
+def route_label(rule):
+    """Route label for a matched URL rule (unmatched paths share one series)"""
+    return rule if rule else "unmatched"
+
+
+def upstream_endpoint(path):
+    """Low-cardinality name for an upstream Rasa path"""
+    path = path.split("?")[0]
+    if path.startswith("/webhooks/"):
+        return "webhook"
+    if path.startswith("/conversations/"):
+        return "tracker_events" if path.endswith("/events") else "tracker"
+    if path in ("/status", "/model/parse", "/version"):
+        return path.strip("/").replace("/", "_")
+    return "other"
+
+
+def observe_upstream(method, path, status, connect_s, response_s):
+    """RasaClient observer: one call (or retry attempt) to Rasa"""
+    endpoint = upstream_endpoint(path)
+    upstream_requests.inc(endpoint, status)
+    if connect_s:
+        upstream_connect.observe(connect_s, endpoint)
+    if response_s is not None:
+        upstream_response.observe(response_s, endpoint)
+
+
+def upstream_trace_config():
+    """aiohttp TraceConfig feeding the upstream metrics from a ClientSession"""
+    import aiohttp
+
+    async def on_request_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+        ctx.connect_s = 0.0
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        ctx.connect_s = time.perf_counter() - ctx.connect_started
+
+    async def on_request_end(session, ctx, params):
+        elapsed = time.perf_counter() - ctx.started
+        observe_upstream(params.method, params.url.path, params.response.status,
+                         ctx.connect_s, elapsed - ctx.connect_s)
+
+    async def on_request_exception(session, ctx, params):
+        observe_upstream(params.method, params.url.path, type(params.exception).__name__,
+                         ctx.connect_s, None)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
@@ -0,0 +1,153 @@
+"""
+Gateway-side pre-validation for booking_form
+A typo in an email or phone number normally costs three hops (gateway ->
+Rasa NLU and policies -> action server validate_booking_form) only to come
+back as "Please provide a valid ...". The gateway already sees which
+question the bot asked last, so for clearly invalid answers it runs the
+same validators (actions/validation.py) in-process and replies itself.
+
+Rules:
+- Only the slots listed in `slots` are checked locally; anything that
+  needs tracker state (checkout_date needs checkin_date) goes to Rasa.
+- Anything that looks like a change of topic (help, cancel, goodbye, ...,
+  taken from the NLU examples of those intents) or an /intent payload goes
+  to Rasa.
+- The reply is "rejected" only if neither the whole message nor any part
+  Rasa could extract as an entity (a token, a digit run) is valid.
+- Valid input always goes to Rasa, so slots are only ever filled there.
+"""
+
+import re
+import threading
+
+import yaml
+
+from actions.validation import validate_slot
+
+# Intents that leave or interrupt the form; their examples pass through
+ESCAPE_INTENTS = ("greet", "goodbye", "ask_help", "ask_cancel", "out_of_scope", "thank")
+ESCAPE_WORDS = re.compile(
+    r"\b(cancel|stop|quit|restart|start over|help|bye|goodbye|nevermind|never mind)\b")
+# [John](name) -> John
+ENTITY_ANNOTATION = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+TEMPLATE_FIELD = re.compile(r"\\\{\w+\\\}")
+PHONE_RUN = re.compile(r"\+?[\d\s\-().]{7,}")
+TOKEN_PUNCTUATION = "\"'.,;:!?()<>"
+
+DEFAULT_SLOTS = ("email", "phone", "checkin_date", "num_guests",
+                 "room_type", "breakfast", "payment_method")
+
+
+def _normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def load_ask_prompts(domain_path, form="booking_form"):
+    """[(slot, pattern)] for the form's utter_ask_<slot> responses"""
+    with open(domain_path, 'r', encoding='utf-8') as f:
+        domain = yaml.safe_load(f) or {}
+    required = (domain.get("forms", {}).get(form) or {}).get("required_slots") or []
+    responses = domain.get("responses") or {}
+    prompts = []
+    for slot in required:
+        for variant in responses.get(f"utter_ask_{slot}") or []:
+            text = variant.get("text")
+            if text:
+                # Slot placeholders such as {guest_name} match any text
+                pattern = TEMPLATE_FIELD.sub(".+?", re.escape(text.strip()))
+                prompts.append((slot, re.compile(pattern, re.DOTALL)))
+    return prompts
+
+
+def load_escape_phrases(nlu_path, intents=ESCAPE_INTENTS):
+    """Normalized training examples of the intents that leave the form"""
+    with open(nlu_path, 'r', encoding='utf-8') as f:
+        nlu = yaml.safe_load(f) or {}
+    phrases = set()
+    for block in nlu.get("nlu") or []:
+        if block.get("intent") not in intents:
+            continue
+        for line in (block.get("examples") or "").splitlines():
+            line = line.strip()
+            if line.startswith("- "):
+                phrases.add(_normalize(ENTITY_ANNOTATION.sub(r"\1", line[2:])))
+    return phrases
+
+
+class PreValidator:
+    """
+    Decides, per message, whether the gateway can answer a form re-prompt
+    itself. Stateless apart from counters: which slot a sender is being
+    asked for lives in their session record (see awaiting()).
+    """
+
+    def __init__(self, domain_path, nlu_path, slots=DEFAULT_SLOTS):
+        self.slots = frozenset(slots)
+        self.prompts = load_ask_prompts(domain_path)
+        self.escape_phrases = load_escape_phrases(nlu_path)
+        self._lock = threading.Lock()
+        self._counters = {
+            "answered_locally": 0,
+            "passed_valid": 0,
+            "passed_escape": 0,
+        }
+
+    def awaiting(self, bot_responses):
+        """(slot, prompt text) if the bot's last message asks for a form slot"""
+        texts = [r.get("text") for r in bot_responses or [] if r.get("text")]
+        if not texts:
+            return None, None
+        last = texts[-1].strip()
+        for slot, pattern in self.prompts:
+            if pattern.fullmatch(last):
+                return slot, last
+        return None, None
+
+    def is_escape(self, message):
+        text = _normalize(message)
+        return (text.startswith("/") or text in self.escape_phrases
+                or ESCAPE_WORDS.search(text) is not None)
+
+    @staticmethod
+    def candidates(slot, message):
+        """The message plus the parts of it Rasa could extract as the slot"""
+        yield message
+        if slot == "email":
+            for token in message.split():
+                yield token.strip(TOKEN_PUNCTUATION)
+        elif slot == "phone":
+            for run in PHONE_RUN.findall(message):
+                yield run.strip()
+
+    def check(self, slot, prompt, message):
+        """
+        Local reply (list of bot messages) for a clearly invalid answer to
+        prompt, or None if the message should go to Rasa.
+        """
+        if slot not in self.slots or not isinstance(message, str):
+            return None
+        if self.is_escape(message):
+            self._count("passed_escape")
+            return None
+        rejection = None
+        for candidate in self.candidates(slot, message):
+            result = validate_slot(slot, candidate)
+            if result.valid:
+                self._count("passed_valid")
+                return None
+            rejection = rejection or result.message
+        self._count("answered_locally")
+        # What the action server would say, then the form asking again
+        return [{"text": rejection}, {"text": prompt}]
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "slots": sorted(self.slots),
+                "prompts": len(self.prompts),
+                **self._counters,
+            }
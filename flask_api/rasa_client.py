@@ -0,0 +1,205 @@
+"""
+Pooled upstream client for the Rasa server
+All gateway calls to Rasa go through one shared RasaClient so TCP connections
+are reused (keep-alive) instead of being opened per user message.
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Methods that are safe to send twice
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+def backoff_delay(attempt, base, cap):
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# Seconds the current thread spent opening connections in this request
+_connect_time = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.seconds = (getattr(_connect_time, "seconds", 0.0)
+                                     + time.perf_counter() - started)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    connect = _TimedHTTPConnection.connect
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class RasaClient:
+    """Thread-safe HTTP client with a bounded keep-alive connection pool"""
+
+    def __init__(self, base_url, pool_size=20, connect_timeout=3.05,
+                 read_timeout=10, max_retries=2, backoff_base=0.1,
+                 backoff_max=2.0, observer=None):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # observer(method, path, status or error name, connect_s, response_s)
+        # is called after every attempt (see metrics.observe_upstream)
+        self.observer = observer
+
+        # pool_block=True caps open sockets at pool_size; extra callers wait
+        # for a free connection instead of opening (and leaking) new ones
+        self._adapter = HTTPAdapter(pool_connections=1,
+                                    pool_maxsize=pool_size,
+                                    pool_block=True,
+                                    max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        if observer is not None:
+            # Time connection setup separately from the request itself
+            self._adapter.poolmanager.pool_classes_by_scheme = {
+                "http": _TimedHTTPConnectionPool,
+                "https": _TimedHTTPSConnectionPool,
+            }
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._counters = {
+            "requests": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "connection_errors": 0,
+        }
+
+    def url(self, path):
+        """Build an absolute upstream URL from a path"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, read_timeout=None, **kwargs):
+        return self.request('GET', path, read_timeout=read_timeout, **kwargs)
+
+    def post(self, path, read_timeout=None, retry=False, **kwargs):
+        return self.request('POST', path, read_timeout=read_timeout,
+                            retry=retry, **kwargs)
+
+    def request(self, method, path, read_timeout=None, retry=None, **kwargs):
+        """
+        Send a request through the shared pool.
+
+        Idempotent methods are retried on connection errors and timeouts with
+        full-jitter exponential backoff. Set retry=True to opt a non-idempotent
+        call in when the caller knows it is safe to repeat.
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if retry else 0)
+        timeout = (self.connect_timeout,
+                   read_timeout if read_timeout is not None else self.read_timeout)
+
+        for attempt in range(attempts):
+            self._enter()
+            _connect_time.seconds = 0.0
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, self.url(path),
+                                                timeout=timeout, **kwargs)
+                self._observe(method, path, response.status_code, started)
+                return response
+            except requests.exceptions.Timeout:
+                self._count("timeouts")
+                self._observe(method, path, "Timeout", None)
+                if attempt + 1 >= attempts:
+                    raise
+            except requests.exceptions.ConnectionError:
+                self._count("connection_errors")
+                self._observe(method, path, "ConnectionError", None)
+                if attempt + 1 >= attempts:
+                    raise
+            finally:
+                self._exit()
+
+            self._count("retries")
+            time.sleep(self._backoff(attempt))
+
+    def _observe(self, method, path, status, started):
+        if self.observer is None:
+            return
+        connect_s = _connect_time.seconds
+        response_s = (time.perf_counter() - started - connect_s
+                      if started is not None else None)
+        self.observer(method, path, status, connect_s, response_s)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def _backoff(self, attempt):
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+    def _enter(self):
+        with self._lock:
+            self._counters["requests"] += 1
+            self._in_flight += 1
+            if self._in_flight > self._peak_in_flight:
+                self._peak_in_flight = self._in_flight
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """Snapshot of request counters and connection pool usage"""
+        pools = []
+        # urllib3 keeps one HTTPConnectionPool per (scheme, host, port)
+        for key in list(self._adapter.poolmanager.pools.keys()):
+            pool = self._adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            pools.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "max_size": pool.pool.maxsize if pool.pool is not None else 0,
+                "connections_opened": pool.num_connections,
+                "requests_served": pool.num_requests,
+                "available_slots": idle,
+            })
+
+        with self._lock:
+            return {
+                "base_url": self.base_url,
+                "pool_size": self.pool_size,
+                "connect_timeout": self.connect_timeout,
+                "read_timeout": self.read_timeout,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                **self._counters,
+                "pools": pools,
+            }
+
+    def close(self):
+        self.session.close()
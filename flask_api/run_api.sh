@@ -32,7 +32,7 @@ source "$PARENT_DIR/.venv/bin/activate"
 
 # Check if Flask is installed
 echo -e "${BLUE}📦 Checking Flask dependencies...${NC}"
-pip show flask > /dev/null 2>&1 || pip install -q flask flask-cors requests
+pip show flask > /dev/null 2>&1 || pip install -q flask flask-cors requests aiohttp
 
 # Check if Rasa is running
 echo -e "${BLUE}🔍 Checking Rasa server status...${NC}"
@@ -41,7 +41,7 @@ if [[ "$RASA_STATUS" == "down" ]]; then
     echo -e "${YELLOW}⚠️  Warning: Rasa server is not running!${NC}"
     echo ""
     echo "To start Rasa, open another terminal and run:"
-    echo -e "${BLUE}  cd $PARENT_DIR && ./run.sh${NC}"
+    echo -e "${BLUE}  cd $PARENT_DIR && ./run.sh server${NC}"
     echo ""
     read -p "Do you want to continue anyway? (y/n) " -n 1 -r
     echo
@@ -58,5 +58,10 @@ echo -e "${GREEN}✅ Starting Flask API + Frontend server...${NC}"
 echo ""
 
 cd "$(dirname "${BASH_SOURCE[0]}")"
-python api.py
+if [[ "$API_MODE" == "async" ]]; then
+    echo -e "${BLUE}⚡ Async gateway mode (aiohttp)${NC}"
+    python async_api.py
+else
+    python api.py
+fi
 
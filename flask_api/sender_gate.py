@@ -0,0 +1,222 @@
+"""
+Per-sender turn serialization for the gateway
+Rasa only handles a sender's turns one at a time if we send them that way:
+two /chat calls for the same sender racing upstream corrupt the form state.
+SenderGate queues turns per sender and coalesces duplicates (a double-clicked
+send, a client retry) onto the upstream call made for the first copy.
+
+A turn is a duplicate of an earlier one for the same sender when:
+- both carry the same idempotency key, within key_ttl seconds, or
+- the message text is identical and the earlier turn is still running or
+  finished less than window seconds ago.
+
+Only successful turns are remembered once they finish, so retrying a turn
+that failed (e.g. timed out) really sends it again.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+
+class SenderBusy(Exception):
+    """Too many turns for one sender are already queued"""
+
+
+class _Turn:
+    __slots__ = ("key", "done", "result", "error")
+
+    def __init__(self, key, done):
+        self.key = key
+        self.done = done
+        self.result = None
+        self.error = None
+
+
+class _GateState:
+    """Bookkeeping shared by both gates; callers provide the locking"""
+
+    def __init__(self, window, key_ttl, max_queued):
+        self.window = window
+        self.key_ttl = key_ttl
+        self.max_queued = max_queued
+        self.turns = {}
+        # (expires_at, seq, key, turn) for finished turns, soonest first
+        self.expiry = []
+        self.seq = itertools.count()
+        # sender_id -> [lane lock, turns queued or running]
+        self.lanes = {}
+        self.counters = {
+            "turns": 0,
+            "coalesced": 0,
+            "waited": 0,
+            "rejected": 0,
+        }
+
+    @staticmethod
+    def turn_key(sender_id, message, idempotency_key):
+        if idempotency_key:
+            return (sender_id, "key", str(idempotency_key))
+        return (sender_id, "message", message if isinstance(message, str) else repr(message))
+
+    def find(self, key):
+        """The running or remembered turn for a key, if any"""
+        now = time.monotonic()
+        while self.expiry and self.expiry[0][0] <= now:
+            _, _, expired_key, turn = heapq.heappop(self.expiry)
+            if self.turns.get(expired_key) is turn:
+                del self.turns[expired_key]
+        return self.turns.get(key)
+
+    def join_lane(self, sender_id, make_lock):
+        lane = self.lanes.get(sender_id)
+        if lane is None:
+            lane = self.lanes[sender_id] = [make_lock(), 0]
+        if lane[1] >= self.max_queued:
+            self.counters["rejected"] += 1
+            raise SenderBusy(sender_id)
+        lane[1] += 1
+        self.counters["turns"] += 1
+        if lane[1] > 1:
+            self.counters["waited"] += 1
+        return lane[0]
+
+    def leave_lane(self, sender_id):
+        lane = self.lanes[sender_id]
+        lane[1] -= 1
+        if lane[1] == 0:
+            del self.lanes[sender_id]
+
+    def finish(self, turn, succeeded):
+        if self.turns.get(turn.key) is not turn:
+            return
+        if not succeeded:
+            del self.turns[turn.key]
+            return
+        ttl = self.key_ttl if turn.key[1] == "key" else self.window
+        heapq.heappush(self.expiry, (time.monotonic() + ttl, next(self.seq), turn.key, turn))
+
+    def stats(self):
+        return {
+            "window_s": self.window,
+            "key_ttl_s": self.key_ttl,
+            "max_queued_per_sender": self.max_queued,
+            "active_senders": len(self.lanes),
+            "remembered_turns": len(self.turns),
+            **self.counters,
+        }
+
+
+def _waiter_error(error):
+    """What duplicates of a failed turn raise"""
+    if isinstance(error, Exception):
+        return error
+    # The original request was cancelled (e.g. client went away)
+    return RuntimeError("The original request for this message was cancelled")
+
+
+def _succeeded(result):
+    # send() returns (body, status)
+    return isinstance(result, tuple) and len(result) == 2 and result[1] == 200
+
+
+class SenderGate:
+    """
+    Thread version, for the Flask gateway.
+
+    run(sender_id, message, send) calls send() at most once per distinct
+    turn, one turn per sender at a time, and returns (result, coalesced).
+    send() returns a (body, status) pair; only status 200 is remembered.
+    """
+
+    def __init__(self, window=2.0, key_ttl=300.0, max_queued=5, queue_timeout=30.0):
+        self.queue_timeout = queue_timeout
+        self._state = _GateState(window, key_ttl, max_queued)
+        self._lock = threading.Lock()
+
+    def run(self, sender_id, message, send, idempotency_key=None, coalesce=True):
+        state = self._state
+        key = state.turn_key(sender_id, message, idempotency_key)
+        with self._lock:
+            turn = state.find(key) if coalesce else None
+            if turn is not None:
+                state.counters["coalesced"] += 1
+            else:
+                lane_lock = state.join_lane(sender_id, threading.Lock)
+                owned = _Turn(key, threading.Event())
+                if coalesce:
+                    state.turns[key] = owned
+
+        if turn is not None:
+            turn.done.wait()
+            if turn.error is not None:
+                raise turn.error
+            return turn.result, True
+
+        turn = owned
+        try:
+            if not lane_lock.acquire(timeout=self.queue_timeout):
+                raise SenderBusy(sender_id)
+            try:
+                turn.result = send()
+            finally:
+                lane_lock.release()
+        except BaseException as e:
+            turn.error = _waiter_error(e)
+            raise
+        finally:
+            with self._lock:
+                state.leave_lane(sender_id)
+                state.finish(turn, turn.error is None and _succeeded(turn.result))
+            turn.done.set()
+        return turn.result, False
+
+    def stats(self):
+        with self._lock:
+            return self._state.stats()
+
+
+class AsyncSenderGate:
+    """asyncio version, for the aiohttp gateway; send is a coroutine function"""
+
+    def __init__(self, window=2.0, key_ttl=300.0, max_queued=5, queue_timeout=30.0):
+        self.queue_timeout = queue_timeout
+        self._state = _GateState(window, key_ttl, max_queued)
+
+    async def run(self, sender_id, message, send, idempotency_key=None, coalesce=True):
+        state = self._state
+        key = state.turn_key(sender_id, message, idempotency_key)
+        turn = state.find(key) if coalesce else None
+        if turn is not None:
+            state.counters["coalesced"] += 1
+            await turn.done.wait()
+            if turn.error is not None:
+                raise turn.error
+            return turn.result, True
+
+        lane_lock = state.join_lane(sender_id, asyncio.Lock)
+        turn = _Turn(key, asyncio.Event())
+        if coalesce:
+            state.turns[key] = turn
+        try:
+            try:
+                await asyncio.wait_for(lane_lock.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise SenderBusy(sender_id)
+            try:
+                turn.result = await send()
+            finally:
+                lane_lock.release()
+        except BaseException as e:
+            turn.error = _waiter_error(e)
+            raise
+        finally:
+            state.leave_lane(sender_id)
+            state.finish(turn, turn.error is None and _succeeded(turn.result))
+            turn.done.set()
+        return turn.result, False
+
+    def stats(self):
+        return self._state.stats()
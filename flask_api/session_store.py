@@ -0,0 +1,318 @@
+"""
+Session stores for the gateway
+Replaces the unbounded active_sessions dict with stores that evict idle
+sessions (TTL) and least-recently-used sessions once a size cap is reached.
+
+Backends:
+- MemorySessionStore: per-process, OrderedDict based, O(1) touch
+- SqliteSessionStore: one SQLite file shared by every gunicorn worker
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionStore:
+    """Interface shared by all session store backends"""
+
+    # Whether calls do I/O (async callers run them in a thread)
+    blocking = False
+
+    def get(self, sender_id):
+        raise NotImplementedError
+
+    def set(self, sender_id, data):
+        """Store data for a session and mark it as most recently used"""
+        raise NotImplementedError
+
+    def delete(self, sender_id):
+        raise NotImplementedError
+
+    def all(self):
+        """Snapshot of all live sessions as {sender_id: data}"""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, sender_id):
+        return self.get(sender_id) is not None
+
+    def stats(self):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process LRU store with idle TTL and a memory cap.
+
+    The OrderedDict is kept in last-used order, so both LRU victims and
+    expired sessions are always at the front and eviction is O(1) amortized.
+    """
+
+    # Rough per-entry overhead of the dicts and strings involved
+    ENTRY_OVERHEAD = 400
+
+    def __init__(self, max_sessions=10000, ttl=3600, max_bytes=64 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # sender_id -> (last_seen, size, data)
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "evicted_ttl": 0,
+            "evicted_lru": 0,
+            "evicted_memory": 0,
+        }
+
+    def _size_of(self, sender_id, data):
+        size = self.ENTRY_OVERHEAD + len(sender_id)
+        for key, value in data.items():
+            size += len(str(key)) + len(str(value))
+        return size
+
+    def _drop(self, sender_id):
+        _, size, _ = self._sessions.pop(sender_id)
+        self._bytes -= size
+
+    def _evict(self, now):
+        # Expired sessions sit at the front (least recently used first)
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._sessions[oldest][0] <= self.ttl:
+                break
+            self._drop(oldest)
+            self._counters["evicted_ttl"] += 1
+
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)))
+            self._counters["evicted_lru"] += 1
+
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions)))
+            self._counters["evicted_memory"] += 1
+
+    def get(self, sender_id):
+        with self._lock:
+            entry = self._sessions.get(sender_id)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                self._drop(sender_id)
+                self._counters["evicted_ttl"] += 1
+                return None
+            return entry[2]
+
+    def set(self, sender_id, data):
+        now = time.time()
+        size = self._size_of(sender_id, data)
+        with self._lock:
+            if sender_id in self._sessions:
+                self._drop(sender_id)
+            self._sessions[sender_id] = (now, size, data)
+            self._bytes += size
+            self._evict(now)
+
+    def delete(self, sender_id):
+        with self._lock:
+            if sender_id in self._sessions:
+                self._drop(sender_id)
+
+    def all(self):
+        with self._lock:
+            self._evict(time.time())
+            return {sender_id: entry[2]
+                    for sender_id, entry in self._sessions.items()}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._sessions),
+                "approx_bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                **self._counters,
+            }
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    SQLite-backed store that several worker processes can share.
+
+    Runs in WAL mode so readers never block the writer. Expiry, the size
+    cap and the max_bytes cap (stored sender ids plus JSON data) are
+    enforced by a sweep that runs at most every sweep_interval seconds, so
+    a touch is a single indexed upsert.
+    """
+
+    blocking = True
+    # Stored size of a row in bytes
+    ROW_BYTES = "length(CAST(sender_id AS BLOB)) + length(CAST(data AS BLOB))"
+
+    def __init__(self, path, max_sessions=100000, ttl=3600, max_bytes=64 * 1024 * 1024,
+                 sweep_interval=5.0):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._last_sweep = 0.0
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " sender_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " last_seen REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_last_seen"
+                " ON sessions (last_seen)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_counters ("
+                " name TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL)"
+            )
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _bump(self, conn, name, amount):
+        if amount > 0:
+            conn.execute(
+                "INSERT INTO session_counters (name, value) VALUES (?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount)
+            )
+
+    def _sweep(self, conn, now):
+        cur = conn.execute("DELETE FROM sessions WHERE last_seen < ?",
+                           (now - self.ttl,))
+        self._bump(conn, "evicted_ttl", cur.rowcount)
+
+        count = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if count > self.max_sessions:
+            cur = conn.execute(
+                "DELETE FROM sessions WHERE sender_id IN ("
+                " SELECT sender_id FROM sessions ORDER BY last_seen LIMIT ?)",
+                (count - self.max_sessions,)
+            )
+            self._bump(conn, "evicted_lru", cur.rowcount)
+
+        excess = self._bytes(conn) - self.max_bytes
+        if excess > 0:
+            # Least recently used first, always keeping the newest session
+            victims = []
+            rows = conn.execute(
+                "SELECT sender_id, " + self.ROW_BYTES + " FROM sessions"
+                " ORDER BY last_seen DESC LIMIT -1 OFFSET 1"
+            ).fetchall()
+            for sender_id, size in reversed(rows):
+                if excess <= 0:
+                    break
+                victims.append((sender_id,))
+                excess -= size
+            conn.executemany("DELETE FROM sessions WHERE sender_id = ?", victims)
+            self._bump(conn, "evicted_memory", len(victims))
+
+    def _bytes(self, conn):
+        return conn.execute(
+            "SELECT COALESCE(SUM(" + self.ROW_BYTES + "), 0) FROM sessions").fetchone()[0]
+
+    def _maybe_sweep(self, conn, now):
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self._sweep(conn, now)
+
+    def get(self, sender_id):
+        row = self._conn().execute(
+            "SELECT data, last_seen FROM sessions WHERE sender_id = ?",
+            (sender_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, sender_id, data):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO sessions (sender_id, data, last_seen) VALUES (?, ?, ?)"
+                " ON CONFLICT(sender_id) DO UPDATE SET"
+                " data = excluded.data, last_seen = excluded.last_seen",
+                (sender_id, json.dumps(data), now)
+            )
+            self._maybe_sweep(conn, now)
+
+    def delete(self, sender_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE sender_id = ?", (sender_id,))
+
+    def all(self):
+        rows = self._conn().execute(
+            "SELECT sender_id, data FROM sessions WHERE last_seen >= ?"
+            " ORDER BY last_seen",
+            (time.time() - self.ttl,)
+        ).fetchall()
+        return {sender_id: json.loads(data) for sender_id, data in rows}
+
+    def __len__(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE last_seen >= ?",
+            (time.time() - self.ttl,)
+        ).fetchone()[0]
+
+    def stats(self):
+        counters = dict(self._conn().execute(
+            "SELECT name, value FROM session_counters").fetchall())
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": len(self),
+            "approx_bytes": self._bytes(self._conn()),
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "evicted_ttl": counters.get("evicted_ttl", 0),
+            "evicted_lru": counters.get("evicted_lru", 0),
+            "evicted_memory": counters.get("evicted_memory", 0),
+        }
+
+
+def create_session_store(backend="memory", path=None, max_sessions=10000,
+                         ttl=3600, max_bytes=64 * 1024 * 1024):
+    """Build a session store from configuration values"""
+    if backend == "memory":
+        return MemorySessionStore(max_sessions=max_sessions, ttl=ttl,
+                                  max_bytes=max_bytes)
+    if backend == "sqlite":
+        if path is None:
+            raise ValueError("SQLite session store needs a database path")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SqliteSessionStore(path, max_sessions=max_sessions, ttl=ttl,
+                                  max_bytes=max_bytes)
+    raise ValueError(f"Unknown session store backend: {backend}")
@@ -2,6 +2,9 @@
 
 # Hotel Booking Chatbot Startup Script
 # This script sets up and runs the Rasa chatbot
+#
+#   ./run.sh          chat in the Rasa shell
+#   ./run.sh server   run the Rasa server for the Flask API, warmed up
 
 set -e  # Exit on error
 
@@ -35,6 +38,8 @@ if [ ! -d "models" ] || [ -z "$(ls -A models 2>/dev/null)" ]; then
     python -m rasa train
 fi
 
+START_TIME=$(date +%s)
+
 # Check if action server is already running
 if lsof -Pi :5055 -sTCP:LISTEN -t >/dev/null 2>&1 ; then
     echo "⚠️  Action server already running on port 5055"
@@ -46,6 +51,28 @@ else
     sleep 3
 fi
 
+if [ "$1" == "server" ]; then
+    # Serve the REST API for the gateway; warmup.py marks it ready
+    rm -f warmup.json
+    echo "🚀 Starting Rasa server..."
+    python -m rasa run --enable-api --cors "*" --port 5005 > rasa_server.log 2>&1 &
+    RASA_PID=$!
+    echo "Rasa server PID: $RASA_PID"
+    echo "🔥 Warming up (model load, parses, actions, sample booking)..."
+    if ! python warmup.py --since "$START_TIME"; then
+        echo "❌ Warm-up failed, see rasa_server.log and action_server.log"
+        kill $RASA_PID 2>/dev/null || true
+        [ ! -z "$ACTION_PID" ] && kill $ACTION_PID 2>/dev/null || true
+        exit 1
+    fi
+    echo ""
+    echo "Rasa server is ready. Press Ctrl+C to stop."
+    trap 'kill $RASA_PID $ACTION_PID 2>/dev/null || true' INT TERM
+    wait $RASA_PID || true
+    kill $ACTION_PID 2>/dev/null || true
+    exit 0
+fi
+
 echo ""
 echo "✅ Setup complete!"
 echo ""
@@ -27,9 +27,12 @@ else
     echo "ℹ️  No other Rasa processes found"
 fi
 
+# Stopped servers are no longer warmed up
+rm -f warmup.json
+
 # Clean up log files
-if [ -f "action_server.log" ]; then
-    rm action_server.log
+if [ -f "action_server.log" ] || [ -f "rasa_server.log" ]; then
+    rm -f action_server.log rasa_server.log
     echo "🧹 Cleaned up log files"
 fi
 
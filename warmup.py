@@ -0,0 +1,283 @@
+"""
+Startup warm-up for the Rasa server and the action server.
+
+The first turns after a start otherwise pay for lazy model loading,
+TensorFlow graph tracing and the first run of every action, and can hit
+the gateway's timeout. This script:
+
+    1. waits for Rasa to load a model (GET /status) and for the action
+       server to answer (GET /health)
+    2. parses a few examples of every intent (POST /model/parse)
+    3. calls validate_booking_form for every form slot and
+       action_show_booking_summary directly on the action server
+    4. runs a scripted booking conversation through the REST channel up to
+       the summary, then restarts it (nothing is booked)
+
+and then writes warmup.json with the model it warmed and how long each
+phase took. The gateway reports ready only once warmup.json names the
+model Rasa is serving. Every run is also appended to warmup_history.jsonl
+to track time-to-ready across deploys. Rasa must run with --enable-api.
+
+Usage (from the project root, see `./run.sh server`):
+    python warmup.py [--since EPOCH] [--timeout 300] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import requests
+import yaml
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MARKER = os.path.join(PROJECT_DIR, "warmup.json")
+DEFAULT_HISTORY = os.path.join(PROJECT_DIR, "warmup_history.jsonl")
+
+# One reply per booking_form slot, in the domain's required_slots order
+FORM_REPLIES = {
+    "guest_name": "John Smith",
+    "email": "john.smith@example.com",
+    "phone": "+1 555 123 4567",
+    "checkin_date": "tomorrow",
+    "checkout_date": "in 3 days",
+    "num_guests": "2",
+    "room_type": "double",
+    "special_requests": "none",
+    "breakfast": "yes",
+    "payment_method": "credit card",
+}
+
+
+class WarmupFailed(Exception):
+    pass
+
+
+def load_yaml(name):
+    with open(os.path.join(PROJECT_DIR, name), "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def action_server_url(endpoints):
+    url = (endpoints.get("action_endpoint") or {}).get("url") or "http://localhost:5055/webhook"
+    url = url.rstrip("/")
+    return url[:-len("/webhook")] if url.endswith("/webhook") else url
+
+
+def sample_texts(per_intent):
+    """The first few examples of every intent in data/nlu.yml"""
+    texts = []
+    for item in load_yaml(os.path.join("data", "nlu.yml")).get("nlu", []):
+        if "intent" not in item:
+            continue
+        examples = [line.strip()[2:] for line in item.get("examples", "").splitlines()
+                    if line.strip().startswith("- ")]
+        texts += [strip_annotations(text) for text in examples[:per_intent]]
+    return texts
+
+
+def strip_annotations(text):
+    """'[John](guest_name)' -> 'John'"""
+    out, i = [], 0
+    while i < len(text):
+        if text[i] == "[":
+            close = text.find("](", i)
+            end = text.find(")", close) if close != -1 else -1
+            if close != -1 and end != -1:
+                out.append(text[i + 1:close])
+                i = end + 1
+                continue
+        out.append(text[i])
+        i += 1
+    return "".join(out)
+
+
+def wait_for(session, url, ready, timeout, interval=1.0):
+    """Poll url until ready(response) is truthy; returns the last JSON body"""
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while time.monotonic() < deadline:
+        try:
+            response = session.get(url, timeout=5)
+            if ready(response):
+                return response.json() if response.content else {}
+            last_error = f"HTTP {response.status_code}"
+        except (requests.exceptions.RequestException, ValueError) as e:
+            last_error = type(e).__name__
+        time.sleep(interval)
+    raise WarmupFailed(f"{url} not ready after {timeout:.0f}s ({last_error})")
+
+
+def post(session, url, payload, timeout):
+    started = time.perf_counter()
+    try:
+        response = session.post(url, json=payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        raise WarmupFailed(f"POST {url}: {type(e).__name__}")
+    if response.status_code != 200:
+        raise WarmupFailed(f"POST {url}: HTTP {response.status_code}")
+    return response.json(), (time.perf_counter() - started) * 1000
+
+
+def action_request(action, sender_id, domain, slots, slot_events=()):
+    """Action server webhook payload for a tracker in the booking form"""
+    events = [{"event": "slot", "timestamp": time.time(), "name": name, "value": value}
+              for name, value in slot_events]
+    return {
+        "next_action": action,
+        "sender_id": sender_id,
+        "version": "3.6.0",
+        "domain": domain,
+        "tracker": {
+            "sender_id": sender_id,
+            "slots": slots,
+            "latest_message": {"text": None, "intent": {}, "entities": []},
+            "latest_event_time": time.time(),
+            "followup_action": None,
+            "paused": False,
+            "events": events,
+            "latest_input_channel": None,
+            "active_loop": {"name": "booking_form"},
+            "latest_action_name": "action_listen",
+        },
+    }
+
+
+def warm_actions(session, action_url, domain, sender_id, timeout):
+    """validate_booking_form for every slot, then the booking summary"""
+    slots = {name: None for name in domain.get("slots", {})}
+    timings = {}
+    for name, value in FORM_REPLIES.items():
+        payload = action_request("validate_booking_form", sender_id, domain,
+                                 dict(slots, requested_slot=name, **{name: value}),
+                                 [(name, value)])
+        body, ms = post(session, f"{action_url}/webhook", payload, timeout)
+        timings[f"validate_{name}_ms"] = round(ms, 1)
+        for event in body.get("events", []):
+            if event.get("event") == "slot" and event.get("name") == name:
+                slots[name] = event.get("value")
+    payload = action_request("action_show_booking_summary", sender_id, domain, slots)
+    _, ms = post(session, f"{action_url}/webhook", payload, timeout)
+    timings["show_booking_summary_ms"] = round(ms, 1)
+    return timings
+
+
+def warm_conversation(session, rasa_url, sender_id, timeout):
+    """Scripted booking up to the summary; returns per-turn latencies"""
+    turns = ["hi", "I want to book a room"] + list(FORM_REPLIES.values())
+    turn_ms = []
+    reached_summary = False
+    for text in turns:
+        replies, ms = post(session, f"{rasa_url}/webhooks/rest/webhook",
+                           {"sender": sender_id, "message": text}, timeout)
+        turn_ms.append(round(ms, 1))
+        if any("booking summary" in (reply.get("text") or "") for reply in replies):
+            reached_summary = True
+            break
+    post(session, f"{rasa_url}/webhooks/rest/webhook",
+         {"sender": sender_id, "message": "/restart"}, timeout)
+    return {"turn_ms": turn_ms, "reached_summary": reached_summary}
+
+
+def warm_up(rasa_url, action_url, timeout, per_intent, request_timeout):
+    session = requests.Session()
+    domain = load_yaml("domain.yml")
+    sender_id = f"warmup-{os.getpid()}-{int(time.time())}"
+    phases, details = {}, {}
+
+    def phase(name, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        phases[name] = round(time.perf_counter() - started, 3)
+        return result
+
+    status = phase("rasa_model_loaded", wait_for, session, f"{rasa_url}/status",
+                   lambda r: r.status_code == 200 and r.json().get("model_file"), timeout)
+    phase("action_server_up", wait_for, session, f"{action_url}/health",
+          lambda r: r.status_code == 200, timeout)
+
+    def parse_all():
+        parse_ms = [round(post(session, f"{rasa_url}/model/parse", {"text": text},
+                               request_timeout)[1], 1)
+                    for text in sample_texts(per_intent)]
+        return {"parses": len(parse_ms), "first_ms": parse_ms[0] if parse_ms else None,
+                "max_rest_ms": max(parse_ms[1:], default=None)}
+
+    details["nlu"] = phase("nlu_parses", parse_all)
+    details["actions"] = phase("actions", warm_actions, session, action_url, domain,
+                               sender_id, request_timeout)
+    details["conversation"] = phase("conversation", warm_conversation, session, rasa_url,
+                                    sender_id, request_timeout)
+    return status, phases, details
+
+
+def write_marker(path, record):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    endpoints = load_yaml("endpoints.yml")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rasa-url", default=os.environ.get("RASA_API_URL", "http://localhost:5005"))
+    parser.add_argument("--action-url", default=os.environ.get("ACTION_SERVER_URL",
+                                                                action_server_url(endpoints)))
+    parser.add_argument("--since", type=float,
+                        help="epoch seconds the servers were started (for time-to-ready)")
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="seconds to wait for the model and action server")
+    parser.add_argument("--request-timeout", type=float, default=60,
+                        help="seconds per warm-up request (first ones are slow)")
+    parser.add_argument("--per-intent", type=int, default=2, help="parses per intent")
+    parser.add_argument("--marker", default=os.environ.get("WARMUP_MARKER", DEFAULT_MARKER))
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--json", action="store_true", help="print the record as JSON")
+    args = parser.parse_args()
+
+    # A marker from an earlier start must not make this one look ready
+    if os.path.exists(args.marker):
+        os.remove(args.marker)
+
+    started = time.time()
+    try:
+        status, phases, details = warm_up(args.rasa_url.rstrip("/"), args.action_url.rstrip("/"),
+                                          args.timeout, args.per_intent, args.request_timeout)
+    except WarmupFailed as e:
+        print(f"❌ Warm-up failed: {e}", file=sys.stderr)
+        return 1
+
+    finished = time.time()
+    record = {
+        "model_id": status.get("model_id"),
+        "model_file": status.get("model_file"),
+        "finished_at": datetime.fromtimestamp(finished).isoformat(),
+        "warmup_s": round(finished - started, 3),
+        "time_to_ready_s": round(finished - args.since, 3) if args.since else None,
+        "phases": phases,
+        **details,
+    }
+    write_marker(args.marker, record)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+    if args.json:
+        print(json.dumps(record, indent=2))
+    else:
+        for name, seconds in phases.items():
+            print(f"  {name:<20}{seconds:>8.2f}s")
+        if record["time_to_ready_s"] is not None:
+            print(f"✅ Ready {record['time_to_ready_s']:.1f}s after start "
+                  f"(warm-up {record['warmup_s']:.1f}s)")
+        else:
+            print(f"✅ Ready (warm-up {record['warmup_s']:.1f}s)")
+        if not details["conversation"]["reached_summary"]:
+            print("⚠️  Scripted conversation did not reach the booking summary")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())